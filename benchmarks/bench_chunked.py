@@ -0,0 +1,146 @@
+"""
+TrendPredict – Chunked Mode Memory Benchmark
+Description:
+Runs the feature, VADER, topic and AI stages on a synthetic raw CSV (default
+1M tweets), once in memory and once with --chunk-size. Each run is a separate
+process, so its peak RSS is measured on its own (minus the RSS after imports).
+VADER gets a fresh score cache per mode. Reports peak memory and time,
+and checks that both modes write byte-identical CSVs. A few viral tweets put
+momentum above 2^17, where float32 would merge neighbouring 2-decimal values.
+
+Usage:
+    python benchmarks/bench_chunked.py [--rows 1000000] [--chunk-size 100000] [--hashtags 200]
+"""
+
+import argparse
+import filecmp
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+import rules  # noqa: E402
+
+# (likes, sentiment) of viral tweets: momentum 1234567.90 / 1234567.93 / 200000.01 / 200000.04,
+# which float32 would round to 1234567.875 (a tie) and 200000.015625 / 200000.046875
+VIRAL = [(1_763_665, 0.08), (1_763_665, 0.081), (285_714, 0.007), (285_714, 0.008)]
+
+WORDS = np.array("ai launch model data python cloud trend viral market brand growth risk news update "
+                 "release demo team product users week live breaking love great awful slow".split())
+
+# Each stage as (in-memory call, chunked call); {src}, {out}, {state}, {chunk} are filled in
+STAGES = {
+    "features": (
+        "import feature_engineering as m, pandas as pd\n"
+        "m.build_features(pd.read_csv('{src}')).to_csv('{out}', index=False, encoding='utf-8')",
+        "import feature_engineering as m\n"
+        "m.build_features_chunked('{src}', '{state}/none', {chunk}, '{out}')"
+    ),
+    "vader": (
+        "import nlp_vader as m, pandas as pd\n"
+        "m.add_vader(pd.read_csv('{src}'), '{state}/vader_batch.sqlite').to_csv('{out}', index=False, encoding='utf-8')",
+        "import nlp_vader as m\n"
+        "m.add_vader_chunked('{src}', '{out}', '{state}/none', {chunk}, '{state}/vader_chunked.sqlite')"
+    ),
+    "topics": (
+        "import nlp_topics as m, pandas as pd\n"
+        "m.add_topics(pd.read_csv('{src}'), None).to_csv('{out}', index=False, encoding='utf-8')",
+        "import nlp_topics as m\n"
+        "m.topics_chunked('{src}', {chunk}, None, csv_output='{out}', store_dir='{state}/none')"
+    ),
+    "ai": (
+        "import ai_recommendations as m, pandas as pd\n"
+        "m.add_recommendations(pd.read_csv('{src}')).to_csv('{out}', index=False, encoding='utf-8')",
+        "import ai_recommendations as m\n"
+        "m.add_recommendations_chunked('{src}', '{out}', {chunk})"
+    )
+}
+
+# Peak RSS (VmHWM; ru_maxrss would include the parent's peak) is read after the
+# imports and after the run; the difference is the stage's working memory
+MEASURE = """
+import json, sys, time
+sys.path.insert(0, {scripts!r})
+def peak_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+{imports}
+base = peak_kb()
+start = time.perf_counter()
+{run}
+print(json.dumps({{"seconds": time.perf_counter() - start, "peak_mb": (peak_kb() - base) / 1024}}))
+"""
+
+
+def make_raw(path, n, hashtags, seed=42):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2026-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 168 * 3600, n)), unit="s")
+    words = WORDS[rng.integers(0, len(WORDS), (n, 12))]
+    df = pd.DataFrame({
+        "tweet_id": np.arange(10**18, 10**18 + n),
+        "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "text": [" ".join(w) for w in words],
+        "likes": rng.integers(0, 400, n),
+        "retweets": rng.integers(0, 200, n),
+        "sentiment": rng.uniform(-1, 1, n).round(3),
+        "hashtag": np.array([f"#tag{i}" for i in range(hashtags)])[rng.integers(0, hashtags, n)],
+        "user_location": rng.choice(["London", "Berlin", "New York", "Tokyo", None], n)
+    })
+    viral = rng.choice(n, min(n, len(VIRAL)), replace=False)
+    df.loc[viral, ["likes", "sentiment"]] = VIRAL[:len(viral)]
+    df.loc[viral, "retweets"] = 0
+    df.insert(6, "sentiment_category", rules.sentiment_category(df["sentiment"]))
+    df.insert(8, "momentum", rules.momentum_score(df["likes"], df["retweets"], df["sentiment"]))
+    df.insert(9, "momentum_status", rules.momentum_status(df["momentum"]))
+    df.to_csv(path, index=False, encoding="utf-8")
+
+
+def measure(code):
+    imports, run = code.split("\n", 1)
+    script = MEASURE.format(scripts=SCRIPTS_DIR, imports=imports, run=run)
+    result = subprocess.run([sys.executable, "-c", script], cwd=SCRIPTS_DIR, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--hashtags", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        raw = os.path.join(work, "raw.csv")
+        make_raw(raw, args.rows, args.hashtags)
+        print(f"tweets: {args.rows:,}  raw CSV: {os.path.getsize(raw) / 1e6:.0f} MB  chunk size: {args.chunk_size:,}")
+        print("peak memory above the imports, per stage")
+        print(f"{'stage':<10}{'in-memory':>22}{'chunked':>22}{'peak ratio':>12}")
+
+        sources = {"features": raw, "vader": raw, "topics": raw, "ai": os.path.join(work, "vader.csv")}
+        for stage, (batch_code, chunked_code) in STAGES.items():
+            results = []
+            for mode, code in (("batch", batch_code), ("chunked", chunked_code)):
+                out = os.path.join(work, f"{stage}_{mode}.csv")
+                results.append(measure(code.format(src=sources[stage], out=out, state=work, chunk=args.chunk_size)))
+            assert filecmp.cmp(os.path.join(work, f"{stage}_batch.csv"),
+                               os.path.join(work, f"{stage}_chunked.csv"), shallow=False), stage
+            if stage == "vader":
+                os.replace(os.path.join(work, "vader_batch.csv"), sources["ai"])
+
+            batch, chunked = results
+            print(f"{stage:<10}"
+                  f"{batch['peak_mb']:>9.0f} MB {batch['seconds']:>7.1f} s"
+                  f"{chunked['peak_mb']:>9.0f} MB {chunked['seconds']:>7.1f} s"
+                  f"{chunked['peak_mb'] / batch['peak_mb']:>11.0%}")
+        print("chunked outputs are byte-identical to the in-memory outputs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+TrendPredict – Push Feed Fan-Out Benchmark
+Description:
+Runs an in-process publisher against scripts/trend_feed.py.
+Many fast SSE subscribers and a few deliberately slow ones
+consume TrendFeed.stream() while micro-batch deltas are published at a fixed rate.
+
+Checks that:
+- fast subscribers receive every event, in order
+- slow subscribers never block the broadcast; their queues stay bounded
+  and they get `lag` events instead
+
+Reports publish cost per batch and publish-to-delivery latency (p50/p99).
+
+Usage:
+    python benchmarks/bench_feed.py [--subscribers 1000] [--slow 10] [--batches 200] [--rate 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rules  # noqa: E402
+from trend_feed import TrendFeed, batch_deltas, QUEUE_SIZE, SPIKE_FLAG  # noqa: E402
+
+
+def make_batch(rng, rows=50, hashtags=10):
+    df = pd.DataFrame({
+        "hashtag": [f"#tag{i}" for i in rng.integers(0, hashtags, rows)],
+        "likes": rng.integers(0, 400, rows),
+        "retweets": rng.integers(0, 200, rows),
+        "sentiment": rng.uniform(-1, 1, rows).round(3),
+        "sentiment_vader": rng.uniform(-1, 1, rows).round(4)
+    })
+    df["momentum"] = rules.momentum_score(df["likes"], df["retweets"], df["sentiment"])
+    df["momentum_status"] = rules.momentum_status(df["momentum"])
+    df["opportunity_flag"] = np.where(rng.random(rows) < 0.1, SPIKE_FLAG, "")
+    return df
+
+
+async def consume(feed, received, delay=0.0, arrivals=None):
+    # Only the SSE header lines are parsed, so the client side stays cheap
+    async for chunk in feed.stream(heartbeat=3600):
+        if chunk.startswith(b"id: "):
+            event_id = int(chunk[4:chunk.index(b"\n")].rsplit(b"-", 1)[1])
+            received.append(event_id)
+            if arrivals is not None:
+                arrivals.append((event_id, time.perf_counter()))
+        elif chunk.startswith(b"event: lag"):
+            data = chunk.split(b"data: ", 1)[1]
+            received.append(("lag", json.loads(data)["dropped"]))
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run(args):
+    feed = TrendFeed()
+    rng = np.random.default_rng(0)
+    fast = [[] for _ in range(args.subscribers)]
+    slow = [[] for _ in range(args.slow)]
+    arrivals = []
+    sent = {}
+    tasks = [asyncio.create_task(consume(feed, r, arrivals=arrivals)) for r in fast]
+    tasks += [asyncio.create_task(consume(feed, r, delay=1.0)) for r in slow]
+    await asyncio.sleep(0.1)  # let everyone subscribe
+
+    publish_times = []
+    max_queue = 0
+    start = time.perf_counter()
+    for i in range(args.batches):
+        await asyncio.sleep(max(0.0, start + i / args.rate - time.perf_counter()))
+        deltas = batch_deltas(make_batch(rng))
+        t0 = time.perf_counter()
+        feed.publish({"version": i, "hashtags": deltas})
+        sent[feed.last_id] = t0
+        publish_times.append(time.perf_counter() - t0)
+        max_queue = max(max_queue, max(len(s.queue._queue) for s in feed.subscribers))
+    await asyncio.sleep(0.5)  # drain fast subscribers
+    # Events still queued or dropped-but-not-yet-reported when we stop
+    pending = sum(len(s.queue._queue) + s.dropped for s in feed.subscribers)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    expected = list(range(1, args.batches + 1))
+    assert all(r == expected for r in fast), "fast subscriber missed or reordered events"
+    slow_received = [sum(1 for e in r if isinstance(e, int)) for r in slow]
+    slow_lag = [sum(e[1] for e in r if isinstance(e, tuple)) for r in slow]
+    # A sleeping slow client may hold one dequeued event it has not yielded yet
+    unaccounted = args.slow * args.batches - (sum(slow_received) + sum(slow_lag) + pending)
+    assert 0 <= unaccounted <= args.slow, "slow subscriber lost events silently"
+    assert max_queue <= QUEUE_SIZE
+
+    publish_ms = np.array(publish_times) * 1000
+    latencies = [arrived - sent[event_id] for event_id, arrived in arrivals]
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"subscribers: {args.subscribers} fast + {args.slow} slow, batches: {args.batches} @ {args.rate}/s")
+    print(f"publish per batch:   p50 {np.percentile(publish_ms, 50):.3f} ms   p99 {np.percentile(publish_ms, 99):.3f} ms")
+    print(f"delivery latency:    p50 {p50:.2f} ms   p99 {p99:.2f} ms   ({len(latencies):,} deliveries)")
+    print(f"slow clients:        received {min(slow_received)}-{max(slow_received)}, "
+          f"reported dropped {min(slow_lag)}-{max(slow_lag)}, max queue {max_queue}/{QUEUE_SIZE}")
+    print(f"feed metrics:        {feed.metrics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50, help="batches per second")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
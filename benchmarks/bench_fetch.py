@@ -0,0 +1,234 @@
+"""
+TrendPredict – Fetcher Rate-Limit / Checkpoint Check
+Description:
+Runs fetch_twitter_data.fetch_all_hashtags() against a fake
+search_recent_tweets client on a virtual clock. No network or token is needed.
+
+The fake API serves --tweets tweets per hashtag in pages of 20 and allows
+--limit requests per --window seconds. After the fetcher's --drain-after-th
+request, another client sharing the token spends the rest of that window, so
+the headers the fetcher last saw overstate what is left. Like the real API, it answers 429 with
+x-rate-limit-* headers once the quota is spent. Its first run also drops the
+connection on one page per hashtag, like a crashed run.
+
+Checks that:
+- a 429 drains the shared token bucket, and the request is retried once the
+  window resets (the virtual clock has to pass the reset time)
+- the interrupted run keeps each hashtag's cursor, and the next run resumes from
+  that page (its first request carries the checkpointed next_token)
+- every tweet is stored exactly once, and since_id ends at the newest tweet
+
+Reports requests, 429s and virtual time spent waiting for resets.
+
+Usage:
+    python benchmarks/bench_fetch.py [--hashtags 3] [--tweets 200] [--limit 15] [--drain-after 5] [--window 900]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import requests
+import tweepy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import fetch_twitter_data  # noqa: E402
+from fetch_state import FetchState  # noqa: E402
+from jsonl_store import iter_records  # noqa: E402
+from rate_limiter import TokenBucket  # noqa: E402
+from seen_index import SeenIndex  # noqa: E402
+from sentiment_stage import SentimentStage, textblob_scorer  # noqa: E402
+
+PAGE_SIZE = 20
+
+
+class VirtualClock:
+    """
+    Time that only moves when someone sleeps, so rate-limit waits cost nothing.
+    """
+
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+        self.slept = 0.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+            self.slept += seconds
+
+
+def _response(status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "Too Many Requests" if status == 429 else "OK"
+    response.headers.update(headers)
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+
+class FakeSearchClient:
+    """
+    search_recent_tweets() over a fixed set of tweets per hashtag, newest first,
+    with a fixed-window quota. It reports rate-limit headers to the scheduler
+    like rate_limiter.RateLimitedClient does.
+    """
+
+    def __init__(self, tags, tweets, clock, limit, window, scheduler, drain_after=None):
+        self.clock = clock
+        self.limit = limit
+        self.drain_after = drain_after
+        self.window = window
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self.remaining = limit
+        self.reset = clock.time() + window
+        self.requests = 0
+        self.rejected = 0
+        self.early_retries = 0    # requests accepted after a 429 but before its reset time
+        self.blocked_until = None
+        self.first_tokens = {}  # tag -> next_token of the tag's first request in this run
+        self.drop_page = {}     # tag -> page number whose request fails (one time)
+
+        start = datetime(2026, 1, 1)
+        self.tweets = {}
+        for t, tag in enumerate(tags):
+            ids = [10**18 + t * 10**6 + i for i in range(tweets)]
+            self.tweets[tag] = [
+                tweepy.Tweet({
+                    "id": str(tweet_id),
+                    "text": f"great news about {tag} number {i}",
+                    "created_at": (start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    "author_id": "1",
+                    "edit_history_tweet_ids": [str(tweet_id)],
+                    "public_metrics": {"like_count": i % 50, "retweet_count": i % 7, "reply_count": 0, "quote_count": 0}
+                })
+                for i, tweet_id in reversed(list(enumerate(ids)))
+            ]
+
+    def _headers(self):
+        return {
+            "x-rate-limit-limit": str(self.limit),
+            "x-rate-limit-remaining": str(self.remaining),
+            "x-rate-limit-reset": str(int(self.reset))
+        }
+
+    def _take_quota(self):
+        with self.lock:
+            now = self.clock.time()
+            if now >= self.reset:
+                self.remaining, self.reset = self.limit, now + self.window
+            if self.blocked_until is not None and now < self.blocked_until:
+                self.early_retries += 1
+            if self.remaining == 0:
+                self.rejected += 1
+                self.blocked_until = self.reset
+                response = _response(429, self._headers(), {"title": "Too Many Requests", "detail": "Too Many Requests"})
+                self.scheduler.update_from_headers(response.headers)
+                raise tweepy.TooManyRequests(response)
+            self.remaining -= 1
+            self.requests += 1
+            headers = self._headers()
+            if self.requests == self.drain_after:
+                self.remaining = 0  # the other client spends the rest of the window
+        self.scheduler.update_from_headers(headers)
+
+    def search_recent_tweets(self, query, since_id=None, max_results=10, next_token=None, **kwargs):
+        tag = query.split()[0]
+        self.first_tokens.setdefault(tag, next_token)
+        self._take_quota()
+
+        page = int(next_token) if next_token else 0
+        if self.drop_page.get(tag) == page:
+            del self.drop_page[tag]
+            raise requests.exceptions.ConnectionError("connection dropped by the fake API")
+
+        newer = [tweet for tweet in self.tweets[tag] if since_id is None or tweet.id > int(since_id)]
+        data = newer[page * max_results:(page + 1) * max_results]
+        meta = {"result_count": len(data)}
+        if data:
+            meta["newest_id"] = str(data[0].id)
+        if (page + 1) * max_results < len(newer):
+            meta["next_token"] = str(page + 1)
+        users = [tweepy.User({"id": "1", "name": "fake", "username": "fake", "location": "London"})]
+        return tweepy.Response(data or None, {"users": users}, [], meta)
+
+
+def run(client, tags, tweets, work):
+    state = FetchState(os.path.join(work, "fetch_state.json"))
+    seen = SeenIndex(os.path.join(work, "seen.npy"))
+    stage = SentimentStage([textblob_scorer])
+    client.first_tokens = {}
+    try:
+        fetch_twitter_data.fetch_all_hashtags(client, tags, state, seen, client.scheduler,
+                                              sentiment_stage=stage, max_tweets=tweets)
+    finally:
+        stage.shutdown()
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hashtags", type=int, default=3)
+    parser.add_argument("--tweets", type=int, default=200, help="tweets per hashtag")
+    parser.add_argument("--limit", type=int, default=15, help="requests per window")
+    parser.add_argument("--drain-after", type=int, default=5,
+                        help="request after which another client spends the rest of the window")
+    parser.add_argument("--window", type=int, default=900, help="rate-limit window in seconds")
+    args = parser.parse_args()
+
+    tags = [f"#tag{i}" for i in range(args.hashtags)]
+    pages = -(-args.tweets // PAGE_SIZE)
+    clock = VirtualClock()
+    scheduler = TokenBucket(clock=clock.time, sleep=clock.sleep)  # learns the real limit from headers
+    client = FakeSearchClient(tags, args.tweets, clock, args.limit, args.window, scheduler, args.drain_after)
+    client.drop_page = {tag: pages // 2 for tag in tags}
+
+    with tempfile.TemporaryDirectory() as work:
+        fetch_twitter_data.JSONL_DIR = os.path.join(work, "jsonl")
+        started = time.perf_counter()
+
+        # Run 1: every hashtag loses its connection halfway through
+        state = run(client, tags, args.tweets, work)
+        for tag in tags:
+            assert state.get(tag)["next_token"] == str(pages // 2), (tag, state.get(tag))
+        stored = sum(1 for _ in iter_records(fetch_twitter_data.JSONL_DIR))
+        assert stored == len(tags) * (pages // 2) * PAGE_SIZE, stored
+        print(f"run 1 (interrupted): {stored:,} tweets stored, cursors kept at page {pages // 2}")
+
+        # Run 2: a fresh process resumes every hashtag from its committed page
+        state = run(client, tags, args.tweets, work)
+        for tag in tags:
+            assert client.first_tokens[tag] == str(pages // 2), (tag, client.first_tokens[tag])
+            tag_state = state.get(tag)
+            assert tag_state["next_token"] is None and tag_state["since_id"] == client.tweets[tag][0].id, tag_state
+
+        records = list(iter_records(fetch_twitter_data.JSONL_DIR))
+        ids = [record["tweet_id"] for record in records]
+        assert len(ids) == len(set(ids)) == len(tags) * args.tweets, (len(ids), len(set(ids)))
+        print(f"run 2 (resumed):     {len(ids):,} tweets stored once each, since_id at the newest tweet")
+
+        # Run 3: nothing new since since_id, so one empty request per hashtag
+        before = client.requests
+        run(client, tags, args.tweets, work)
+        assert client.requests - before == len(tags), client.requests - before
+        assert sum(1 for _ in iter_records(fetch_twitter_data.JSONL_DIR)) == len(ids)
+        print(f"run 3 (up to date):  {client.requests - before} requests, nothing stored")
+        elapsed = time.perf_counter() - started
+
+    assert client.rejected > 0, "no 429 was answered"
+    assert client.early_retries == 0, f"{client.early_retries} requests retried before the reset"
+    print(f"requests: {client.requests} ({args.limit} per {args.window}s window), 429s: {client.rejected} "
+          f"(all retried after the reset), virtual wait: {clock.slept / 60:.0f} min, real time: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+TrendPredict – Hyper API Latency Benchmark
+Description:
+Drives /trends (plain and conditional GET), /recommendation/{hashtag} and a
+windowed /tweets query at a fixed request rate through
+the ASGI app in-process (no network or HTTP client needed) and reports
+p50/p99 latency and achieved throughput for:
+
+- baseline: per-request groupby / full-scan handlers (the original endpoints,
+            plus a boolean-mask + sort version of /tweets)
+- index:    the precomputed snapshot handlers in scripts/hyper_api.py
+
+Both apps serve the same synthetic frame (default 1M rows, 200 hashtags).
+The baseline saturates far below the target rate, so it only gets a short run.
+
+Usage:
+    python benchmarks/bench_hyper_api.py [--rows 1000000] [--hashtags 200] [--rate 2000]
+                                         [--requests 10000] [--baseline-requests 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import unquote
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+os.chdir(SCRIPTS_DIR)  # hyper_api loads its data relative to scripts/
+import rules  # noqa: E402
+import hyper_api  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+
+
+def make_frame(n, hashtags, seed=42):
+    rng = np.random.default_rng(seed)
+    locations = np.array(["London", "Paris", "Berlin", "New York", "Tokyo"], dtype=object)
+    created = pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(0, 7 * 86400, n), unit="s")
+    df = pd.DataFrame({
+        "tweet_id": np.arange(n, dtype=np.int64) + 10**18,
+        "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "hashtag": [f"#tag{i}" for i in rng.integers(0, hashtags, n)],
+        "user_location": locations[rng.integers(0, len(locations), n)],
+        "momentum": rng.lognormal(4.5, 0.8, n).round(2),
+        "sentiment_vader": rng.uniform(-1, 1, n).round(4)
+    })
+    df["momentum_pct"] = df["momentum"].rank(pct=True)
+    df["ai_recommendation"] = rules.recommendation(df["momentum_pct"], df["sentiment_vader"]).astype(str)
+    return df
+
+
+def baseline_app(df):
+    # Original handlers: aggregate / scan the full frame on every request
+    app = FastAPI()
+
+    @app.get("/trends")
+    def get_trends():
+        top_trends = df.groupby("hashtag").agg({
+            "momentum": "mean",
+            "sentiment_vader": "mean",
+            "ai_recommendation": lambda x: x.mode()[0]
+        }).reset_index()
+        return top_trends.to_dict(orient="records")
+
+    @app.get("/recommendation/{hashtag}")
+    def get_recommendation(hashtag: str):
+        data = df[df["hashtag"] == hashtag]
+        if data.empty:
+            return {"error": "Hashtag not found"}
+        return {"hashtag": hashtag, "recommendation": data["ai_recommendation"].mode()[0]}
+
+    times = pd.to_datetime(df["created_at"])
+
+    @app.get("/tweets")
+    def get_tweets(start: str, end: str, hashtag: str, limit: int = 100):
+        mask = (times >= pd.Timestamp(start)) & (times < pd.Timestamp(end)) & (df["hashtag"] == hashtag)
+        data = df[mask].assign(t=times[mask]).sort_values(["t", "tweet_id"]).drop(columns="t")
+        page = data.head(limit)
+        return {"items": page.to_dict(orient="records"), "next_cursor": None}
+
+    return app
+
+
+# -------------------------
+# In-process ASGI driver
+# -------------------------
+async def call(app, path, headers=(), method="GET", body=b""):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": unquote(path), "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("bench", 0), "server": ("bench", 80)
+    }
+    chunks = []
+    response_headers = {}
+    sent_request = False
+    done = asyncio.Event()
+
+    async def receive():
+        # Request body first, then block until the response is complete
+        # (streaming responses listen for a client disconnect meanwhile)
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response_headers.update((k.decode(), v.decode()) for k, v in message["headers"])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    call.last_headers = response_headers
+    return b"".join(chunks)
+
+
+async def drive(app, paths, rate, headers=()):
+    """
+    Open-loop load: request i is issued at i / rate seconds regardless of how
+    long earlier requests take, so queueing delay shows up in the latency.
+    """
+    latencies = []
+    tasks = []
+    start = time.perf_counter()
+
+    async def one(scheduled, path):
+        await call(app, path, headers)
+        latencies.append(time.perf_counter() - scheduled)
+
+    # Dispatch each request when it is due (creating every task up front
+    # would delay the first requests and skew the tail)
+    for i, path in enumerate(paths):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(scheduled, path)))
+
+    await asyncio.gather(*tasks)
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hashtags", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=2000, help="target requests per second")
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--baseline-requests", type=int, default=50)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.hashtags)
+    start = time.perf_counter()
+    hyper_api.snapshots.current = Snapshot(df)
+    print(f"snapshot build: {time.perf_counter() - start:.3f}s for {args.rows:,} rows")
+
+    apps = {"baseline": baseline_app(df), "index": hyper_api.app}
+    rng = np.random.default_rng(0)
+    endpoints = {
+        "/trends": ["/trends"] * args.requests,
+        "/recommendation": [f"/recommendation/%23tag{i}" for i in rng.integers(0, args.hashtags, args.requests)],
+        "/tweets (1h)": [
+            f"/tweets?hashtag=%23tag{i}&start=2026-01-0{d}T{h:02d}:00:00&end=2026-01-0{d}T{h:02d}:59:59&limit=100"
+            for i, d, h in zip(rng.integers(0, args.hashtags, args.requests),
+                               rng.integers(1, 8, args.requests),
+                               rng.integers(0, 23, args.requests))
+        ]
+    }
+
+    # Same payloads from both implementations (/tweets compared on ids; cursors differ)
+    for path in ("/trends", "/recommendation/%23tag0", "/recommendation/%23missing"):
+        results = [json.loads(asyncio.run(call(app, path))) for app in apps.values()]
+        assert results[0] == results[1], path
+    path = endpoints["/tweets (1h)"][0]
+    results = [json.loads(asyncio.run(call(app, path)))["items"] for app in apps.values()]
+    assert [r["tweet_id"] for r in results[0]] == [r["tweet_id"] for r in results[1]], path
+
+    # Conditional polls: the client already holds the current /trends ETag
+    asyncio.run(call(apps["index"], "/trends"))
+    conditional = {"/trends (304)": [("if-none-match", call.last_headers["etag"])]}
+    endpoints["/trends (304)"] = endpoints["/trends"]
+
+    print(f"{'endpoint':<18}{'impl':<10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'req/s':>10}")
+    for endpoint, paths in endpoints.items():
+        for name, app in apps.items():
+            run = paths[:args.baseline_requests] if name == "baseline" else paths
+            latencies, elapsed = asyncio.run(drive(app, run, args.rate, conditional.get(endpoint, ())))
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{endpoint:<18}{name:<10}{p50:>10.2f}{p99:>10.2f}{len(run) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
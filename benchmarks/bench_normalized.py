@@ -0,0 +1,117 @@
+"""
+TrendPredict – Normalized Output Benchmark
+Description:
+Compares the denormalized feature / topic CSVs, where hourly features and topic
+keywords are repeated on every tweet, with the normalized output:
+- a tweet fact table
+- a hashtag × hour dimension
+- a hashtag dimension
+
+Both are built from the same synthetic tweets (default 1M rows). Reports stage
+time (compute + CSV write) and bytes written. It also checks that joining the
+normalized tables back, as a Tableau relationship would, gives the denormalized
+rows.
+
+Usage:
+    python benchmarks/bench_normalized.py [--rows 1000000] [--hashtags 200] [--hours 168]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rules  # noqa: E402
+from feature_engineering import build_features, feature_facts, hourly_features  # noqa: E402
+from json_to_csv import raw_schema  # noqa: E402
+from nlp_topics import add_topics, topic_dimension  # noqa: E402
+
+WORDS = np.array("ai launch model data python cloud trend viral market brand growth risk news update "
+                 "release demo team product users launch week live breaking".split())
+
+
+def make_tweets(n, hashtags, hours, seed=42):
+    rng = np.random.default_rng(seed)
+    tags = np.array([f"#tag{i}" for i in range(hashtags)])
+    created = pd.Timestamp("2026-01-01") + pd.to_timedelta(np.sort(rng.integers(0, hours * 3600, n)), unit="s")
+    words = WORDS[rng.integers(0, len(WORDS), (n, 6))]
+    df = pd.DataFrame({
+        "tweet_id": np.arange(10**18, 10**18 + n),
+        "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "text": [" ".join(w) for w in words],
+        "likes": rng.integers(0, 400, n),
+        "retweets": rng.integers(0, 200, n),
+        "sentiment": rng.uniform(-1, 1, n).round(3),
+        "hashtag": tags[rng.integers(0, hashtags, n)],
+        "user_location": rng.choice(["London", "Berlin", "New York", "Tokyo", None], n)
+    })
+    df["sentiment_category"] = rules.sentiment_category(df["sentiment"])
+    df["momentum"] = rules.momentum_score(df["likes"], df["retweets"], df["sentiment"])
+    df["momentum_status"] = rules.momentum_status(df["momentum"])
+    return df
+
+
+def timed_write(tables, out_dir):
+    # tables: {file name: builder}; returns (seconds, bytes written, frames)
+    start = time.perf_counter()
+    frames = {}
+    for name, build in tables.items():
+        frames[name] = build(frames)
+        frames[name].to_csv(os.path.join(out_dir, name), index=False, encoding="utf-8")
+    seconds = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(out_dir, name)) for name in tables)
+    return seconds, size, frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hashtags", type=int, default=200)
+    parser.add_argument("--hours", type=int, default=168)
+    args = parser.parse_args()
+
+    df = make_tweets(args.rows, args.hashtags, args.hours)
+    print(f"tweets: {len(df):,}  hashtags: {args.hashtags}  hours: {args.hours}")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        denormalized = {
+            "twitter_trends_fe.csv": lambda _: build_features(df),
+            "twitter_trends_topics.csv": lambda _: add_topics(df, state_dir=None)
+        }
+        normalized = {
+            "twitter_trends_fe_tweets.csv": lambda _: feature_facts(df),
+            "twitter_trends_fe_hourly.csv": lambda f: hourly_features(f["twitter_trends_fe_tweets.csv"]),
+            "twitter_trends_topics_hashtags.csv": lambda _: topic_dimension(df, state_dir=None)
+        }
+        results = {}
+        for mode, tables in (("denormalized", denormalized), ("normalized", normalized)):
+            seconds, size, frames = timed_write(tables, out_dir)
+            results[mode] = (seconds, size)
+            print(f"{mode:<14}{seconds:>8.2f} s {size / 1e6:>10.1f} MB  "
+                  + ", ".join(f"{name} {len(frame):,} rows" for name, frame in frames.items()))
+            if mode == "denormalized":
+                expected = frames
+            else:
+                actual = frames
+
+    # Relationship joins: facts ↔ hourly on (hashtag, hour), raw tweets ↔ topics on hashtag
+    facts = actual["twitter_trends_fe_tweets.csv"]
+    joined = facts.assign(hour=facts["created_at"].dt.floor("h")).merge(
+        actual["twitter_trends_fe_hourly.csv"], on=["hashtag", "hour"], how="left"
+    )
+    fe = expected["twitter_trends_fe.csv"]
+    pd.testing.assert_frame_equal(joined[fe.columns], fe)
+    topics = raw_schema(df).merge(actual["twitter_trends_topics_hashtags.csv"], on="hashtag", how="left")
+    pd.testing.assert_frame_equal(topics, expected["twitter_trends_topics.csv"])
+
+    (denorm_s, denorm_b), (norm_s, norm_b) = results["denormalized"], results["normalized"]
+    print(f"normalized writes {norm_b / denorm_b:.0%} of the bytes in {norm_s / denorm_s:.0%} of the time "
+          f"({denorm_b / norm_b:.1f}x fewer bytes, {denorm_s / norm_s:.1f}x faster); joins match")
+
+
+if __name__ == "__main__":
+    main()
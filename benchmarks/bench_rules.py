@@ -0,0 +1,108 @@
+"""
+TrendPredict – Rule Engine Benchmark
+Description:
+Compares the original row-wise .apply rules with the vectorized rules in
+scripts/rules.py on synthetic data (default 1M rows) and checks that both
+produce identical labels.
+
+Usage:
+    python benchmarks/bench_rules.py [--rows 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rules  # noqa: E402
+
+
+# -------------------------
+# Original row-wise rules (reference)
+# -------------------------
+def categorize_sentiment(score):
+    if score < -0.1:
+        return "Negative"
+    elif score <= 0.1:
+        return "Neutral"
+    else:
+        return "Positive"
+
+def momentum_status(score):
+    if score >= 400:
+        return "🔥 Exploding"
+    elif score >= 200:
+        return "🚀 Emerging"
+    else:
+        return "⏳ Stable"
+
+def vader_category(score):
+    if score >= 0.05:
+        return "Positive"
+    elif score <= -0.05:
+        return "Negative"
+    else:
+        return "Neutral"
+
+def recommendation(row):
+    if row["momentum_pct"] > 0.75 and row["sentiment_vader"] > 0.3:
+        return "Launch marketing campaign now"
+    elif row["momentum_pct"] > 0.5:
+        return "Monitor closely – trend emerging"
+    elif row["sentiment_vader"] < -0.1:
+        return "Reputation risk – investigate"
+    else:
+        return "No action needed"
+
+
+def make_frame(n, seed=42):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sentiment": rng.uniform(-1, 1, n).round(3),
+        "sentiment_vader": rng.uniform(-1, 1, n).round(4),
+        "momentum": rng.lognormal(4.5, 0.8, n).round(2)
+    })
+    df["momentum_pct"] = df["momentum"].rank(pct=True)
+    return df
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    cases = [
+        ("sentiment_category",
+         lambda: df["sentiment"].apply(categorize_sentiment),
+         lambda: rules.sentiment_category(df["sentiment"])),
+        ("momentum_status",
+         lambda: df["momentum"].apply(momentum_status),
+         lambda: rules.momentum_status(df["momentum"])),
+        ("vader_category",
+         lambda: df["sentiment_vader"].apply(vader_category),
+         lambda: rules.vader_category(df["sentiment_vader"])),
+        ("recommendation",
+         lambda: df.apply(recommendation, axis=1),
+         lambda: rules.recommendation(df["momentum_pct"], df["sentiment_vader"])),
+    ]
+
+    print(f"{'rule':<20}{'apply (s)':>12}{'vectorized (s)':>16}{'speedup':>10}{'rows/s':>16}")
+    for name, row_wise, vectorized in cases:
+        expected, t_apply = timed(row_wise)
+        actual, t_vec = timed(vectorized)
+        assert (expected.to_numpy() == actual.astype(str).to_numpy()).all(), name
+        print(f"{name:<20}{t_apply:>12.3f}{t_vec:>16.4f}{t_apply / t_vec:>9.0f}x{args.rows / t_vec:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+TrendPredict – Momentum Sketch Benchmark
+Description:
+Streams synthetic momentum values in micro-batches through the KLL momentum
+sketch (see scripts/quantile_sketch.py). Each batch is scored against the sketch
+and against an exact rank(pct=True) over everything streamed so far, which is
+what the batch path of ai_recommendations.py recomputes for every batch.
+
+Reports, for the overall and the per-hashtag percentiles:
+- max and mean absolute momentum_pct error
+- share of new tweets whose ai_recommendation matches the exact one
+- time per batch: sketch (update + score) vs exact full re-rank
+- sketch size in stored values
+
+Usage:
+    python benchmarks/bench_sketch.py [--rows 1000000] [--batch 10000] [--hashtags 50] [--k 400]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rules  # noqa: E402
+from quantile_sketch import K, MomentumPercentiles  # noqa: E402
+
+
+def make_batches(n, batch, hashtags, seed=42):
+    rng = np.random.default_rng(seed)
+    tags = np.array([f"#tag{i}" for i in range(hashtags)])
+    # Heavy-tailed, with a per-hashtag scale and rounding to produce ties like real scores
+    tag = rng.integers(0, hashtags, n)
+    momentum = (rng.lognormal(3, 1.2, n) * rng.uniform(0.5, 2, hashtags)[tag]).round(1)
+    df = pd.DataFrame({
+        "tweet_id": np.arange(10**18, 10**18 + n),
+        "hashtag": tags[tag],
+        "momentum": momentum,
+        "sentiment_vader": rng.uniform(-1, 1, n).round(3)
+    })
+    return [df.iloc[start:start + batch] for start in range(0, n, batch)]
+
+
+def errors(estimate, exact):
+    diff = np.abs(np.asarray(estimate) - np.asarray(exact))
+    return diff.max(), diff.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--hashtags", type=int, default=50)
+    parser.add_argument("--k", type=int, default=K)
+    args = parser.parse_args()
+
+    batches = make_batches(args.rows, args.batch, args.hashtags)
+    sketch = MomentumPercentiles(path=None, k=args.k)
+    history = []
+    sketch_time = exact_time = 0.0
+    overall_max = hashtag_max = 0.0
+    overall_sum = hashtag_sum = agree = scored = 0
+
+    for batch in batches:
+        start = time.perf_counter()
+        sketch.update(batch)
+        pct = sketch.percentile(batch["momentum"].to_numpy())
+        labels = rules.recommendation(pd.Series(pct, index=batch.index), batch["sentiment_vader"])
+        sketch_time += time.perf_counter() - start
+
+        # Exact path: re-rank the whole history, then read off the new rows
+        history.append(batch)
+        start = time.perf_counter()
+        full = pd.concat(history)
+        exact_pct = full["momentum"].rank(pct=True).iloc[-len(batch):]
+        exact_labels = rules.recommendation(exact_pct, batch["sentiment_vader"])
+        exact_time += time.perf_counter() - start
+
+        hashtag_pct = sketch.hashtag_percentile(batch)
+        exact_hashtag_pct = full.groupby("hashtag")["momentum"].rank(pct=True).iloc[-len(batch):]
+
+        batch_max, batch_mean = errors(pct, exact_pct)
+        overall_max, overall_sum = max(overall_max, batch_max), overall_sum + batch_mean * len(batch)
+        batch_max, batch_mean = errors(hashtag_pct, exact_hashtag_pct)
+        hashtag_max, hashtag_sum = max(hashtag_max, batch_max), hashtag_sum + batch_mean * len(batch)
+        agree += int((np.asarray(labels) == np.asarray(exact_labels)).sum())
+        scored += len(batch)
+
+    stored = sketch.overall.size() + sum(s.size() for s in sketch.hashtags.values())
+    print(f"tweets: {args.rows:,}  batches: {len(batches)} × {args.batch:,}  hashtags: {args.hashtags}  k: {args.k}")
+    print(f"{'momentum_pct':<22}max err {overall_max:.4f}  mean err {overall_sum / scored:.5f}")
+    print(f"{'per-hashtag pct':<22}max err {hashtag_max:.4f}  mean err {hashtag_sum / scored:.5f}")
+    print(f"{'ai_recommendation':<22}{agree / scored:.2%} match the exact labels")
+    print(f"{'per batch':<22}sketch {sketch_time / len(batches) * 1e3:.2f} ms  "
+          f"exact re-rank {exact_time / len(batches) * 1e3:.2f} ms  "
+          f"({exact_time / sketch_time:.0f}x)")
+    print(f"{'sketch size':<22}{stored:,} values ({sketch.overall.size():,} overall, "
+          f"{len(sketch.hashtags)} hashtag sketches) vs {args.rows:,} exact")
+
+
+if __name__ == "__main__":
+    main()
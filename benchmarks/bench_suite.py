@@ -0,0 +1,464 @@
+"""
+TrendPredict – Benchmark Suite
+Description:
+Runs every pipeline stage and Hyper API endpoint on synthetic tweets
+(see synthetic.py) at several sizes (default 10K, 1M and 10M rows). It
+records throughput and peak memory and compares them with a stored baseline.
+
+- Stages: json_to_csv (from a JSONL store), features, vader, topics, ai and
+  extract, each in its own process so peak RSS is per stage. Sizes from
+  --chunk-above up run the --chunk-size variants of features / vader /
+  topics / ai / extract.
+- API: the ai output is loaded as the serving snapshot. Each endpoint then
+  gets sequential requests after one warm-up request, and p50 / p99 latency
+  and requests per second are reported.
+- Each run is measured with instrumentation.stage(); records also go to
+  metrics.jsonl in the work directory.
+- Regressions: stage throughput more than --tolerance below the baseline, or
+  endpoint p50 / p99 latency or peak RSS more than --tolerance above it.
+  Sizes under 1M run each stage --repeat times and keep the fastest run,
+  since their timings are short and noisy. Regressions are flagged and make
+  the exit status 1. --save-baseline stores this run's results instead
+  (merged per size). Baselines are machine-specific, so the stored file
+  records the machine it came from, and the git commit each size was taken
+  at (suffixed "+dirty" if the tree had uncommitted changes).
+
+Generated data is kept in --work (default: a temporary directory) and
+reused on the next run with the same work directory.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 10k,1m,10m] [--stages features,vader,...,api]
+                                     [--work DIR] [--requests 500] [--repeat 3]
+                                     [--chunk-size 100000] [--chunk-above 5m]
+                                     [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+                                     [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+from chunked import CHUNK_SIZE  # noqa: E402
+from instrumentation import peak_rss_bytes, stage  # noqa: E402
+import synthetic  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+STAGES = ["json_to_csv", "features", "vader", "topics", "ai", "extract", "api"]
+REQUIRES = {"ai": "vader", "extract": "ai", "api": "ai"}  # stages that read another stage's output
+CHUNKED_STAGES = {"features", "vader", "topics", "ai", "extract"}
+
+# Metric → +1 if higher is better, -1 if lower is better. Endpoints are judged
+# on latency percentiles: a few slow requests swing the mean rate of a short run
+CHECKS = {"rows_per_second": 1, "p50_ms": -1, "p99_ms": -1, "peak_rss_mb": -1}
+STABLE_ROWS = 1_000_000  # stage runs at this size are long enough to measure once
+
+
+def parse_size(text):
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 10**3, "m": 10**6}.get(text[-1])
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def size_label(rows):
+    for scale, suffix in ((10**6, "M"), (10**3, "K")):
+        if rows >= scale and rows % scale == 0:
+            return f"{rows // scale}{suffix}"
+    return str(rows)
+
+
+# -------------------------
+# Stage workers (run in a subprocess each)
+# -------------------------
+def _path(data_dir, name):
+    return os.path.join(data_dir, name)
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_json_to_csv(data_dir, chunk_size, measure, requests):
+    import json_to_csv
+    csv_file, offset_file = _path(data_dir, "converted.csv"), _path(data_dir, "converted_offset.json")
+    _remove(csv_file, offset_file)
+    with measure("json_to_csv") as m:
+        rows = json_to_csv.convert_new_records(_path(data_dir, "none.json"), csv_file, offset_file,
+                                               _path(data_dir, "jsonl"))
+        m.rows(rows_in=rows, rows_out=rows)
+        m.read(_path(data_dir, "jsonl"))
+        m.wrote(csv_file)
+
+
+def run_features(data_dir, chunk_size, measure, requests):
+    import feature_engineering
+    raw, output = _path(data_dir, "raw.csv"), _path(data_dir, "features.csv")
+    with measure("features") as m:
+        if chunk_size:
+            rows = feature_engineering.build_features_chunked(raw, _path(data_dir, "no_store"), chunk_size, output)
+            m.rows(rows_in=rows, rows_out=rows)
+        else:
+            df = feature_engineering.build_features(pd.read_csv(raw))
+            df.to_csv(output, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+        m.read(raw)
+        m.wrote(output)
+
+
+def run_vader(data_dir, chunk_size, measure, requests):
+    import nlp_vader
+    raw, output, cache = _path(data_dir, "raw.csv"), _path(data_dir, "vader.csv"), _path(data_dir, "vader.sqlite")
+    _remove(cache)  # every run scores every text
+    with measure("vader") as m:
+        if chunk_size:
+            rows = nlp_vader.add_vader_chunked(raw, output, _path(data_dir, "no_store"), chunk_size, cache)
+            m.rows(rows_in=rows, rows_out=rows)
+        else:
+            df = nlp_vader.add_vader(pd.read_csv(raw), cache)
+            df.to_csv(output, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+        m.read(raw)
+        m.wrote(output)
+
+
+def run_topics(data_dir, chunk_size, measure, requests):
+    import nlp_topics
+    raw, output = _path(data_dir, "raw.csv"), _path(data_dir, "topics.csv")
+    rising_output = _path(data_dir, "rising.csv")
+    with measure("topics") as m:
+        if chunk_size:
+            rising = nlp_topics.topics_chunked(raw, chunk_size, None, csv_output=output,
+                                               store_dir=_path(data_dir, "no_store"))
+        else:
+            df = pd.read_csv(raw)
+            rising = nlp_topics.rising_topics(df, state_dir=None)
+            df = nlp_topics.add_topics(df, None)
+            df.to_csv(output, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+        rising.to_csv(rising_output, index=False, encoding="utf-8")
+        m.read(raw)
+        m.wrote(output, rising_output)
+
+
+def run_ai(data_dir, chunk_size, measure, requests):
+    import ai_recommendations
+    source, output = _path(data_dir, "vader.csv"), _path(data_dir, "ai.csv")
+    with measure("ai") as m:
+        if chunk_size:
+            rows = ai_recommendations.add_recommendations_chunked(source, output, chunk_size)
+            m.rows(rows_in=rows, rows_out=rows)
+        else:
+            df = ai_recommendations.add_recommendations(pd.read_csv(source))
+            df.to_csv(output, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+        m.read(source)
+        m.wrote(output)
+
+
+def run_extract(data_dir, chunk_size, measure, requests):
+    import extract_writer
+    source = _path(data_dir, "ai.csv")
+    hyper_file, parquet_dir = _path(data_dir, "extract.hyper"), _path(data_dir, "extract")
+    with measure("extract") as m:
+        if chunk_size:
+            rows = extract_writer.rebuild_extract_chunked(source, hyper_file, parquet_dir,
+                                                          _path(data_dir, "no_store"), chunk_size)
+            m.rows(rows_in=rows, rows_out=rows)
+        else:
+            df = pd.read_csv(source)
+            rows = extract_writer.rebuild_extract(df, hyper_file, parquet_dir, store_dir=_path(data_dir, "no_store"))
+            m.rows(rows_in=len(df), rows_out=rows)
+        m.read(source)
+        m.wrote(hyper_file if extract_writer.hyper_available() else parquet_dir)
+
+
+def api_workloads(df, requests, seed=0):
+    """
+    {endpoint: [(path, call kwargs), ...]} over the snapshot's hashtags and time range.
+    """
+    rng = np.random.default_rng(seed)
+    tags = df["hashtag"].dropna().unique()
+    first = pd.Timestamp(df["created_at"].min()).floor("h")
+    hours = max(1, int((pd.Timestamp(df["created_at"].max()) - first) / pd.Timedelta(hours=1)))
+
+    def window(hours_long):
+        start = first + pd.Timedelta(hours=int(rng.integers(0, hours)))
+        end = start + pd.Timedelta(hours=hours_long)
+        return f"start={start:%Y-%m-%dT%H:%M:%S}&end={end:%Y-%m-%dT%H:%M:%S}"
+
+    def tag():
+        return quote(str(tags[rng.integers(0, len(tags))]))
+
+    # /score: 100-tweet batches of unseen synthetic texts
+    model = synthetic.TweetModel(requests * 10, hashtags=50, days=1, seed=seed + 1)
+    batches = pd.concat([model.hour(h, 0) for h in range(24) if model.hour_rows[h]], ignore_index=True)
+    score_bodies = [
+        json.dumps({"tweets": batch[["text", "likes", "retweets", "hashtag"]].to_dict("records")}).encode()
+        for batch in np.array_split(batches, max(1, len(batches) // 100))
+    ]
+
+    return {
+        "/trends": [("/trends", {})] * requests,
+        "/recommendation": [(f"/recommendation/{tag()}", {}) for _ in range(requests)],
+        "/tweets (1h)": [(f"/tweets?hashtag={tag()}&{window(1)}&limit=100", {}) for _ in range(requests)],
+        "/tweets/top (1d)": [(f"/tweets/top?hashtag={tag()}&{window(24)}&k=10", {}) for _ in range(requests)],
+        "/snapshot": [("/snapshot", {})] * requests,
+        "/metrics": [("/metrics", {})] * requests,
+        "POST /score": [
+            ("/score", {"method": "POST", "body": body, "headers": [("content-type", "application/json")]})
+            for body in score_bodies
+        ]
+    }
+
+
+def run_api(data_dir, chunk_size, measure, requests):
+    from bench_hyper_api import call
+    import hyper_api
+    from snapshot import Snapshot
+    source = _path(data_dir, "ai.csv")
+
+    with measure("api load") as m:
+        df = pd.read_csv(source)
+        hyper_api.snapshots.current = Snapshot(df)
+        m.rows(rows_in=len(df), rows_out=len(df))
+        m.read(source)
+    hyper_api.scorer.warm()
+
+    async def run(calls):
+        latencies = []
+        for path, kwargs in calls:
+            start = time.perf_counter()
+            await call(hyper_api.app, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+        return np.array(latencies) * 1000
+
+    for endpoint, calls in api_workloads(df, requests).items():
+        asyncio.run(run(calls[:1]))  # warm-up: cache fills, lazy state
+        with measure(f"api {endpoint}") as m:
+            latencies = asyncio.run(run(calls))
+            m.rows(rows_in=len(calls))
+            m.extra.update(p50_ms=float(np.percentile(latencies, 50)), p99_ms=float(np.percentile(latencies, 99)))
+
+
+WORKERS = {
+    "json_to_csv": run_json_to_csv,
+    "features": run_features,
+    "vader": run_vader,
+    "topics": run_topics,
+    "ai": run_ai,
+    "extract": run_extract,
+    "api": run_api
+}
+
+
+def worker(stage_name, data_dir, chunk_size, requests):
+    """
+    Runs one stage and prints its records as JSON (last line of stdout).
+    """
+    records = []
+
+    @contextmanager
+    def measure(name):
+        with stage(name, script="bench_suite", metrics_file=_path(data_dir, "metrics.jsonl")) as m:
+            yield m
+        records.append((m, peak_rss_bytes()))  # process peak once the stage has run
+
+    WORKERS[stage_name](data_dir, chunk_size, measure, requests)
+    print(json.dumps([{
+        "stage": m.stage,
+        "seconds": m.wall_seconds,
+        "cpu_seconds": m.cpu_seconds,
+        "rows_in": m.rows_in,
+        "rows_out": m.rows_out,
+        "bytes_read": m.bytes_read,
+        "bytes_written": m.bytes_written,
+        "peak_rss_mb": peak / 2**20,
+        **m.extra
+    } for m, peak in records]))
+
+
+# -------------------------
+# Harness
+# -------------------------
+def run_stage(stage_name, data_dir, chunk_size, requests):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", stage_name, "--work", data_dir,
+               "--chunk-size", str(chunk_size or 0), "--requests", str(requests)]
+    result = subprocess.run(command, cwd=SCRIPTS_DIR, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(result, mode, rows):
+    summary = {"mode": mode, "seconds": round(result["seconds"], 4), "peak_rss_mb": round(result["peak_rss_mb"], 1)}
+    if "p99_ms" in result:
+        # API endpoint: rows_in counts requests
+        summary["requests_per_second"] = round(result["rows_in"] / result["seconds"], 1)
+        summary["p50_ms"] = round(result["p50_ms"], 3)
+        summary["p99_ms"] = round(result["p99_ms"], 3)
+    else:
+        # Stages that don't count their rows (chunked topics) read the whole dataset
+        summary["rows_per_second"] = round((result["rows_in"] or rows) / result["seconds"], 1)
+    return summary
+
+
+def compare(current, baseline, tolerance):
+    """
+    Returns (change text, [regressed metrics]) of current against its baseline entry.
+    """
+    if not baseline or baseline.get("mode") != current["mode"]:
+        return "no baseline", []
+    changes, regressed = [], []
+    for metric, direction in CHECKS.items():
+        if metric not in current or not baseline.get(metric):
+            continue
+        change = current[metric] / baseline[metric] - 1
+        changes.append(f"{metric.split('_')[0]} {change:+.0%}")
+        if (direction > 0 and change < -tolerance) or (direction < 0 and change > tolerance):
+            regressed.append(f"{metric} {change:+.0%}")
+    return ", ".join(changes), regressed
+
+
+def machine():
+    return {"python": platform.python_version(), "platform": f"{platform.system()}-{platform.machine()}",
+            "cpus": os.cpu_count(), "pandas": pd.__version__}
+
+
+def git_commit():
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BENCH_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return head + ("+dirty" if dirty else "")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10k,1m,10m", help="comma-separated row counts (k / m suffixes)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages")
+    parser.add_argument("--work", help="directory for generated data (reused across runs)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per API endpoint")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per stage below 1M rows (the fastest is kept); larger sizes run once")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-above", default="5m", help="sizes from here run the chunked stage variants")
+    parser.add_argument("--hashtags", type=int, default=200)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.work, args.chunk_size or None, args.requests)
+        return
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    for name in list(stages):  # prerequisites run first
+        while REQUIRES.get(name) and REQUIRES[name] not in stages:
+            name = REQUIRES[name]
+            stages.append(name)
+    stages = [s for s in STAGES if s in stages]
+
+    baseline = {"machine": machine(), "results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != machine() and not args.save_baseline:
+            print(f"⚠️ baseline was recorded on {baseline.get('machine')}; comparisons are indicative only")
+
+    commit = git_commit()  # before the run writes anything
+    work = args.work or tempfile.mkdtemp(prefix="trendpulse_bench_")
+    chunk_above = parse_size(args.chunk_above)
+    results, failures, regressions, compared = {}, [], [], 0
+
+    for rows in [parse_size(s) for s in args.sizes.split(",")]:
+        label = size_label(rows)
+        data_dir = os.path.join(work, label)
+        os.makedirs(data_dir, exist_ok=True)
+        options = {"hashtags": args.hashtags}
+
+        start = time.perf_counter()
+        if not os.path.exists(_path(data_dir, "raw.csv")):
+            synthetic.write_csv(_path(data_dir, "raw.csv"), rows, **options)
+        if "json_to_csv" in stages and not os.path.isdir(_path(data_dir, "jsonl")):
+            # Generated aside and renamed, so an interrupted run never leaves a partial store to reuse
+            tmp_dir = _path(data_dir, "jsonl.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            synthetic.write_jsonl(tmp_dir, rows, **options)
+            os.replace(tmp_dir, _path(data_dir, "jsonl"))
+        print(f"\n{label} tweets ({rows:,} rows, data ready in {time.perf_counter() - start:.0f}s → {data_dir})")
+        print(f"{'stage':<22}{'mode':<11}{'throughput':>16}{'peak RSS':>11}{'p99 (ms)':>10}{'time (s)':>10}  vs baseline")
+
+        chunk_size = args.chunk_size if rows >= chunk_above else None
+        results[str(rows)] = {}
+        for name in stages:
+            mode = "chunked" if chunk_size and name in CHUNKED_STAGES else "in-memory"
+            try:
+                runs = [run_stage(name, data_dir, chunk_size if mode == "chunked" else None, args.requests)
+                        for _ in range(args.repeat if rows < STABLE_ROWS else 1)]
+            except RuntimeError as e:
+                failures.append(f"{label} {name}: {e}")
+                print(f"{name:<22}{mode:<11}FAILED: {e}")
+                continue
+
+            for i, result in enumerate(runs[0]):
+                fastest = min((run[i] for run in runs), key=lambda r: r["seconds"])
+                summary = summarize(fastest, mode, rows)
+                summary["peak_rss_mb"] = round(min(run[i]["peak_rss_mb"] for run in runs), 1)
+                results[str(rows)][result["stage"]] = summary
+
+                change, regressed = compare(summary, baseline["results"].get(str(rows), {}).get(result["stage"]),
+                                            args.tolerance)
+                regressions += [f"{label} {result['stage']}: {r}" for r in regressed]
+                compared += change != "no baseline"
+                if "requests_per_second" in summary:
+                    throughput = f"{summary['requests_per_second']:,.0f} req/s"
+                else:
+                    throughput = f"{summary['rows_per_second']:,.0f} rows/s"
+                p99 = f"{summary['p99_ms']:.2f}" if "p99_ms" in summary else ""
+                flag = "  ⚠️ REGRESSION" if regressed else ""
+                print(f"{result['stage']:<22}{mode:<11}{throughput:>16}{summary['peak_rss_mb']:>8.0f} MB"
+                      f"{p99:>10}{summary['seconds']:>10.2f}  {change}{flag}", flush=True)
+
+    if args.save_baseline:
+        baseline["machine"] = machine()
+        baseline["results"].update(results)
+        baseline.setdefault("commits", {}).update({rows: commit for rows in results})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"\n✅ Baseline saved → {args.baseline}")
+    if failures or regressions:
+        print("\n⚠️ " + "\n⚠️ ".join(failures + regressions))
+        if not args.save_baseline:
+            sys.exit(1)
+    elif not args.save_baseline and compared:
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} of the baseline ({compared} results compared)")
+    elif not args.save_baseline:
+        print("\n⚠️ No baseline results for these sizes; store one with --save-baseline")
+
+
+if __name__ == "__main__":
+    main()
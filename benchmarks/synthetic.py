@@ -0,0 +1,226 @@
+"""
+TrendPredict – Synthetic Tweet Generator
+Description:
+Generates tweets in the raw schema (json_to_csv.expected_columns) at any scale,
+with distributions closer to live traffic than the 360-row demo set:
+
+- hashtags:     Zipf-like popularity (a few tags carry most of the volume)
+- timestamps:   daily cycle (afternoon peak, night trough), quieter weekends,
+                and bursts where one hashtag trends for a few hours
+- engagement:   heavy-tailed (lognormal) likes per hashtag, retweets a fraction
+                of likes; bursting hashtags get more of both; about one tweet
+                in 100K goes viral (200K–5M likes, momentum far above 2^17)
+- locations:    weighted cities, about one tweet in five without a location
+- text:         hashtag-specific topic words, filler, a tone word (positive /
+                neutral / negative), and sometimes a mention, link or emoji
+
+sentiment is drawn from the tone (it is not TextBlob's score of the text).
+momentum, momentum_status and sentiment_category come from rules.py.
+By default the VADER columns are left out, as in the raw CSV, so nlp_vader.py
+scores every row. --with-vader adds sentiment_vader (drawn from the tone) and its
+category, like tweets scored at ingestion.
+
+Each hour is generated from its own seed, so the output depends only on the
+arguments and not on the chunk size. Chunks are written as they are made,
+so memory stays bounded at any row count.
+
+Usage:
+    python benchmarks/synthetic.py --rows 1000000 --out tweets.csv [--jsonl DIR]
+                                   [--hashtags 200] [--days 7] [--seed 42] [--with-vader]
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import rules  # noqa: E402
+from chunked import CHUNK_SIZE, write_chunks  # noqa: E402
+from json_to_csv import expected_columns, vader_columns  # noqa: E402
+from jsonl_store import append_records  # noqa: E402
+
+START = pd.Timestamp("2026-01-01")
+FIRST_TWEET_ID = 10**18
+
+NAMED_TAGS = ["#AI", "#Python", "#DataScience", "#MachineLearning", "#Crypto", "#WorldCup", "#Elections",
+              "#Climate", "#Gaming", "#Music", "#Startups", "#Cloud", "#Cybersecurity", "#Marketing", "#Fitness"]
+TOPIC_WORDS = np.array((
+    "model data python cloud launch release update api chip gpu training agent benchmark open source "
+    "market price token wallet exchange rally match goal team coach league final vote poll debate "
+    "policy campaign carbon energy solar storm heat game console stream patch album tour concert "
+    "single funding founder product pitch growth server outage deploy kubernetes breach malware patch "
+    "phishing brand campaign audience reach workout run marathon diet coffee city weekend live"
+).split(), dtype=object)
+FILLER_WORDS = np.array("the new just this our today now really about with more thread week big first".split(),
+                        dtype=object)
+TONE_WORDS = {
+    "positive": "love great amazing awesome excellent happy best incredible fantastic win",
+    "neutral": "announced report update news schedule details version notes available",
+    "negative": "hate awful terrible broken worst sad crash fail disappointing angry"
+}
+TONE_WORDS = {tone: np.array(words.split(), dtype=object) for tone, words in TONE_WORDS.items()}
+TONES = list(TONE_WORDS)
+TONE_SHARE = [0.45, 0.35, 0.20]
+EXTRAS = np.array(["", "", "", "", "", " @trendpulse", " @news", " https://t.co/x7Yq2",
+                   " 🚀", " 🔥", " 😂", " !!!"], dtype=object)  # mostly nothing
+MINUTE_SECOND = np.array([f"{s // 60:02d}:{s % 60:02d}" for s in range(3600)], dtype=object)
+LOCATIONS = ["London", "New York", "Paris", "Berlin", "Tokyo", "San Francisco", "Toronto", "Sydney",
+             "Mumbai", "São Paulo", "Lagos", "Madrid", None]
+LOCATION_SHARE = np.array([13, 13, 8, 7, 8, 8, 5, 4, 6, 4, 3, 3, 18], dtype=float) / 100
+VIRAL_SHARE = 1e-5
+VIRAL_LIKES = (200_000, 5_000_000)
+
+
+class TweetModel:
+    """
+    Fixed parameters of one synthetic dataset: hashtag popularity and topics,
+    hourly volume, and bursts. Rows are generated hour by hour from it.
+    """
+
+    def __init__(self, rows, hashtags=200, days=7, seed=42):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.tags = np.array((NAMED_TAGS + [f"#topic{i}" for i in range(hashtags)])[:hashtags], dtype=object)
+        popularity = 1.0 / np.arange(1, hashtags + 1) ** 1.1
+        self.popularity = popularity / popularity.sum()
+        self.tag_words = rng.integers(0, len(TOPIC_WORDS), (hashtags, 8))
+        self.tag_likes_mu = rng.normal(4.0, 0.4, hashtags)
+
+        # Hourly volume: afternoon peak, night trough, quieter weekends
+        hours = np.arange(days * 24)
+        when = START + pd.to_timedelta(hours, unit="h")
+        weight = (1 + 0.6 * np.cos(2 * np.pi * (when.hour.to_numpy() - 15) / 24)) \
+            * np.where(when.dayofweek >= 5, 0.85, 1.0)
+
+        # Bursts: one hashtag gets 8x its share for 2–6 hours
+        self.bursts = np.zeros((len(hours), hashtags))
+        for _ in range(max(1, hashtags // 20)):
+            tag, start, length = rng.integers(0, hashtags), rng.integers(0, len(hours)), rng.integers(2, 7)
+            self.bursts[start:start + length, tag] = 7.0
+        weight = weight * (1 + self.bursts @ self.popularity)
+
+        self.hour_rows = rng.multinomial(rows, weight / weight.sum())
+
+    def hour(self, h, first_id, with_vader=False):
+        n = int(self.hour_rows[h])
+        rng = np.random.default_rng([self.seed, h])
+        share = self.popularity * (1 + self.bursts[h])
+        tag = rng.choice(len(self.tags), n, p=share / share.sum())
+        bursting = self.bursts[h, tag] > 0
+
+        seconds = np.sort(rng.integers(0, 3600, n))
+        created = (START + pd.Timedelta(hours=h)).strftime("%Y-%m-%d %H:") + MINUTE_SECOND[seconds]
+
+        tone = rng.choice(len(TONES), n, p=TONE_SHARE)
+        sentiment = np.select(
+            [tone == 0, tone == 1],
+            [rng.uniform(0.1, 1.0, n), np.clip(rng.normal(0, 0.04, n), -0.099, 0.099)],
+            rng.uniform(-1.0, -0.1, n)
+        ).round(3)
+
+        # Text: filler / topic words around one tone word, then the hashtag and maybe an extra
+        words = TOPIC_WORDS[self.tag_words[tag[:, None], rng.integers(0, 8, (n, 6))]]
+        filler = FILLER_WORDS[rng.integers(0, len(FILLER_WORDS), (n, 4))]
+        tone_word = np.empty(n, dtype=object)
+        for i, name in enumerate(TONES):
+            mask = tone == i
+            tone_word[mask] = TONE_WORDS[name][rng.integers(0, len(TONE_WORDS[name]), mask.sum())]
+        parts = [filler[:, 0], words[:, 0], words[:, 1], filler[:, 1], tone_word, words[:, 2], filler[:, 2],
+                 words[:, 3], words[:, 4], filler[:, 3], words[:, 5], self.tags[tag]]
+        text = parts[0]
+        for part in parts[1:]:
+            text = text + " " + part
+        text = text + EXTRAS[rng.integers(0, len(EXTRAS), n)]
+
+        likes = np.floor(rng.lognormal(self.tag_likes_mu[tag] + np.where(bursting, 1.1, 0.0), 1.0)).astype(np.int64)
+        retweets = rng.binomial(likes, rng.beta(2, 8, n)).astype(np.int64)
+
+        # Viral tweets come from their own stream, so the other columns do not depend on them
+        viral_rng = np.random.default_rng([self.seed, h, 1])
+        viral = viral_rng.random(n) < VIRAL_SHARE
+        likes[viral] = viral_rng.integers(*VIRAL_LIKES, viral.sum())
+        retweets[viral] = viral_rng.binomial(likes[viral], 0.2)
+
+        df = pd.DataFrame({
+            "tweet_id": np.arange(first_id, first_id + n, dtype=np.int64),
+            "created_at": created,
+            "text": text,
+            "likes": likes,
+            "retweets": retweets,
+            "sentiment": sentiment,
+            "hashtag": self.tags[tag],
+            "user_location": rng.choice(np.array(LOCATIONS, dtype=object), n, p=LOCATION_SHARE)
+        })
+        df["sentiment_category"] = rules.sentiment_category(df["sentiment"])
+        df["momentum"] = rules.momentum_score(df["likes"], df["retweets"], df["sentiment"])
+        df["momentum_status"] = rules.momentum_status(df["momentum"])
+        if with_vader:
+            df["sentiment_vader"] = np.clip(sentiment * 0.9 + rng.normal(0, 0.15, n), -1, 1).round(4)
+            df["sentiment_vader_category"] = rules.vader_category(df["sentiment_vader"])
+        return df
+
+
+def generate(rows, hashtags=200, days=7, seed=42, with_vader=False, chunk_size=CHUNK_SIZE):
+    """
+    Yields the synthetic tweets, oldest first, as DataFrames of about chunk_size
+    rows (whole hours) in the expected_columns order (plus vader_columns with with_vader).
+    """
+    model = TweetModel(rows, hashtags, days, seed)
+    columns = expected_columns + (vader_columns if with_vader else [])
+    frames, buffered, next_id = [], 0, FIRST_TWEET_ID
+
+    for h in range(len(model.hour_rows)):
+        if not model.hour_rows[h]:
+            continue
+        frames.append(model.hour(h, next_id, with_vader))
+        next_id += len(frames[-1])
+        buffered += len(frames[-1])
+        if buffered >= chunk_size:
+            yield pd.concat(frames, ignore_index=True)[columns]
+            frames, buffered = [], 0
+    if frames:
+        yield pd.concat(frames, ignore_index=True)[columns]
+
+
+def write_csv(csv_file, rows, **options):
+    """
+    Writes the synthetic tweets as a raw CSV (like json_to_csv.py's output). Returns the row count.
+    """
+    return write_chunks(generate(rows, **options), csv_file)
+
+
+def write_jsonl(store_dir, rows, **options):
+    """
+    Appends the synthetic tweets to a JSONL store (like fetch_twitter_data.py). Returns the row count.
+    """
+    written = 0
+    for df in generate(rows, **options):
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        append_records(records, store_dir)
+        written += len(records)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", required=True, help="CSV to write")
+    parser.add_argument("--jsonl", help="also append the tweets to this JSONL store directory")
+    parser.add_argument("--hashtags", type=int, default=200)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--with-vader", action="store_true", help="fill sentiment_vader from the tone")
+    args = parser.parse_args()
+
+    options = {"hashtags": args.hashtags, "days": args.days, "seed": args.seed, "with_vader": args.with_vader}
+    rows = write_csv(args.out, args.rows, **options)
+    print(f"✅ {rows:,} synthetic tweets → {args.out} ({os.path.getsize(args.out) / 1e6:.0f} MB)")
+    if args.jsonl:
+        write_jsonl(args.jsonl, args.rows, **options)
+        print(f"✅ {rows:,} synthetic tweets → {args.jsonl}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,49 +6,195 @@ Reads existing Twitter/X data CSV (with momentum and sentiment_vader)
 and generates AI-powered recommendations based on trend momentum and sentiment.
 Uses percentiles to scale momentum and ensure diverse recommendations.
 Adds a new column: ai_recommendation for Tableau dashboards.
+
+Modes:
+- default:        rank momentum over the full dataset (exact percentiles, every row relabeled)
+- --incremental:  score only tweets added since the last run against a persisted
+                  momentum sketch (see quantile_sketch.py) and append them to the
+                  output; historical rows keep the labels they were given and are
+                  not re-read (the input is read from the sketch's saved offset)
+- --chunk-size:   exact percentiles in bounded memory: one pass collects the
+                  momentum column (float64), a second pass labels chunk by chunk
 """
 
+import argparse
+import io
+import os
+import numpy as np
 import pandas as pd
+import rules
+from chunked import CHUNK_SIZE, read_csv_chunks, widen, write_chunks
+from instrumentation import path_size, stage
 
 # -------------------------
 # Configuration
 # -------------------------
 CSV_INPUT = "../data/twitter_trends_vader.csv"  # CSV with sentiment_vader
 CSV_OUTPUT = "../data/twitter_trends_ai.csv"
+SKETCH_FILE = "../data/momentum_sketch.npz"
 
 # -------------------------
-# Load CSV
+# Momentum percentile + recommendations
 # -------------------------
-df = pd.read_csv(CSV_INPUT)
+def add_recommendations(df):
+    """
+    Returns a copy of df with momentum_pct and ai_recommendation columns.
+    """
+    df = df.copy()
+
+    # Compute momentum percentile
+    df["momentum_pct"] = df["momentum"].rank(pct=True)
+
+    # Apply recommendations (vectorized rules, see rules.py)
+    df["ai_recommendation"] = rules.recommendation(df["momentum_pct"], df["sentiment_vader"])
+    return df
+
+
+def score_new(df, sketch):
+    """
+    Folds new tweets into the momentum sketch, then returns them with
+    momentum_pct and ai_recommendation estimated from the sketch (O(log k) per tweet).
+    """
+    df = df.copy()
+    sketch.update(df)
+    df["momentum_pct"] = sketch.percentile(df["momentum"].to_numpy())
+    df["ai_recommendation"] = rules.recommendation(df["momentum_pct"], df["sentiment_vader"])
+    return df
+
 
 # -------------------------
-# Compute momentum percentile
+# Chunked path
 # -------------------------
-df["momentum_pct"] = df["momentum"].rank(pct=True)
+def rank_pct(sorted_values, values):
+    """
+    rank(pct=True) of values within sorted_values (average rank for ties, NaN stays NaN).
+    """
+    below = np.searchsorted(sorted_values, values, side="left")
+    at_or_below = np.searchsorted(sorted_values, values, side="right")
+    pct = (below + (at_or_below - below + 1) / 2) / len(sorted_values)
+    return np.where(np.isnan(values), np.nan, pct)
+
+
+def add_recommendations_chunked(csv_input=CSV_INPUT, csv_output=CSV_OUTPUT, chunk_size=CHUNK_SIZE):
+    """
+    add_recommendations() over the history one chunk at a time. The only state
+    kept across chunks is the sorted momentum column. Returns the number of rows written.
+    """
+    momentum = np.concatenate([
+        chunk["momentum"].to_numpy() for chunk in read_csv_chunks(csv_input, chunk_size, ["momentum"])
+    ])
+    momentum = np.sort(momentum[~np.isnan(momentum)])
+
+    def label(chunk):
+        pct = rank_pct(momentum, chunk["momentum"].to_numpy())
+        chunk = widen(chunk)
+        chunk["momentum_pct"] = pct
+        chunk["ai_recommendation"] = rules.recommendation(chunk["momentum_pct"], chunk["sentiment_vader"])
+        return chunk
+
+    return write_chunks((label(chunk) for chunk in read_csv_chunks(csv_input, chunk_size)), csv_output)
+
 
 # -------------------------
-# Recommendation function
+# Incremental path
 # -------------------------
-def recommendation(row):
-    momentum_pct = row["momentum_pct"]
-    sentiment = row["sentiment_vader"]
+def read_csv_since(csv_input, offset=None, tail=None):
+    """
+    Rows of csv_input after byte `offset` (None: every row), up to the last
+    complete line. The history before `offset` is never parsed; `tail`, the line
+    that ended there last time, is compared in place instead, and None is
+    returned if it changed (the file was rewritten with other rows).
+    Returns (df, end offset, last line read).
+    """
+    with open(csv_input, "rb") as f:
+        header = f.readline()
+        if offset is None:
+            offset, tail = f.tell(), header
+        else:
+            if offset < max(len(tail), len(header)):
+                return None
+            f.seek(offset - len(tail))
+            if f.read(len(tail)) != tail:
+                return None
+        data = f.read()
+    complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+    body = data[:complete]
+    if body:
+        tail = body[body.rfind(b"\n", 0, len(body) - 1) + 1:]
+    return pd.read_csv(io.BytesIO(header + body)), offset + complete, tail
 
-    if momentum_pct > 0.75 and sentiment > 0.3:
-        return "Launch marketing campaign now"
-    elif momentum_pct > 0.5:
-        return "Monitor closely – trend emerging"
-    elif sentiment < -0.1:
-        return "Reputation risk – investigate"
+
+def update_recommendations(csv_input=CSV_INPUT, csv_output=CSV_OUTPUT, sketch_file=SKETCH_FILE):
+    """
+    Scores the rows added to csv_input since the last run and appends them to
+    csv_output, reading only those rows (the sketch keeps the input offset it
+    has folded in). nlp_vader.py rewrites csv_input in full on every run; this
+    works because the rewrite reproduces the earlier rows byte for byte (same
+    order, cached scores), which the check of the line at the saved offset
+    relies on. Without a consistent sketch and output (first run, a rewrite
+    that changed earlier rows, or either file changed outside this script)
+    everything is rebuilt with exact percentiles.
+    Returns (rows written, whether the output was rebuilt).
+    """
+    from quantile_sketch import MomentumPercentiles
+
+    sketch = MomentumPercentiles(sketch_file)
+    since = None
+    if (
+        sketch.rows > 0
+        and sketch.input_offset is not None
+        and os.path.exists(csv_output)
+        and os.path.getsize(csv_output) == sketch.output_size
+    ):
+        since = read_csv_since(csv_input, sketch.input_offset, sketch.input_tail)
+
+    if since is not None:
+        df, offset, tail = since
+        new = score_new(df, sketch)
+        new.to_csv(csv_output, mode="a", header=False, index=False, encoding="utf-8")
     else:
-        return "No action needed"
+        df, offset, tail = read_csv_since(csv_input)
+        sketch.reset()
+        sketch.update(df)
+        new = add_recommendations(df)
+        new.to_csv(csv_output, index=False, encoding="utf-8")
 
-# -------------------------
-# Apply recommendations
-# -------------------------
-df["ai_recommendation"] = df.apply(recommendation, axis=1)
+    # Saved after the output, so a crash in between is caught by the size check
+    sketch.input_offset, sketch.input_tail = offset, tail
+    sketch.output_size = os.path.getsize(csv_output)
+    sketch.save()
+    return len(new), since is None
 
-# -------------------------
-# Save output CSV
-# -------------------------
-df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
-print(f"✅ AI recommendations added → {CSV_OUTPUT} ({len(df)} rows)")
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse AI recommendations")
+    parser.add_argument("--incremental", action="store_true",
+                        help="score only new tweets against the persisted momentum sketch")
+    parser.add_argument("--chunk-size", type=int, help="process the history in chunks of this many rows")
+    args = parser.parse_args()
+    if args.chunk_size and args.incremental:
+        parser.error("--incremental already reads only new rows; drop --chunk-size")
+
+    with stage("recommendations") as m:
+        if args.chunk_size:
+            m.read(CSV_INPUT)
+            rows = add_recommendations_chunked(chunk_size=args.chunk_size)
+            m.rows(rows_in=rows, rows_out=rows)
+            m.wrote(CSV_OUTPUT)
+            print(f"✅ AI recommendations added → {CSV_OUTPUT} ({rows} rows, chunks of {args.chunk_size})")
+        elif args.incremental:
+            # Only the tweets added since the last run are read
+            output_size = path_size(CSV_OUTPUT)
+            written, rebuilt = update_recommendations()
+            m.rows(rows_in=written, rows_out=written)
+            m.bytes_written = path_size(CSV_OUTPUT) - (0 if rebuilt else output_size)
+            print(f"✅ AI recommendations updated → {CSV_OUTPUT} ({written} new rows)")
+        else:
+            m.read(CSV_INPUT)
+            df = add_recommendations(pd.read_csv(CSV_INPUT))
+
+            # Save output CSV
+            df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+            m.wrote(CSV_OUTPUT)
+            print(f"✅ AI recommendations added → {CSV_OUTPUT} ({len(df)} rows)")
@@ -0,0 +1,132 @@
+"""
+TrendPredict – Chunked (Out-of-Core) Execution Helpers
+Author: Chaimaa Nairi
+Description:
+Shared reading / writing for the --chunk-size mode of the pipeline scripts.
+A stage run with --chunk-size holds one chunk of tweets plus its own small
+cross-chunk state instead of the whole history.
+
+- Chunks are read with explicit compact dtypes: int64 IDs and counts, float32
+  sentiment scores, and categorical hashtag / user_location / *_category
+  columns. The text column stays object and is the part chunking keeps bounded.
+- float32 cannot hold values like 0.1 exactly, and the rules compare scores
+  against thresholds such as 0.1 and 0.3. widen() restores the float64 values
+  that were stored (scores carry a fixed number of decimals) before any rule runs.
+  That only works for the sentiment scores, which lie in [-1, 1]: momentum is
+  unbounded, and above 2^17 float32 cannot tell 2-decimal values apart, so
+  momentum / momentum_score stay float64.
+- Outputs are written chunk by chunk to a temp file and swapped in atomically.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from segment_store import STORE_DIR, load_manifest, store_exists
+
+# -------------------------
+# Configuration
+# -------------------------
+CHUNK_SIZE = 100_000
+
+# Decimals each float32 score column is stored with (see rules.py / sentiment_stage.py).
+# Only scores bounded by [-1, 1] belong here; widen() cannot recover larger values.
+SCORE_DECIMALS = {
+    "sentiment": 3,        # TextBlob polarity, rounded at ingestion
+    "sentiment_vader": 4   # VADER compound
+}
+FLOAT64_COLUMNS = ["momentum", "momentum_score"]  # unbounded engagement scores
+INT_COLUMNS = ["tweet_id", "likes", "retweets"]
+CATEGORY_COLUMNS = [
+    "hashtag",
+    "user_location",
+    "sentiment_category",
+    "sentiment_vader_category",
+    "momentum_status"
+]
+
+
+def compact_dtypes(columns):
+    """
+    {column: dtype} for the given columns that have a compact dtype.
+    """
+    dtypes = {name: "int64" for name in INT_COLUMNS}
+    dtypes.update({name: "float32" for name in SCORE_DECIMALS})
+    dtypes.update({name: "float64" for name in FLOAT64_COLUMNS})
+    dtypes.update({name: "category" for name in CATEGORY_COLUMNS})
+    return {name: dtypes[name] for name in columns if name in dtypes}
+
+
+def compact(df):
+    return df.astype(compact_dtypes(df.columns))
+
+
+def widen(df):
+    """
+    Returns df with float32 score columns back in float64, at the values they were stored with.
+    """
+    widened = {
+        name: df[name].astype(np.float64).round(decimals)
+        for name, decimals in SCORE_DECIMALS.items()
+        if name in df and df[name].dtype == np.float32
+    }
+    return df.assign(**widened) if widened else df
+
+
+# -------------------------
+# Reading
+# -------------------------
+def read_csv_chunks(csv_file, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Yields the CSV as DataFrames of at most chunk_size rows with compact dtypes.
+    """
+    header = pd.read_csv(csv_file, nrows=0).columns
+    usecols = [c for c in header if c in columns] if columns is not None else None
+    yield from pd.read_csv(
+        csv_file,
+        usecols=usecols,
+        dtype=compact_dtypes(usecols if usecols is not None else header),
+        chunksize=chunk_size
+    )
+
+
+def read_store_chunks(store_dir=STORE_DIR, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Yields the segment store snapshot in manifest order, segments grouped
+    into chunks of about chunk_size rows.
+    """
+    frames, rows = [], 0
+    for segment in load_manifest(store_dir)["segments"]:
+        frames.append(pd.read_parquet(os.path.join(store_dir, segment["path"]), columns=columns))
+        rows += len(frames[-1])
+        if rows >= chunk_size:
+            yield compact(pd.concat(frames, ignore_index=True))
+            frames, rows = [], 0
+    if frames:
+        yield compact(pd.concat(frames, ignore_index=True))
+
+
+def read_trend_chunks(csv_file, store_dir=STORE_DIR, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Chunked read_trends(): the segment store when it exists, otherwise the CSV.
+    """
+    if store_exists(store_dir):
+        return read_store_chunks(store_dir, chunk_size, columns)
+    return read_csv_chunks(csv_file, chunk_size, columns)
+
+
+# -------------------------
+# Writing
+# -------------------------
+def write_chunks(chunks, csv_file):
+    """
+    Writes an iterable of DataFrames as one CSV (header from the first chunk),
+    replacing csv_file only once every chunk is written. Returns the row count.
+    """
+    tmp_path = csv_file + ".tmp"
+    rows = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, header=i == 0, index=False)
+            rows += len(chunk)
+    os.replace(tmp_path, csv_file)
+    return rows
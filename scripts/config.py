@@ -2,4 +2,5 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
\ No newline at end of file
+BEARER_TOKEN = os.getenv("BEARER_TOKEN")
+FEED_TOKEN = os.getenv("FEED_TOKEN")  # shared secret for POST /feed/batches (see hyper_api.py)
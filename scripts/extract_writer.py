@@ -0,0 +1,346 @@
+"""
+TrendPredict – Tableau Extract Writer
+Author: Chaimaa Nairi
+Description:
+Writes typed Tableau extracts so the workbook no longer re-parses CSVs
+(and round-trips created_at through strings) on every refresh.
+
+- With the Tableau Hyper API installed (tableauhyperapi), tweets go into a
+  .hyper extract (table "Extract"."Extract") with typed columns.
+- Without it, the same typed columns go into a Parquet segment store
+  (see segment_store.py) as a local columnar fallback, one unpartitioned
+  segment per append: the extract is only read whole, so splitting a batch
+  per hashtag × hour would just multiply small files.
+- sync_extract() appends the segment-store segments the extract hasn't received
+  yet. Both store writers call it after appending (the micro-batch loop and
+  json_to_csv.py's store sync), so the live extract follows every ingestion path.
+  Existing rows are never rewritten, so refresh cost stays flat as history grows.
+- Store rows are enriched like the AI CSV before they are appended: VADER
+  scores for rows not scored at ingestion (cached, see nlp_vader.py), and
+  momentum_pct / ai_recommendation from the saved momentum sketch, as
+  ai_recommendations.py --incremental scores new tweets. Until that sketch
+  exists (first --incremental run) those two columns are NULL for live rows.
+- The number of store segments received is committed together with the rows
+  (in the extract's manifest, or in the .hyper file's "Extract"."Sync" table in
+  the same transaction), so a failed or repeated sync never duplicates rows.
+- Running this script rebuilds the extract from the full AI-enriched CSV, then
+  appends (enriched) the store rows the CSV does not have yet: the CSV is only
+  as recent as the last AI run. Every store segment committed before the
+  rebuild is then received. With --chunk-size, the CSV is read and appended
+  that many rows at a time (bounded memory, see chunked.py).
+- A rebuild writes a new extract next to the live one (.tmp file / .new
+  directory) and swaps it in once complete, so a failed rebuild leaves the
+  previous extract and its position untouched.
+"""
+
+import argparse
+import os
+import shutil
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import rules
+from chunked import CHUNK_SIZE, read_csv_chunks, widen
+from nlp_vader import add_vader
+from quantile_sketch import SKETCH_FILE, MomentumPercentiles
+from segment_store import STORE_DIR, append_segment, load_manifest, read_segments_since
+from file_lock import file_lock
+from instrumentation import stage
+
+try:
+    from tableauhyperapi import (
+        Connection, CreateMode, HyperProcess, Inserter, SqlType,
+        TableDefinition, TableName, Telemetry
+    )
+except ImportError:
+    HyperProcess = None
+
+# -------------------------
+# Configuration
+# -------------------------
+CSV_FILE = "../data/twitter_trends_ai.csv"
+HYPER_FILE = "../data/twitter_trends.hyper"
+PARQUET_DIR = "../data/twitter_trends_extract"  # fallback when tableauhyperapi is missing
+POSITION_KEY = "store_segments"  # store segments the extract has received
+
+# Extract columns and their types; columns missing from a batch are written as NULL
+EXTRACT_SCHEMA = {
+    "tweet_id": "int",
+    "created_at": "timestamp",
+    "text": "text",
+    "likes": "int",
+    "retweets": "int",
+    "sentiment": "double",
+    "sentiment_category": "text",
+    "hashtag": "text",
+    "momentum": "double",
+    "momentum_status": "text",
+    "user_location": "text",
+    "sentiment_vader": "double",
+    "sentiment_vader_category": "text",
+    "momentum_pct": "double",
+    "ai_recommendation": "text"
+}
+
+
+def hyper_available():
+    return HyperProcess is not None
+
+
+# -------------------------
+# Typing
+# -------------------------
+def typed_frame(df):
+    """
+    Casts a batch to the extract schema (nullable ints, floats, timestamps, strings).
+    """
+    out = pd.DataFrame(index=df.index)
+    for column, kind in EXTRACT_SCHEMA.items():
+        values = df[column] if column in df else pd.Series(None, index=df.index, dtype=object)
+        if kind == "int":
+            out[column] = pd.to_numeric(values).astype("Int64")
+        elif kind == "double":
+            out[column] = pd.to_numeric(values).astype("float64")
+        elif kind == "timestamp":
+            out[column] = pd.to_datetime(values)
+        else:
+            out[column] = values.astype("string")
+    return out.reset_index(drop=True)
+
+
+# -------------------------
+# Enrichment
+# -------------------------
+def enrich(df, sketch_file=SKETCH_FILE):
+    """
+    Returns store rows with the AI CSV's columns filled in. The sketch is only
+    read: ai_recommendations.py folds these tweets in when it reaches them.
+    """
+    if df.empty:
+        return df
+    df = add_vader(df)
+    sketch = MomentumPercentiles(sketch_file)
+    if sketch.overall.n:
+        df["momentum_pct"] = sketch.percentile(df["momentum"].to_numpy())
+        df["ai_recommendation"] = rules.recommendation(df["momentum_pct"], df["sentiment_vader"])
+    return df
+
+
+# -------------------------
+# .hyper backend
+# -------------------------
+def _table_definition():
+    sql_types = {
+        "int": SqlType.big_int(),
+        "double": SqlType.double(),
+        "timestamp": SqlType.timestamp(),
+        "text": SqlType.text()
+    }
+    return TableDefinition(
+        table_name=TableName("Extract", "Extract"),
+        columns=[TableDefinition.Column(name, sql_types[kind]) for name, kind in EXTRACT_SCHEMA.items()]
+    )
+
+
+def _sync_table_definition():
+    return TableDefinition(
+        table_name=TableName("Extract", "Sync"),
+        columns=[TableDefinition.Column(POSITION_KEY, SqlType.big_int())]
+    )
+
+
+def _hyper_rows(typed):
+    # Python values for the Inserter: NULLs as None, timestamps as datetime
+    columns = []
+    for column, kind in EXTRACT_SCHEMA.items():
+        values = typed[column].tolist()
+        if kind == "timestamp":
+            columns.append([None if pd.isna(v) else v.to_pydatetime() for v in values])
+        else:
+            columns.append([None if pd.isna(v) else v for v in values])
+    return zip(*columns)
+
+
+@contextmanager
+def _hyper_connection(path, create_mode):
+    # One Hyper server and connection for a whole sync or rebuild
+    with HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hyper:
+        with Connection(endpoint=hyper.endpoint, database=path, create_mode=create_mode) as connection:
+            connection.catalog.create_schema_if_not_exists("Extract")
+            connection.catalog.create_table_if_not_exists(_table_definition())
+            connection.catalog.create_table_if_not_exists(_sync_table_definition())
+            yield connection
+
+
+def _hyper_position(connection):
+    sync_table = _sync_table_definition().table_name
+    return int(connection.execute_scalar_query(f"SELECT COALESCE(MAX({POSITION_KEY}), 0) FROM {sync_table}"))
+
+
+def _hyper_append(connection, typed, position=None):
+    # The rows and the new position (if given) are written in one transaction
+    sync_table = _sync_table_definition().table_name
+    connection.execute_command("BEGIN TRANSACTION")
+    try:
+        if len(typed):
+            with Inserter(connection, _table_definition()) as inserter:
+                inserter.add_rows(_hyper_rows(typed))
+                inserter.execute()
+        if position is not None:
+            connection.execute_command(f"DELETE FROM {sync_table}")
+            connection.execute_command(f"INSERT INTO {sync_table} VALUES ({int(position)})")
+        connection.execute_command("COMMIT")
+    except BaseException:
+        connection.execute_command("ROLLBACK")
+        raise
+    return len(typed)
+
+
+# -------------------------
+# Public API
+# -------------------------
+def _lock_path(hyper_file, parquet_dir):
+    return (hyper_file if hyper_available() else parquet_dir.rstrip("/\\")) + ".lock"
+
+
+def _finish_swap(parquet_dir):
+    # A rebuild that stopped between its two renames (see _rebuild()) left the
+    # complete new extract at .new and none at parquet_dir: move it in place
+    parquet_dir = parquet_dir.rstrip("/\\")
+    new_dir, old_dir = parquet_dir + ".new", parquet_dir + ".old"
+    if not os.path.exists(parquet_dir) and POSITION_KEY in load_manifest(new_dir):
+        os.replace(new_dir, parquet_dir)
+    if os.path.exists(parquet_dir) and os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+
+def sync_extract(store_dir=STORE_DIR, hyper_file=HYPER_FILE, parquet_dir=PARQUET_DIR, sketch_file=SKETCH_FILE):
+    """
+    Appends the store segments committed since the last sync (or rebuild) to the
+    extract, enriched (see enrich()). Returns the number of rows written.
+    """
+    def pull(position):
+        df, position = read_segments_since(store_dir, position)
+        return typed_frame(enrich(df, sketch_file)), position
+
+    with file_lock(_lock_path(hyper_file, parquet_dir)):
+        if hyper_available():
+            with _hyper_connection(hyper_file, CreateMode.CREATE_IF_NOT_EXISTS) as connection:
+                return _hyper_append(connection, *pull(_hyper_position(connection)))
+        _finish_swap(parquet_dir)
+        typed, position = pull(load_manifest(parquet_dir).get(POSITION_KEY, 0))
+        if len(typed):
+            append_segment(typed, parquet_dir, partitioned=False, commit={POSITION_KEY: position})
+        return len(typed)
+
+
+def _contains(sorted_ids, ids):
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return sorted_ids[positions] == ids
+
+
+def _store_rows_missing(store_dir, segments, sorted_ids, chunk_size):
+    """
+    Yields the rows of the given store segments whose tweet_id is not in
+    sorted_ids, about chunk_size rows at a time. Segments the history already
+    covers are only read for their tweet_id column.
+    """
+    frames, rows = [], 0
+    for segment in segments:
+        path = os.path.join(store_dir, segment["path"])
+        ids = pd.read_parquet(path, columns=["tweet_id"])["tweet_id"].to_numpy(dtype=np.int64)
+        new = ~_contains(sorted_ids, ids)
+        if new.any():
+            frames.append(pd.read_parquet(path)[new])
+            rows += len(frames[-1])
+        if rows >= chunk_size:
+            yield pd.concat(frames, ignore_index=True)
+            frames, rows = [], 0
+    if frames:
+        yield pd.concat(frames, ignore_index=True)
+
+
+def _rebuild(frames, hyper_file, parquet_dir, store_dir, sketch_file, chunk_size):
+    segments = load_manifest(store_dir)["segments"]
+    position = len(segments)
+    ids, rows = [], 0
+
+    def typed_batches():
+        # The AI CSV, then the store rows it does not have yet (written after the last AI run)
+        for df in frames:
+            ids.append(df["tweet_id"].to_numpy(dtype=np.int64))
+            yield typed_frame(df)
+        sorted_ids = np.sort(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64)
+        for df in _store_rows_missing(store_dir, segments, sorted_ids, chunk_size):
+            yield typed_frame(enrich(df, sketch_file))
+
+    # Built next to the live extract and swapped in once complete; the position
+    # is written only with the last batch, so a partial build is never "up to date"
+    with file_lock(_lock_path(hyper_file, parquet_dir)):
+        if hyper_available():
+            tmp_file = hyper_file + ".tmp"
+            with _hyper_connection(tmp_file, CreateMode.CREATE_AND_REPLACE) as connection:
+                for typed in typed_batches():
+                    rows += _hyper_append(connection, typed)
+                _hyper_append(connection, typed_frame(pd.DataFrame()), position)
+            os.replace(tmp_file, hyper_file)
+            return rows
+
+        parquet_dir = parquet_dir.rstrip("/\\")
+        new_dir, old_dir = parquet_dir + ".new", parquet_dir + ".old"
+        _finish_swap(parquet_dir)
+        if os.path.exists(new_dir):
+            shutil.rmtree(new_dir)
+        for typed in typed_batches():
+            append_segment(typed, new_dir, partitioned=False)
+            rows += len(typed)
+        append_segment(pd.DataFrame(), new_dir, commit={POSITION_KEY: position})
+        # A directory can't be replaced in one rename; _finish_swap() completes
+        # a swap interrupted between these two
+        if os.path.exists(parquet_dir):
+            os.replace(parquet_dir, old_dir)
+        os.replace(new_dir, parquet_dir)
+        _finish_swap(parquet_dir)
+    return rows
+
+
+def rebuild_extract(df, hyper_file=HYPER_FILE, parquet_dir=PARQUET_DIR, store_dir=STORE_DIR,
+                    sketch_file=SKETCH_FILE):
+    """
+    Replaces the extract with the given tweets plus the store rows they lack.
+    Store segments committed so far are marked as received; later ones are
+    appended by sync_extract(). Returns the number of rows written.
+    """
+    return _rebuild([df], hyper_file, parquet_dir, store_dir, sketch_file, CHUNK_SIZE)
+
+
+def rebuild_extract_chunked(csv_input=CSV_FILE, hyper_file=HYPER_FILE, parquet_dir=PARQUET_DIR,
+                            store_dir=STORE_DIR, chunk_size=CHUNK_SIZE, sketch_file=SKETCH_FILE):
+    """
+    rebuild_extract() from a CSV, chunk_size rows at a time. Returns the number of rows written.
+    """
+    chunks = (widen(chunk) for chunk in read_csv_chunks(csv_input, chunk_size))
+    return _rebuild(chunks, hyper_file, parquet_dir, store_dir, sketch_file, chunk_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse Tableau extract")
+    parser.add_argument("--chunk-size", type=int, help="read the CSV in chunks of this many rows")
+    args = parser.parse_args()
+
+    with stage("extract") as m:
+        m.read(CSV_FILE)
+        if args.chunk_size:
+            rows = rebuild_extract_chunked(chunk_size=args.chunk_size)
+            m.rows(rows_in=rows, rows_out=rows)
+        else:
+            df = pd.read_csv(CSV_FILE)
+            rows = rebuild_extract(df)
+            m.rows(rows_in=len(df), rows_out=rows)
+        m.wrote(HYPER_FILE if hyper_available() else PARQUET_DIR)
+    if hyper_available():
+        print(f"✅ Tableau extract written → {HYPER_FILE} ({rows} rows)")
+    else:
+        print(f"✅ tableauhyperapi not installed; Parquet extract written → {PARQUET_DIR} "
+              f"({rows} rows, version {load_manifest(PARQUET_DIR)['version']})")
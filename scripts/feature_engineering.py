@@ -6,102 +6,144 @@ Processes raw Twitter/X data (CSV) and prepares it for Tableau dashboards.
 The CSV contains base metrics like likes, retweets, sentiment, and hashtag.
 All advanced feature engineering (Momentum Score, Momentum Status, Engagement, Spike Detection) is implemented
 directly in Tableau via calculated fields. This script ensures clean, structured CSV ready for Tableau visualization.
+
+Modes:
+- default:        recompute all features over the full dataset (batch path)
+- --incremental:  keep per-(hashtag, hour) aggregates and rolling-window state on disk
+                  (see feature_state.py); each run reads only tweets added since the last
+                  one, appends their facts and rewrites the hashtag × hour table from the
+                  state (the normalized tables: old tweets are never re-read or re-joined)
+- --verify:       differential check that the incremental path matches the batch path
+- --normalized:   write tweet facts and hashtag × hour features as separate CSVs
+                  (related on hashtag + hour) instead of repeating hourly values on every tweet
+- --chunk-size:   bounded memory: a first pass sums likes / retweets per (hashtag, hour)
+                  across chunks, a second pass joins the hourly features onto each chunk
 """
+import argparse
+import tempfile
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from segment_store import STORE_DIR, read_trends, read_trends_since, trends_source
+from chunked import CHUNK_SIZE, read_trend_chunks, widen, write_chunks
+from instrumentation import stage
+import rules
 
-CSV_INPUT = "../data/twitter_trends.csv"
+CSV_INPUT = "../data/twitter_trends.csv"  # fallback when the segment store is absent
 CSV_OUTPUT = "../data/twitter_trends_fe.csv"
+FACT_OUTPUT = "../data/twitter_trends_fe_tweets.csv"    # normalized mode: one row per tweet
+HOURLY_OUTPUT = "../data/twitter_trends_fe_hourly.csv"  # normalized mode: one row per hashtag × hour
+STATE_DIR = "../data/feature_state"
 
-# -------------------------
-# Load raw CSV
-# -------------------------
-df = pd.read_csv(CSV_INPUT)
-
-# Ensure datetime format
-df["created_at"] = pd.to_datetime(df["created_at"])
+ROLLING_WINDOW = 3  # hourly buckets per hashtag
 
 # -------------------------
-# Sentiment Category
+# Row-level features (depend on the tweet only)
 # -------------------------
-def categorize_sentiment(score):
-    if score < -0.1:
-        return "Negative"
-    elif score <= 0.1:
-        return "Neutral"
-    else:
-        return "Positive"
+def add_row_features(df):
+    df = df.copy()
 
-df["sentiment_category"] = df["sentiment"].apply(categorize_sentiment)
+    # Ensure datetime format
+    df["created_at"] = pd.to_datetime(df["created_at"])
 
-# -------------------------
-# Momentum Score & Status
-# -------------------------
-df["momentum_score"] = round((df["likes"] + df["retweets"]) * 0.7 + df["sentiment"] * 0.3 * 100, 2)
+    # Sentiment Category (vectorized, see rules.py)
+    df["sentiment_category"] = rules.sentiment_category(df["sentiment"])
+
+    # Momentum Score & Status
+    df["momentum_score"] = rules.momentum_score(df["likes"], df["retweets"], df["sentiment"])
+    df["momentum_status"] = rules.momentum_status(df["momentum_score"])
 
-def momentum_status(score):
-    if score >= 400:
-        return "🔥 Exploding"
-    elif score >= 200:
-        return "🚀 Emerging"
-    else:
-        return "⏳ Stable"
+    # Engagement Velocity bucket (per hour)
+    df["hour"] = df["created_at"].dt.floor("h")  # lowercase 'h' to avoid FutureWarning
 
-df["momentum_status"] = df["momentum_score"].apply(momentum_status)
+    # User Location Cleanup (object first: a categorical column can't take a new "None" label)
+    df["user_location"] = df["user_location"].astype(object).fillna("None")
+    return df
 
 # -------------------------
 # Engagement Velocity (per hour)
 # -------------------------
-df["hour"] = df["created_at"].dt.floor("h")  # lowercase 'h' to avoid FutureWarning
-
-engagement_hourly = (
-    df.groupby(["hashtag", "hour"])[["likes", "retweets"]]
-      .sum()
-      .reset_index()
-)
-engagement_hourly["engagement"] = engagement_hourly["likes"] + engagement_hourly["retweets"]
-
-# Map engagement per hour back to main df
-df = df.merge(
-    engagement_hourly[["hashtag", "hour", "engagement"]],
-    on=["hashtag", "hour"],
-    how="left"
-)
+def hourly_engagement(df):
+    engagement_hourly = (
+        df.groupby(["hashtag", "hour"])[["likes", "retweets"]]
+          .sum()
+          .reset_index()
+    )
+    engagement_hourly["engagement"] = engagement_hourly["likes"] + engagement_hourly["retweets"]
+    return engagement_hourly
 
 # -------------------------
 # Risk / Opportunity
 # -------------------------
-# Compute rolling mean per hashtag
-rolling = (
-    engagement_hourly.groupby("hashtag")
-    .rolling(3, on="hour", min_periods=1)["engagement"]
-    .mean()
-    .reset_index()
-)
-rolling.rename(columns={"engagement": "rolling_mean_engagement"}, inplace=True)
+def rolling_engagement(engagement_hourly):
+    # Compute rolling mean per hashtag
+    rolling = (
+        engagement_hourly.groupby("hashtag")
+        .rolling(ROLLING_WINDOW, on="hour", min_periods=1)["engagement"]
+        .mean()
+        .reset_index()
+    )
+    rolling.rename(columns={"engagement": "rolling_mean_engagement"}, inplace=True)
+    return rolling
+
+# -------------------------
+# Join hourly features back onto tweets
+# -------------------------
+columns_order = [
+    "tweet_id",
+    "created_at",
+    "text",
+    "likes",
+    "retweets",
+    "sentiment",
+    "sentiment_category",
+    "hashtag",
+    "momentum_score",
+    "momentum_status",
+    "user_location",
+    "engagement",
+    "rolling_mean_engagement",
+    "opportunity_flag"
+]
 
-# Merge rolling mean back
-df = df.merge(
-    rolling[["hashtag", "hour", "rolling_mean_engagement"]],
-    on=["hashtag", "hour"],
-    how="left"
-)
+def finalize(df, engagement_hourly, rolling):
+    # Map engagement per hour back to main df
+    df = df.merge(
+        engagement_hourly[["hashtag", "hour", "engagement"]],
+        on=["hashtag", "hour"],
+        how="left"
+    )
 
-# Flag spikes
-df["opportunity_flag"] = np.where(
-    df["engagement"] > 2 * df["rolling_mean_engagement"], "⚡ Spike", ""
-)
+    # Merge rolling mean back
+    df = df.merge(
+        rolling[["hashtag", "hour", "rolling_mean_engagement"]],
+        on=["hashtag", "hour"],
+        how="left"
+    )
+
+    # Flag spikes
+    df["opportunity_flag"] = np.where(
+        df["engagement"] > 2 * df["rolling_mean_engagement"], "⚡ Spike", ""
+    )
+
+    # Reorder Columns for Tableau
+    return df[columns_order]
 
 # -------------------------
-# User Location Cleanup
+# Batch path
 # -------------------------
-df["user_location"] = df["user_location"].fillna("None")
+def build_features(df):
+    df = add_row_features(df)
+    engagement_hourly = hourly_engagement(df)
+    rolling = rolling_engagement(engagement_hourly)
+    return finalize(df, engagement_hourly, rolling)
 
 # -------------------------
-# Reorder Columns for Tableau
+# Normalized path (fact + dimension tables)
 # -------------------------
-columns_order = [
+# Tweets no longer carry the hourly features. Tableau relates the two tables on
+# hashtag and DATETRUNC('hour', created_at) = hour, so the facts need no extra key column.
+fact_columns = [
     "tweet_id",
     "created_at",
     "text",
@@ -112,16 +154,190 @@ columns_order = [
     "hashtag",
     "momentum_score",
     "momentum_status",
-    "user_location",
+    "user_location"
+]
+
+hourly_columns = [
+    "hashtag",
+    "hour",
     "engagement",
     "rolling_mean_engagement",
     "opportunity_flag"
 ]
 
-df = df[columns_order]
+def feature_facts(df):
+    return add_row_features(df)[fact_columns]
+
+def hourly_features(facts):
+    facts = facts.assign(hour=pd.to_datetime(facts["created_at"]).dt.floor("h"))
+    return hourly_table(hourly_engagement(facts))
+
+def hourly_table(engagement_hourly):
+    rolling = rolling_engagement(engagement_hourly)
+    hourly = engagement_hourly.merge(
+        rolling[["hashtag", "hour", "rolling_mean_engagement"]],
+        on=["hashtag", "hour"],
+        how="left"
+    )
+
+    # Flag spikes
+    hourly["opportunity_flag"] = np.where(
+        hourly["engagement"] > 2 * hourly["rolling_mean_engagement"], "⚡ Spike", ""
+    )
+    return hourly[hourly_columns]
+
+# -------------------------
+# Chunked path
+# -------------------------
+def chunked_engagement(chunks):
+    """
+    hourly_engagement() over a stream of chunks: per-(hashtag, hour) sums are
+    added up across chunk boundaries, so only the hourly table is kept.
+    """
+    totals = None
+    for chunk in chunks:
+        part = (
+            chunk.assign(hashtag=chunk["hashtag"].astype(object),
+                         hour=pd.to_datetime(chunk["created_at"]).dt.floor("h"))
+                 .groupby(["hashtag", "hour"])[["likes", "retweets"]]
+                 .sum()
+        )
+        totals = part if totals is None else totals.add(part, fill_value=0).astype("int64")
+    engagement_hourly = totals.sort_index().reset_index()
+    engagement_hourly["engagement"] = engagement_hourly["likes"] + engagement_hourly["retweets"]
+    return engagement_hourly
+
+
+def build_features_chunked(csv_input=CSV_INPUT, store_dir=STORE_DIR, chunk_size=CHUNK_SIZE,
+                           csv_output=CSV_OUTPUT, fact_output=None, hourly_output=None):
+    """
+    build_features() (or, with fact_output / hourly_output, the normalized tables)
+    in two passes over the history, one chunk in memory at a time.
+    Returns the number of tweet rows written.
+    """
+    engagement_hourly = chunked_engagement(
+        read_trend_chunks(csv_input, store_dir, chunk_size, columns=["hashtag", "created_at", "likes", "retweets"])
+    )
+    rolling = rolling_engagement(engagement_hourly)
+    chunks = (add_row_features(widen(chunk)) for chunk in read_trend_chunks(csv_input, store_dir, chunk_size))
+
+    if fact_output is None:
+        return write_chunks((finalize(chunk, engagement_hourly, rolling) for chunk in chunks), csv_output)
+
+    hourly_table(engagement_hourly).to_csv(hourly_output, index=False, encoding="utf-8")
+    return write_chunks((chunk[fact_columns] for chunk in chunks), fact_output)
+
+# -------------------------
+# Incremental path
+# -------------------------
+def update_features(new_df, state_dir=STATE_DIR):
+    """
+    Folds a micro-batch into the on-disk feature state and returns the full
+    feature table. Only hours touched by new tweets (and the rolling windows
+    after them) are recomputed.
+    """
+    from feature_state import FeatureState
+
+    state = FeatureState(state_dir)
+    state.update(new_df)
+    return state.features()
+
+def update_normalized(csv_input=CSV_INPUT, store_dir=STORE_DIR, state_dir=STATE_DIR,
+                      fact_output=FACT_OUTPUT, hourly_output=HOURLY_OUTPUT):
+    """
+    --incremental run: reads only tweets added since the last run, folds them
+    into the on-disk state, appends their facts to fact_output and rewrites the
+    hashtag × hour table (hourly_output) from the state.
+    Returns (new tweets, hashtag-hours recomputed).
+    """
+    from feature_state import FeatureState
+
+    state = FeatureState(state_dir)
+    new_df, position = read_trends_since(csv_input, store_dir, state.load_position())
+    rows = state.update(new_df, fact_output=fact_output)
+    state.save_position(position)
+    state.hourly_features().to_csv(hourly_output, index=False, encoding="utf-8")
+    return len(rows), state.touched
+
+def verify_incremental(df, batches=5):
+    """
+    Differential check: feeding the data in several micro-batches through the
+    incremental path must give exactly the batch output (per-tweet table and
+    hashtag × hour table).
+    """
+    expected = build_features(df)
+    with tempfile.TemporaryDirectory() as state_dir:
+        for chunk in np.array_split(np.arange(len(df)), batches):
+            actual = update_features(df.iloc[chunk], state_dir)
+        from feature_state import FeatureState
+        actual_hourly = FeatureState(state_dir).hourly_features()
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True))
+    pd.testing.assert_frame_equal(actual_hourly.reset_index(drop=True),
+                                  hourly_features(feature_facts(df)).reset_index(drop=True))
+    return True
 
 # -------------------------
-# Save final CSV
+# Main execution
 # -------------------------
-df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
-print(f"✅ Feature-engineered CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse feature engineering")
+    parser.add_argument("--incremental", action="store_true",
+                        help="fold only new tweets into the on-disk state and update the normalized tables")
+    parser.add_argument("--verify", action="store_true", help="check incremental output against the batch path")
+    parser.add_argument("--normalized", action="store_true",
+                        help="write tweet facts and hashtag × hour features as separate tables")
+    parser.add_argument("--chunk-size", type=int, help="process the history in chunks of this many rows")
+    args = parser.parse_args()
+    if args.incremental and args.verify:
+        parser.error("--verify checks the incremental path itself; drop --incremental")
+    if args.chunk_size and (args.incremental or args.verify):
+        parser.error("--chunk-size only applies to full rebuilds; drop --incremental / --verify")
+
+    with stage("features") as m:
+        if args.incremental:
+            # Only the tweets added since the last run are read
+            new_rows, touched = update_normalized()
+            m.rows(rows_in=new_rows, rows_out=new_rows)
+            m.wrote(HOURLY_OUTPUT)
+            print(f"✅ Tweet facts updated → {FACT_OUTPUT} (+{new_rows} rows)")
+            print(f"✅ Hourly features saved → {HOURLY_OUTPUT} ({touched} hashtag-hours recomputed)")
+        else:
+            m.read(trends_source(CSV_INPUT, STORE_DIR))
+            if args.chunk_size and args.normalized:
+                rows = build_features_chunked(chunk_size=args.chunk_size, fact_output=FACT_OUTPUT, hourly_output=HOURLY_OUTPUT)
+                m.rows(rows_in=rows, rows_out=rows)
+                m.wrote(FACT_OUTPUT, HOURLY_OUTPUT)
+                print(f"✅ Tweet facts saved → {FACT_OUTPUT} ({rows} rows, chunks of {args.chunk_size})")
+                print(f"✅ Hourly features saved → {HOURLY_OUTPUT}")
+            elif args.chunk_size:
+                rows = build_features_chunked(chunk_size=args.chunk_size)
+                m.rows(rows_in=rows, rows_out=rows)
+                m.wrote(CSV_OUTPUT)
+                print(f"✅ Feature-engineered CSV saved → {CSV_OUTPUT} ({rows} rows, chunks of {args.chunk_size})")
+            else:
+                # Load raw tweets (segment store or CSV)
+                df = read_trends(CSV_INPUT, STORE_DIR)
+                m.rows(rows_in=len(df))
+
+                if args.verify:
+                    verify_incremental(df)
+                    print(f"✅ Incremental features match the batch path ({len(df)} rows)")
+                elif args.normalized:
+                    facts = feature_facts(df)
+                    hourly = hourly_features(facts)
+
+                    # Save fact and dimension CSVs
+                    facts.to_csv(FACT_OUTPUT, index=False, encoding="utf-8")
+                    hourly.to_csv(HOURLY_OUTPUT, index=False, encoding="utf-8")
+                    m.rows(rows_out=len(facts))
+                    m.wrote(FACT_OUTPUT, HOURLY_OUTPUT)
+                    print(f"✅ Tweet facts saved → {FACT_OUTPUT} ({len(facts)} rows)")
+                    print(f"✅ Hourly features saved → {HOURLY_OUTPUT} ({len(hourly)} rows)")
+                else:
+                    df = build_features(df)
+
+                    # Save final CSV
+                    df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+                    m.rows(rows_out=len(df))
+                    m.wrote(CSV_OUTPUT)
+                    print(f"✅ Feature-engineered CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
@@ -0,0 +1,218 @@
+"""
+TrendPredict – Incremental Feature State
+Author: Chaimaa Nairi
+Description:
+On-disk state for incremental feature engineering (feature_engineering.py --incremental).
+
+- rows-*.parquet: row-level features of every processed tweet, appended per batch
+- hourly.parquet: per-(hashtag, hour) likes/retweets/engagement and the rolling mean,
+  plus (in its Parquet metadata) how many row parts and fact-file bytes it
+  includes; replacing it is the commit point of an update
+- seen_tweet_ids.npy: tweets already folded into the state (see seen_index.py)
+- source.json: how far the input has been read (see segment_store.read_trends_since)
+
+A micro-batch only computes row features for its own tweets, re-sums the
+hours it touches and recomputes the rolling windows from the first touched
+hour onwards; the result is identical to the batch path.
+A crash mid-update never double-counts: before the next batch is folded, row
+parts and facts the hourly state does not include are dropped (those tweets are
+folded again), and tweets it includes but not yet marked as processed are marked.
+"""
+
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from seen_index import SeenIndex
+from feature_engineering import ROLLING_WINDOW, add_row_features, fact_columns, finalize, hourly_engagement, hourly_columns
+
+ROW_COLUMNS = [
+    "tweet_id",
+    "created_at",
+    "text",
+    "likes",
+    "retweets",
+    "sentiment",
+    "sentiment_category",
+    "hashtag",
+    "momentum_score",
+    "momentum_status",
+    "user_location",
+    "hour"
+]
+PARTS_KEY = b"row_parts"     # hourly.parquet metadata: row parts folded into it
+FACTS_KEY = b"facts_bytes"   # ... and the size of the fact output written with them
+
+
+class FeatureState:
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self.hourly_path = os.path.join(state_dir, "hourly.parquet")
+        self.source_path = os.path.join(state_dir, "source.json")
+        self.seen = SeenIndex(os.path.join(state_dir, "seen_tweet_ids.npy"))
+        self.touched = 0  # hashtag-hours recomputed by the last update
+
+    # -------------------------
+    # Storage helpers
+    # -------------------------
+    def _row_parts(self):
+        return sorted(glob.glob(os.path.join(self.state_dir, "rows-*.parquet")))
+
+    def load_hourly(self):
+        if not os.path.exists(self.hourly_path):
+            return None
+        return pd.read_parquet(self.hourly_path)
+
+    def _commit(self):
+        # (row parts, fact-file bytes) included in the committed hourly state
+        if not os.path.exists(self.hourly_path):
+            return 0, None
+        metadata = pq.read_schema(self.hourly_path).metadata or {}
+        if PARTS_KEY not in metadata:
+            return len(self._row_parts()), None  # state saved before the keys existed
+        facts = int(metadata[FACTS_KEY]) if FACTS_KEY in metadata else None
+        return int(metadata[PARTS_KEY]), facts
+
+    def _save_hourly(self, hourly, parts, facts):
+        table = pa.Table.from_pandas(hourly, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), PARTS_KEY: str(parts).encode()}
+        if facts is not None:
+            metadata[FACTS_KEY] = str(facts).encode()
+        tmp_path = self.hourly_path + ".tmp"
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, self.hourly_path)
+
+    def _recover(self, fact_output=None):
+        # Rolls back what an update that crashed before its commit wrote, and
+        # finishes one that crashed after it
+        parts = self._row_parts()
+        folded, facts = self._commit()
+        for path in parts[folded:]:
+            os.remove(path)
+        if fact_output and facts is not None and os.path.exists(fact_output) \
+                and os.path.getsize(fact_output) > facts:
+            with open(fact_output, "r+b") as f:
+                f.truncate(facts)
+        if folded:
+            last = pd.read_parquet(parts[folded - 1])
+            self.seen.add(last["tweet_id"][self.seen.filter_new(last["tweet_id"])])
+
+    def load_rows(self):
+        parts = self._row_parts()
+        if not parts:
+            return pd.DataFrame(columns=ROW_COLUMNS)
+        return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+    def load_position(self):
+        if not os.path.exists(self.source_path):
+            return None
+        with open(self.source_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_position(self, position):
+        tmp_path = self.source_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(position, f)
+        os.replace(tmp_path, self.source_path)
+
+    # -------------------------
+    # Incremental update
+    # -------------------------
+    def update(self, new_df, fact_output=None):
+        """
+        Folds new tweets into the state. Tweets already processed are ignored.
+        If fact_output is given, the new tweets' facts (fact_columns) are appended
+        to it in the same commit (it starts over with an empty state).
+        Returns the row features of the new tweets (ROW_COLUMNS).
+        """
+        self.touched = 0
+        self._recover(fact_output)
+        if new_df.empty:
+            return pd.DataFrame(columns=ROW_COLUMNS)
+        new_df = new_df[self.seen.filter_new(new_df["tweet_id"])]
+        if new_df.empty:
+            return pd.DataFrame(columns=ROW_COLUMNS)
+
+        # Row-level features for the new tweets only
+        rows = add_row_features(new_df)[ROW_COLUMNS]
+        part = os.path.join(self.state_dir, f"rows-{len(self._row_parts()) + 1:06d}.parquet")
+
+        # Re-sum only the (hashtag, hour) buckets touched by this batch
+        touched = hourly_engagement(rows)[["hashtag", "hour", "likes", "retweets"]]
+        hourly = self.load_hourly()
+        if hourly is None:
+            combined = touched
+        else:
+            combined = (
+                pd.concat([hourly[["hashtag", "hour", "likes", "retweets"]], touched])
+                  .groupby(["hashtag", "hour"], as_index=False)[["likes", "retweets"]]
+                  .sum()
+            )
+        combined["engagement"] = combined["likes"] + combined["retweets"]
+        combined["rolling_mean_engagement"] = np.nan
+
+        # Carry over rolling means that are not affected by this batch
+        if hourly is not None:
+            previous = combined[["hashtag", "hour"]].merge(
+                hourly[["hashtag", "hour", "rolling_mean_engagement"]],
+                on=["hashtag", "hour"],
+                how="left"
+            )
+            combined["rolling_mean_engagement"] = previous["rolling_mean_engagement"].to_numpy()
+
+        # Recompute windows from the first touched hour of each affected hashtag
+        first_touched = touched.groupby("hashtag")["hour"].min()
+        for hashtag, first_hour in first_touched.items():
+            positions = np.flatnonzero(combined["hashtag"].to_numpy() == hashtag)
+            hours = combined["hour"].to_numpy()[positions]
+            start = int(np.searchsorted(hours, np.datetime64(first_hour)))
+            context = max(0, start - (ROLLING_WINDOW - 1))
+
+            engagement = combined["engagement"].iloc[positions[context:]]
+            rolling = engagement.rolling(ROLLING_WINDOW, min_periods=1).mean().to_numpy()
+            combined.iloc[positions[start:], combined.columns.get_loc("rolling_mean_engagement")] = rolling[start - context:]
+            self.touched += len(positions) - start
+
+        # Persist: rows and facts first, then commit the hourly state (which
+        # records the row parts and fact bytes it includes), then mark tweets
+        # as processed
+        rows.to_parquet(part, index=False)
+        facts = None
+        if fact_output:
+            fresh = hourly is None or not os.path.exists(fact_output)
+            rows[fact_columns].to_csv(fact_output, mode="w" if fresh else "a", header=fresh,
+                                      index=False, encoding="utf-8")
+            facts = os.path.getsize(fact_output)
+        self._save_hourly(combined, len(self._row_parts()), facts)
+        self.seen.add(rows["tweet_id"])
+        return rows
+
+    # -------------------------
+    # Output
+    # -------------------------
+    def hourly_features(self):
+        """
+        Returns the hashtag × hour table, in the same shape as the normalized batch path.
+        """
+        hourly = self.load_hourly()
+        if hourly is None:
+            return pd.DataFrame(columns=hourly_columns)
+        hourly["opportunity_flag"] = np.where(
+            hourly["engagement"] > 2 * hourly["rolling_mean_engagement"], "⚡ Spike", ""
+        )
+        return hourly[hourly_columns]
+
+    def features(self):
+        """
+        Returns the full feature table, in the same shape as the batch path
+        (reads every processed tweet; used by --verify).
+        """
+        rows = self.load_rows()
+        hourly = self.load_hourly()
+        if hourly is None:
+            hourly = pd.DataFrame(columns=["hashtag", "hour", "engagement", "rolling_mean_engagement"])
+        return finalize(rows, hourly, hourly)
@@ -0,0 +1,98 @@
+"""
+TrendPredict – Fetch Checkpoint State
+Author: Chaimaa Nairi
+Description:
+Small checkpoint file that remembers, per hashtag, the high-water since_id,
+the pagination cursor of an in-progress fetch and the last fetch time.
+
+- Loading the state is O(1) in history size (no rescan of twitter_trends.json).
+- The file is rewritten atomically after every successful page.
+- If a run crashes mid-pagination, the next run resumes from the last
+  committed page with the same since_id instead of refetching.
+- Safe to update from concurrent hashtag fetchers.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+# -------------------------
+# Configuration
+# -------------------------
+STATE_FILE = "../data/fetch_state.json"
+
+
+class FetchState:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.tags = {}
+        self.lock = threading.RLock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.tags = json.load(f)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get(self, tag):
+        return self.tags.get(tag, {
+            "since_id": None,
+            "newest_id": None,
+            "next_token": None,
+            "last_fetch": None
+        })
+
+    def save(self):
+        # Temp file + rename so a crash never leaves a half-written checkpoint
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.tags, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def commit_page(self, tag, newest_id, next_token):
+        """
+        Records a successfully stored page: the highest tweet_id seen in this run
+        and the cursor for the next page (None once pagination is finished).
+        """
+        with self.lock:
+            state = dict(self.get(tag))
+            if newest_id is not None:
+                newest_id = int(newest_id)
+                if state["newest_id"] is None or newest_id > state["newest_id"]:
+                    state["newest_id"] = newest_id
+            state["next_token"] = next_token
+            state["last_fetch"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.tags[tag] = state
+            self.save()
+
+    def finish(self, tag):
+        """
+        Marks the current run for a hashtag as complete: the run's newest tweet_id
+        becomes the since_id for the next incremental fetch.
+        """
+        with self.lock:
+            state = dict(self.get(tag))
+            if state["newest_id"] is not None:
+                state["since_id"] = state["newest_id"]
+            state["next_token"] = None
+            self.tags[tag] = state
+            self.save()
+
+
+def bootstrap_state(rows, path=STATE_FILE):
+    """
+    Seeds the checkpoint once from existing tweets (used when no state file exists).
+    """
+    state = FetchState(path)
+    for row in rows:
+        tag = row["hashtag"]
+        tweet_id = int(row["tweet_id"])
+        current = state.get(tag)
+        if current["since_id"] is None or tweet_id > current["since_id"]:
+            state.tags[tag] = dict(current, since_id=tweet_id, newest_id=tweet_id)
+    state.save()
+    return state
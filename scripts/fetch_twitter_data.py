@@ -3,86 +3,92 @@ TrendPredict – Twitter/X Trend Data Ingestion (JSON)
 Author: Chaimaa Nairi
 Description:
 Fetches recent tweets for selected hashtags using Twitter/X API v2,
-performs sentiment analysis, calculates momentum metrics, and
-stores results incrementally as JSON for Tableau.
+performs sentiment analysis (TextBlob and VADER in one pass, on a separate
+stage thread – see sentiment_stage.py), calculates momentum metrics, and
+appends results to an append-only JSONL store (see jsonl_store.py).
+Each page is deduplicated, appended and then checkpointed (see fetch_state.py),
+so an interrupted run resumes from the last committed page.
+Hashtags are fetched concurrently on a thread pool behind a shared
+token-bucket scheduler driven by the API's rate-limit headers (see rate_limiter.py).
 """
 
 import tweepy
-import json
-from textblob import TextBlob
 from dotenv import load_dotenv
 import os
-import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib3.exceptions import ProtocolError
 from http.client import RemoteDisconnected
 from datetime import datetime
+from seen_index import SeenIndex, bootstrap_index
+from fetch_state import FetchState, bootstrap_state
+from rate_limiter import RateLimitedClient, TokenBucket, rate_limited
+from jsonl_store import JSONL_DIR, append_records, iter_records, list_segments, migrate_json
+from sentiment_stage import SentimentStage
+from instrumentation import path_size, stage
+import rules
 
 # -------------------------
 # Configuration
 # -------------------------
 HASHTAGS = ["#Python", "#AI", "#DataScience"]
 MAX_TWEETS_PER_HASHTAG = 50
-JSON_FILE = "../data/twitter_trends.json"
-RATE_LIMIT_COOLDOWN = 5  # seconds between hashtag fetches
-
-# -------------------------
-# Load environment variables
-# -------------------------
-load_dotenv()
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-if not BEARER_TOKEN:
-    raise ValueError("❌ BEARER_TOKEN not found in environment variables")
-
-# -------------------------
-# Authenticate with Twitter/X API v2
-# -------------------------
-client = tweepy.Client(bearer_token=BEARER_TOKEN, wait_on_rate_limit=True)
+JSON_FILE = "../data/twitter_trends.json"  # legacy single-file history, migrated once
+MAX_WORKERS = 8  # hashtags fetched concurrently
 
 # -------------------------
 # Helper functions
 # -------------------------
-def get_sentiment_category(sentiment):
-    if sentiment < -0.1:
-        return "Negative"
-    elif sentiment <= 0.1:
-        return "Neutral"
-    else:
-        return "Positive"
-
-def get_momentum_score(likes, retweets, sentiment):
-    return round((likes + retweets) * 0.7 + sentiment * 0.3 * 100, 2)
-
-def get_momentum_status(score):
-    if score >= 400:
-        return "🔥 Exploding"
-    elif score >= 200:
-        return "🚀 Emerging"
-    else:
-        return "⏳ Stable"
+def add_momentum(rows):
+    # Runs after the sentiment stage has scored the rows (one vectorized pass per page)
+    if not rows:
+        return rows
+    momentum = rules.momentum_score(
+        [row["likes"] for row in rows], [row["retweets"] for row in rows], [row["sentiment"] for row in rows]
+    )
+    status = rules.momentum_status(momentum)
+    for row, score, label in zip(rows, momentum.tolist(), status.tolist()):
+        row["momentum"] = score
+        row["momentum_status"] = label
+    return rows
 
 # -------------------------
 # Fetch tweets safely
 # -------------------------
-def fetch_tweets(tag: str, since_id=None, max_tweets=50):
+def fetch_tweets(client, tag: str, since_id=None, max_tweets=50, pagination_token=None, on_page=None, scheduler=None):
+    """
+    Fetches tweets for a hashtag page by page.
+    Rows are returned unscored; sentiment and momentum are filled in by the sentiment stage.
+    client is anything exposing search_recent_tweets (a tweepy.Client or a fake).
+    Each page request takes a token from the shared scheduler when one is given.
+    on_page(rows, meta) is called after each page so the caller can persist
+    the rows and checkpoint the cursor before the next request is made.
+    """
     all_data = []
     query = f"{tag} -is:retweet lang:en"
     fetched = 0
 
     try:
+        search = client.search_recent_tweets
+        if scheduler is not None:
+            search = rate_limited(search, scheduler)
+
         paginator = tweepy.Paginator(
-            client.search_recent_tweets,
+            search,
             query=query,
             tweet_fields=["created_at", "public_metrics"],
             user_fields=["location"],
             expansions=["author_id"],
             since_id=since_id,
-            max_results=min(20, max_tweets)
+            max_results=min(20, max_tweets),
+            pagination_token=pagination_token
         )
 
         for page in paginator:
             if not page.data:
                 break
+            page_data = []
 
             # Map users to their locations
             users = {}
@@ -93,29 +99,29 @@ def fetch_tweets(tag: str, since_id=None, max_tweets=50):
             for tweet in page.data:
                 likes = tweet.public_metrics["like_count"]
                 retweets = tweet.public_metrics["retweet_count"]
-                sentiment = round(TextBlob(tweet.text).sentiment.polarity, 3)
-                sentiment_category = get_sentiment_category(sentiment)
-                momentum = get_momentum_score(likes, retweets, sentiment)
-                momentum_status = get_momentum_status(momentum)
                 user_location = users.get(tweet.author_id, "None")
 
-                all_data.append({
+                page_data.append({
                     "tweet_id": tweet.id,
                     "created_at": tweet.created_at.strftime("%Y-%m-%d %H:%M:%S"),
                     "text": tweet.text,
                     "likes": likes,
                     "retweets": retweets,
-                    "sentiment": sentiment,
-                    "sentiment_category": sentiment_category,
+                    "sentiment": None,
+                    "sentiment_category": None,
                     "hashtag": tag,
-                    "momentum": momentum,
-                    "momentum_status": momentum_status,
+                    "momentum": None,
+                    "momentum_status": None,
                     "user_location": user_location
                 })
 
                 fetched += 1
                 if fetched >= max_tweets:
                     break
+
+            all_data.extend(page_data)
+            if on_page:
+                on_page(page_data, page.meta or {})
             if fetched >= max_tweets:
                 break
 
@@ -131,54 +137,122 @@ def fetch_tweets(tag: str, since_id=None, max_tweets=50):
     return all_data
 
 # -------------------------
-# Main execution loop
+# Page ingestion
 # -------------------------
-all_new_rows = []
+ingest_lock = threading.Lock()
+
+def ingest_rows(rows, seen):
+    """
+    Dedups a page against the shared seen index and appends the new rows to the
+    JSONL store. Cost is proportional to the page size, not the history.
+    """
+    with ingest_lock:
+        is_new = seen.filter_new([row["tweet_id"] for row in rows])
+        new_rows = [row for row, keep in zip(rows, is_new) if keep]
+        append_records(new_rows, JSONL_DIR)
+        seen.add([row["tweet_id"] for row in new_rows])
+    return new_rows
 
-for tag in HASHTAGS:
+# -------------------------
+# Concurrent multi-hashtag fetch
+# -------------------------
+def fetch_hashtag(client, tag, state, seen, scheduler, sentiment_stage, max_tweets=MAX_TWEETS_PER_HASHTAG):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] Fetching tweets for {tag} (up to {MAX_TWEETS_PER_HASHTAG})")
+    print(f"[{timestamp}] Fetching tweets for {tag} (up to {max_tweets})")
+
+    # Resume an interrupted run from its cursor, or start after the last since_id
+    tag_state = state.get(tag)
+    if tag_state["next_token"]:
+        print(f"[{timestamp}] Resuming {tag} from last committed page")
+
+    # Pages are scored, stored and checkpointed on the stage thread, in order,
+    # while this thread requests the next page
+    pending = []
+    failed = []
 
-    # Determine the latest tweet_id for incremental fetch
-    since_id = None
-    if os.path.exists(JSON_FILE):
+    def commit_page(rows, meta):
+        def persist(rows):
+            if failed:
+                return  # never checkpoint past a page that was not stored
+            try:
+                ingest_rows(add_momentum(rows), seen)
+                newest_id = max((row["tweet_id"] for row in rows), default=meta.get("newest_id"))
+                state.commit_page(tag, newest_id, meta.get("next_token"))
+            except Exception as e:
+                failed.append(e)
+                raise
+        pending.append(sentiment_stage.submit(rows, then=persist))
+
+    new_rows = fetch_tweets(
+        client,
+        tag=tag,
+        since_id=tag_state["since_id"],
+        max_tweets=max_tweets,
+        pagination_token=tag_state["next_token"],
+        on_page=commit_page,
+        scheduler=scheduler
+    )
+
+    for future in pending:
         try:
-            with open(JSON_FILE, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-            tag_ids = [t["tweet_id"] for t in existing_data if t["hashtag"] == tag]
-            if tag_ids:
-                since_id = max(tag_ids)
-        except Exception:
-            since_id = None
+            future.result()
+        except Exception as e:
+            print(f"⚠️ Failed to store a page for {tag}: {e}")
 
-    new_rows = fetch_tweets(tag=tag, since_id=since_id, max_tweets=MAX_TWEETS_PER_HASHTAG)
-    all_new_rows.extend(new_rows)
+    # Keep the cursor if the fetch was cut short by an error, so the next run resumes
+    if not failed and (len(new_rows) >= max_tweets or not state.get(tag)["next_token"]):
+        state.finish(tag)
 
-    print(f"[{timestamp}] Fetched {len(new_rows)} tweets for {tag}")
-    time.sleep(RATE_LIMIT_COOLDOWN)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Fetched {len(new_rows)} tweets for {tag}")
+    return new_rows
+
+def fetch_all_hashtags(client, tags, state, seen, scheduler=None, sentiment_stage=None, max_tweets=MAX_TWEETS_PER_HASHTAG,
+                       max_workers=MAX_WORKERS):
+    """
+    Fetches all hashtags concurrently. All workers share one token bucket, so
+    requests only wait when the API quota is actually spent.
+    Returns {tag: rows}.
+    """
+    scheduler = scheduler or getattr(client, "scheduler", None) or TokenBucket()
+    sentiment_stage = sentiment_stage or SentimentStage()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {tag: pool.submit(fetch_hashtag, client, tag, state, seen, scheduler, sentiment_stage, max_tweets)
+                   for tag in tags}
+        return {tag: future.result() for tag, future in futures.items()}
 
 # -------------------------
-# Save JSON results
+# Main execution
 # -------------------------
-final_data = []
+if __name__ == "__main__":
+    # Load environment variables
+    load_dotenv()
+    BEARER_TOKEN = os.getenv("BEARER_TOKEN")
+    if not BEARER_TOKEN:
+        raise ValueError("❌ BEARER_TOKEN not found in environment variables")
 
-# Load existing JSON if present
-if os.path.exists(JSON_FILE):
-    try:
-        with open(JSON_FILE, "r", encoding="utf-8") as f:
-            final_data = json.load(f)
-    except Exception:
-        final_data = []
+    # Authenticate with Twitter/X API v2 (rate-limit headers feed the shared scheduler)
+    client = RateLimitedClient(bearer_token=BEARER_TOKEN)
 
-# Append new rows
-final_data.extend(all_new_rows)
+    # One-time migration of the legacy JSON array into the JSONL store
+    migrated = migrate_json(JSON_FILE, JSONL_DIR)
+    if migrated:
+        print(f"📦 Migrated {migrated} tweets from {JSON_FILE} → {JSONL_DIR}")
 
-# Remove duplicates by tweet_id
-unique_data = {item["tweet_id"]: item for item in final_data}
-final_data = list(unique_data.values())
+    # Load checkpoint state and the shared seen index (bootstrapped once from history)
+    state = FetchState()
+    seen = SeenIndex()
+    if list_segments(JSONL_DIR) and (not state.exists() or not seen.exists()):
+        history = [{"tweet_id": r["tweet_id"], "hashtag": r["hashtag"]} for r in iter_records(JSONL_DIR)]
+        if not state.exists():
+            state = bootstrap_state(history)
+        if not seen.exists():
+            seen = bootstrap_index([r["tweet_id"] for r in history])
 
-# Save JSON
-with open(JSON_FILE, "w", encoding="utf-8") as f:
-    json.dump(final_data, f, ensure_ascii=False, indent=2)
+    with stage("fetch") as m:
+        store_size = path_size(JSONL_DIR)
+        results = fetch_all_hashtags(client, HASHTAGS, state, seen)
+        total = sum(len(rows) for rows in results.values())
+        m.rows(rows_out=total)
+        m.bytes_written = path_size(JSONL_DIR) - store_size
 
-print(f"✅ JSON updated successfully → {JSON_FILE} ({len(final_data)} total tweets)")
\ No newline at end of file
+    print(f"✅ JSONL store updated successfully → {JSONL_DIR} (+{total} tweets fetched)")
\ No newline at end of file
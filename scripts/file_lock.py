@@ -0,0 +1,39 @@
+"""
+TrendPredict – Inter-Process File Lock
+Author: Chaimaa Nairi
+Description:
+Advisory lock shared by processes that update the same files (for example the
+fetcher, json_to_csv.py and the micro-batch loop writing the segment store or
+the seen tweet_id index).
+
+- The lock is an fcntl.flock on a small side file, held for the `with` block.
+- shared=True takes a read lock, so readers only wait for writers.
+- Where fcntl is not available (Windows) the lock is a no-op.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """
+    Holds an exclusive (or shared) lock on `path` for the enclosed block,
+    creating the lock file if needed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -9,50 +9,309 @@ via a simple API for real-time access.
 - Provides AI recommendation per hashtag.
 - Enables integration with Tableau dashboards or other apps.
 - Works with existing CSVs (twitter_trends_ai.csv) for lightweight streaming/demo purposes.
+- Aggregates are precomputed per snapshot (see trend_index.py), so both
+  endpoints are O(1) lookups instead of a groupby / full scan per request.
+- New pipeline output is picked up by a background watcher and swapped in
+  without a restart (see snapshot.py); /snapshot reports freshness metrics.
+- /tweets and /tweets/top serve time-windowed, filtered, paginated rows from a
+  time-sorted index (see time_index.py); /tweets streams its JSON as it is built.
+- /trends, /recommendation and /tweets/top responses are cached as encoded JSON
+  per snapshot with ETags, so unchanged polls get a 304 (see response_cache.py).
+- /feed pushes each micro-batch's per-hashtag deltas to clients as server-sent
+  events, so clients don't have to poll (see trend_feed.py). Only the
+  micro-batch loop may publish: it sends the FEED_TOKEN shared secret, or,
+  without one, the publish route only accepts local clients.
+- /topics/rising answers "top rising terms in the last N hours" from the hourly
+  term buckets saved by nlp_topics.py (see topic_engine.py).
+- POST /score scores a batch of incoming tweets online (sentiment, momentum,
+  percentile, recommendation) with warm models (see tweet_scorer.py). Texts
+  already scored are answered from memory; new texts are scored on a pool of
+  warmed worker processes, one per core.
+- /metrics serves the latest per-stage pipeline metrics and the API's own
+  counters in Prometheus text format (see instrumentation.py).
 """
 
-from fastapi import FastAPI
-import pandas as pd
+import hmac
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from fastapi.responses import Response, StreamingResponse
+from snapshot import SnapshotWatcher
+from response_cache import ResponseCache, dumps
+from trend_feed import TrendFeed
+from time_index import parse_time, decode_cursor
+from topic_engine import RETENTION_HOURS, SavedTopics
+from tweet_scorer import MAX_BATCH, TweetScorer
+from instrumentation import MetricsLog, prometheus_text
+from config import FEED_TOKEN
 
 # -------------------------
-# Initialize API
+# Load data (AI recommendations CSV)
 # -------------------------
-app = FastAPI(title="TrendPulseAI Hyper API")
+CSV_FILE = "../data/twitter_trends_ai.csv"
+MAX_PAGE_SIZE = 1000
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}  # may publish to /feed when FEED_TOKEN is unset
+NO_SNAPSHOT = {"error": "Data not loaded yet"}  # until the AI CSV first appears
+snapshots = SnapshotWatcher(CSV_FILE)
+snapshots.reload()
+responses = ResponseCache()
+feed = TrendFeed()
+topics = SavedTopics()
+topics.reload()
+scorer = TweetScorer()
+stage_metrics = MetricsLog()
 
 # -------------------------
-# Load CSV data
+# Initialize API
 # -------------------------
-CSV_FILE = "../data/twitter_trends_ai.csv"
-df = pd.read_csv(CSV_FILE)
+@asynccontextmanager
+async def lifespan(app):
+    scorer.warm()
+    snapshots.start()
+    topics.start()
+    yield
+    topics.stop()
+    snapshots.stop()
+    scorer.close()
+
+app = FastAPI(title="TrendPulseAI Hyper API", lifespan=lifespan)
 
 # -------------------------
 # Endpoint: Return aggregated trends
 # -------------------------
 @app.get("/trends")
-def get_trends():
+async def get_trends(request: Request):
     """
     Returns aggregated trend metrics per hashtag:
     - Average momentum
     - Average VADER sentiment
     - Dominant AI recommendation
     """
-    top_trends = df.groupby("hashtag").agg({
-        "momentum": "mean",
-        "sentiment_vader": "mean",
-        "ai_recommendation": lambda x: x.mode()[0]  # most common recommendation
-    }).reset_index()
-    return top_trends.to_dict(orient="records")
+    snapshot = snapshots.current
+    if snapshot is None:
+        return NO_SNAPSHOT
+    return responses.respond(request, snapshot.generation, snapshot.index.trends)
 
 # -------------------------
 # Endpoint: Return AI recommendation for a specific hashtag
 # -------------------------
 @app.get("/recommendation/{hashtag}")
-def get_recommendation(hashtag: str):
+async def get_recommendation(hashtag: str, request: Request):
     """
     Returns the AI recommendation for a given hashtag.
     """
-    data = df[df["hashtag"] == hashtag]
-    if data.empty:
+    snapshot = snapshots.current
+    if snapshot is None:
+        return NO_SNAPSHOT
+
+    def build():
+        rec = snapshot.index.recommendation(hashtag)
+        if rec is None:
+            return {"error": "Hashtag not found"}
+        return {"hashtag": hashtag, "recommendation": rec}
+
+    return responses.respond(request, snapshot.generation, build)
+
+# -------------------------
+# Endpoint: Snapshot freshness metrics
+# -------------------------
+@app.get("/snapshot")
+async def get_snapshot():
+    """
+    Returns the serving snapshot's generation, age and reload statistics,
+    plus response cache counters.
+    """
+    return {
+        **snapshots.metrics(),
+        "response_cache": responses.metrics(),
+        "feed": feed.metrics(),
+        "scorer": scorer.metrics()
+    }
+
+# -------------------------
+# Endpoint: Prometheus metrics
+# -------------------------
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text exposition: the last run of every pipeline stage
+    (wall / CPU time, peak RSS, rows, bytes) plus the /snapshot counters.
+    """
+    api = {
+        **snapshots.metrics(),
+        "response_cache": responses.metrics(),
+        "feed": feed.metrics(),
+        "scorer": scorer.metrics()
+    }
+    body = prometheus_text(stage_metrics.latest(), {"api": api})
+    return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# -------------------------
+# Endpoints: Time-windowed tweets
+# -------------------------
+def _filters(start, end, hashtag, location):
+    return {"start": parse_time(start), "end": parse_time(end), "hashtag": hashtag, "location": location}
+
+
+def _stream(tweets, positions, tail):
+    # Async generator: chunks are small, so render them on the event loop
+    # rather than paying a threadpool hop per chunk
+    async def body():
+        yield '{"items":['
+        for chunk in tweets.iter_json(positions):
+            yield chunk
+        yield "]," + tail + "}"
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.get("/tweets")
+async def get_tweets(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    hashtag: Optional[str] = None,
+    location: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Returns tweets with start <= created_at < end, oldest first, optionally
+    filtered by hashtag and location. Pass next_cursor back to get the next page.
+    """
+    try:
+        filters = _filters(start, end, hashtag, location)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return {"error": "Invalid time range or cursor"}
+
+    snapshot = snapshots.current
+    if snapshot is None:
+        return NO_SNAPSHOT
+    tweets = snapshot.tweets
+    positions, next_cursor = tweets.page(limit, after=after, **filters)
+    tail = '"next_cursor":' + (f'"{next_cursor}"' if next_cursor else "null")
+    return _stream(tweets, positions, tail)
+
+
+@app.get("/tweets/top")
+async def get_top_tweets(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    hashtag: Optional[str] = None,
+    location: Optional[str] = None,
+    k: int = Query(10, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Returns the k highest-momentum tweets in the window, best first.
+    """
+    try:
+        filters = _filters(start, end, hashtag, location)
+    except ValueError:
+        return {"error": "Invalid time range"}
+
+    snapshot = snapshots.current
+    if snapshot is None:
+        return NO_SNAPSHOT
+
+    def build():
+        positions = snapshot.tweets.top_k(k, **filters)
+        return {"items": snapshot.tweets.records(positions), "count": len(positions)}
+
+    return responses.respond(request, snapshot.generation, build)
+
+# -------------------------
+# Endpoints: Push feed of micro-batch deltas
+# -------------------------
+@app.get("/feed")
+async def get_feed(request: Request):
+    """
+    Server-sent events: one `batch` event per micro-batch with per-hashtag deltas.
+    Reconnecting clients resume after their Last-Event-ID (a `reset` event first
+    if it is from before an API restart); a `lag` event reports events dropped
+    because the client fell behind.
+    """
+    return StreamingResponse(
+        feed.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _may_publish(request):
+    # With FEED_TOKEN set, publishers send it as a bearer token; without it,
+    # only clients on this host may publish
+    if FEED_TOKEN:
+        return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {FEED_TOKEN}")
+    return request.client is not None and request.client.host in LOCAL_HOSTS
+
+
+@app.post("/feed/batches")
+async def publish_batch(request: Request, batch: dict = Body(...)):
+    """
+    Called by micro_batch_streaming.py after each appended batch; broadcasts it to /feed clients.
+    Requires the FEED_TOKEN bearer token, or a local client when FEED_TOKEN is unset (403 otherwise).
+    """
+    if not _may_publish(request):
+        raise HTTPException(status_code=403, detail="Publishing to the feed is not allowed")
+    event_id = feed.publish(batch)
+    return {"id": event_id, "subscribers": len(feed.subscribers)}
+
+# -------------------------
+# Endpoint: Rising topic terms
+# -------------------------
+@app.get("/topics/rising")
+async def get_rising_topics(
+    hours: int = Query(6, ge=1, le=RETENTION_HOURS),
+    hashtag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Returns, per hashtag, the terms mentioned more in the last `hours` than
+    their time-decayed history predicts (mentions, expected, growth).
+    """
+    engine = topics.current()
+    if engine is None:
+        return {"error": "Topic state not found"}
+    if hashtag is not None and hashtag not in engine.hashtags:
         return {"error": "Hashtag not found"}
-    rec = data["ai_recommendation"].mode()[0]
-    return {"hashtag": hashtag, "recommendation": rec}
+    return {
+        "hours": hours,
+        "latest_hour": engine.latest_hour_iso(),
+        "hashtags": engine.rising_terms(hours, hashtag, limit)
+    }
+
+# -------------------------
+# Endpoint: Online scoring
+# -------------------------
+class ScoreTweet(BaseModel):
+    # likes / retweets are required: a missing count would give a plausible but wrong momentum
+    text: str
+    likes: float = Field(ge=0, allow_inf_nan=False)
+    retweets: float = Field(ge=0, allow_inf_nan=False)
+    tweet_id: Optional[int] = None
+    hashtag: Optional[str] = None
+
+
+class ScoreBatch(BaseModel):
+    tweets: List[ScoreTweet] = Field(min_length=1, max_length=MAX_BATCH)
+
+
+@app.post("/score")
+def score_tweets(batch: ScoreBatch):
+    """
+    Scores {"tweets": [{"text", "likes", "retweets", "tweet_id"?, "hashtag"?}, ...]}:
+    TextBlob / VADER sentiment, momentum, momentum_pct against the maintained
+    momentum distribution, and the AI recommendation, per tweet.
+    Tweets without a text or non-negative likes / retweets are rejected (422).
+    A plain def: scoring is CPU-bound, so FastAPI runs it on its threadpool
+    instead of blocking the event loop. The sub-10 ms p99 target for 100-tweet
+    batches holds for cached texts; new texts cost about 0.2 ms each, divided
+    across the scorer's worker processes (see benchmarks/bench_score.py).
+    """
+    tweets = [tweet.model_dump(exclude_none=True) for tweet in batch.tweets]
+    try:
+        result = scorer.score(tweets, snapshots.current)
+    except ValueError as e:
+        return {"error": str(e)}
+    return Response(dumps(result), media_type="application/json")
@@ -0,0 +1,310 @@
+"""
+TrendPredict – Stage Instrumentation
+Author: Chaimaa Nairi
+Description:
+Common metrics layer for the pipeline scripts. Each script wraps its work in
+`with stage("name") as m:`. When the block ends, one JSON line is appended to
+the metrics log with:
+- wall time and CPU time: the whole process (worker threads such as the
+  fetcher's pool and the sentiment stage included) plus child processes such
+  as the VADER pool. When stages overlap in one process (pipeline.py runs
+  several on threads), process time can't be split between them, so each
+  overlapping stage reports its own thread's CPU instead ("cpu_scope": "thread").
+- peak RSS of the process so far
+- rows in / out and bytes read / written, as reported by the script
+
+The log is append-only, so runs can be compared as the data grows.
+
+Optional hooks, enabled with TRENDPULSE_PROFILE (comma-separated):
+- cprofile:     the stage is profiled; stats are dumped to PROFILE_DIR and their path is logged
+- tracemalloc:  Python allocation peak and the top allocation sites are logged
+                (process-wide: stages running concurrently share the peak)
+
+MetricsLog tails the log for the Hyper API, which serves the latest record per
+stage in Prometheus text format (GET /metrics, see prometheus_text()).
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# -------------------------
+# Configuration
+# -------------------------
+METRICS_FILE = "../data/pipeline_metrics.jsonl"
+PROFILE_DIR = "../data/profiles"
+PROFILE_ENV = "TRENDPULSE_PROFILE"
+TOP_ALLOCATIONS = 5
+
+RUN_ID = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"  # one per process
+_lock = threading.Lock()
+_active = set()  # StageRecords of the stages currently running in this process
+
+
+def _script_name():
+    return os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+
+
+def path_size(path):
+    """
+    Size of a file, or of every file under a directory (0 if missing).
+    """
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path) for name in names
+        )
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def peak_rss_bytes():
+    # VmHWM where available: ru_maxrss keeps the parent's peak across fork + exec,
+    # so a small stage started by a large process would report the parent's RSS
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+    except (OSError, StopIteration):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def profile_hooks():
+    value = os.environ.get(PROFILE_ENV, "")
+    return {hook.strip().lower() for hook in value.split(",") if hook.strip()}
+
+
+class StageRecord:
+    def __init__(self, script, stage):
+        self.script = script
+        self.stage = stage
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.extra = {}
+        self.overlapped = False  # another stage ran in this process at the same time
+
+    def rows(self, rows_in=None, rows_out=None):
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+
+    def read(self, *paths):
+        self.bytes_read += sum(path_size(p) for p in paths)
+
+    def wrote(self, *paths):
+        self.bytes_written += sum(path_size(p) for p in paths)
+
+
+# -------------------------
+# Stage context
+# -------------------------
+@contextmanager
+def stage(name, script=None, metrics_file=METRICS_FILE, hooks=None):
+    """
+    Measures the enclosed block and appends its record to metrics_file
+    (None to only measure). Yields the StageRecord to report rows / bytes on;
+    its wall_seconds and cpu_seconds are set when the block ends.
+    """
+    record = StageRecord(script or _script_name(), name)
+    hooks = profile_hooks() if hooks is None else set(hooks)
+
+    profiler = None
+    if "cprofile" in hooks:
+        profiler = cProfile.Profile()
+    started_tracing = "tracemalloc" in hooks and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif "tracemalloc" in hooks:
+        tracemalloc.reset_peak()
+
+    status = "ok"
+    with _lock:
+        if _active:
+            record.overlapped = True
+            for other in _active:
+                other.overlapped = True
+        _active.add(record)
+    wall_start, children_start = time.perf_counter(), _children_cpu()
+    process_start, thread_start = time.process_time(), time.thread_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        record.wall_seconds = time.perf_counter() - wall_start
+        process_cpu, thread_cpu = time.process_time() - process_start, time.thread_time() - thread_start
+        with _lock:
+            _active.discard(record)
+            record.cpu_scope = "thread" if record.overlapped else "process"
+        own_cpu = thread_cpu if record.overlapped else process_cpu
+        record.cpu_seconds = own_cpu + _children_cpu() - children_start
+
+        # Allocations first, so the profile dump doesn't show up in them
+        if "tracemalloc" in hooks:
+            record.extra["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            record.extra["top_allocations"] = [
+                {"where": str(stat.traceback), "bytes": stat.size}
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+            ]
+            if started_tracing:
+                tracemalloc.stop()
+        if profiler:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            record.extra["profile"] = os.path.join(PROFILE_DIR, f"{record.script}.{name}.{RUN_ID}.prof")
+            profiler.dump_stats(record.extra["profile"])
+
+        if metrics_file:
+            emit({
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "run_id": RUN_ID,
+                "script": record.script,
+                "stage": name,
+                "status": status,
+                "wall_seconds": round(record.wall_seconds, 6),
+                "cpu_seconds": round(record.cpu_seconds, 6),
+                "cpu_scope": record.cpu_scope,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "rows_in": record.rows_in,
+                "rows_out": record.rows_out,
+                "bytes_read": record.bytes_read,
+                "bytes_written": record.bytes_written,
+                **record.extra
+            }, metrics_file)
+
+
+def emit(entry, metrics_file=METRICS_FILE):
+    """
+    Appends one JSON line to the metrics log (one writer at a time per process).
+    """
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        directory = os.path.dirname(metrics_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(metrics_file, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# -------------------------
+# Reading the log (Hyper API)
+# -------------------------
+class MetricsLog:
+    """
+    Tails the metrics log and keeps the latest record per (script, stage).
+    Each call only parses lines appended since the previous one.
+    """
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self.offset = 0
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def latest(self):
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                return {}
+            if size < self.offset:  # log was truncated or replaced
+                self.offset, self.records = 0, {}
+            if size > self.offset:
+                with open(self.path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read(size - self.offset)
+                complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+                for line in data[:complete].splitlines():
+                    try:
+                        entry = json.loads(line)
+                        self.records[(entry["script"], entry["stage"])] = entry
+                    except (ValueError, KeyError):
+                        continue
+                self.offset += complete
+            return dict(self.records)
+
+
+# -------------------------
+# Prometheus text format
+# -------------------------
+STAGE_GAUGES = [
+    ("wall_seconds", "wall_seconds", "Wall time of the stage's last run"),
+    ("cpu_seconds", "cpu_seconds", "CPU time of the stage's last run"),
+    ("peak_rss_bytes", "peak_rss_bytes", "Peak process RSS at the end of the stage's last run"),
+    ("rows_in", "rows_in", "Rows read by the stage's last run"),
+    ("rows_out", "rows_out", "Rows written by the stage's last run"),
+    ("bytes_read", "bytes_read", "Bytes read by the stage's last run"),
+    ("bytes_written", "bytes_written", "Bytes written by the stage's last run"),
+    ("traced_peak_bytes", "traced_peak_bytes", "Peak traced Python allocations (tracemalloc hook)"),
+]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def prometheus_text(records, gauges=None, prefix="trendpulse"):
+    """
+    Renders the latest stage records (from MetricsLog.latest()) and a nested
+    dict of numeric gauges (e.g. API counters) in Prometheus exposition format.
+    """
+    lines = []
+    ordered = sorted(records.items())
+    for field, name, help_text in STAGE_GAUGES:
+        samples = [(key, entry[field]) for key, entry in ordered if entry.get(field) is not None]
+        if not samples:
+            continue
+        lines.append(f"# HELP {prefix}_stage_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_stage_{name} gauge")
+        for (script, stage_name), value in samples:
+            lines.append(f'{prefix}_stage_{name}{{script="{_label(script)}",stage="{_label(stage_name)}"}} {_number(value)}')
+
+    if ordered:
+        lines.append(f"# HELP {prefix}_stage_success Whether the stage's last run succeeded")
+        lines.append(f"# TYPE {prefix}_stage_success gauge")
+        for (script, stage_name), entry in ordered:
+            ok = int(entry.get("status") == "ok")
+            lines.append(f'{prefix}_stage_success{{script="{_label(script)}",stage="{_label(stage_name)}"}} {ok}')
+
+    def flatten(values, name):
+        for key, value in values.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{name}_{key}")
+            elif isinstance(value, (bool, int, float)):
+                yield f"{name}_{key}", value
+
+    for name, value in flatten(gauges or {}, prefix):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -2,36 +2,35 @@
 TrendPredict – JSON to CSV Converter
 Author: Chaimaa Nairi
 Description:
-Reads the Twitter/X JSON data and outputs a CSV file compatible
+Reads the Twitter/X JSONL raw store and outputs a CSV file compatible
 with the Tableau dashboard.
+Runs incrementally: records are streamed in chunks and only lines added
+since the last saved offset are converted and appended to the CSV.
+Once the micro-batch segment store exists, the same records are appended to it
+too (from the JSONL position saved in its manifest), so the store stays the
+single source downstream scripts read from. VADER scores from the fused
+ingestion stage go to the store only; the CSV keeps the raw schema.
 """
 
+import argparse
 import json
 import pandas as pd
 import os
+from jsonl_store import JSONL_DIR, iter_chunks, list_segments, migrate_json
+from segment_store import STORE_DIR as SEGMENT_DIR, append_segment, load_manifest, store_exists, store_tweet_ids
+from extract_writer import sync_extract
+from instrumentation import path_size, stage
 
 # -------------------------
 # Config
 # -------------------------
-JSON_FILE = "../data/twitter_trends.json"
+JSON_FILE = "../data/twitter_trends.json"  # legacy single-file history, migrated once
 CSV_FILE = "../data/twitter_trends.csv"
+OFFSET_FILE = "../data/json_to_csv_offset.json"
+CHUNK_SIZE = 10_000
 
 # -------------------------
-# Load JSON
-# -------------------------
-if not os.path.exists(JSON_FILE):
-    raise FileNotFoundError(f"❌ JSON file not found: {JSON_FILE}")
-
-with open(JSON_FILE, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# -------------------------
-# Convert to DataFrame
-# -------------------------
-df = pd.DataFrame(data)
-
-# -------------------------
-# Ensure all expected columns exist
+# Expected CSV schema
 # -------------------------
 expected_columns = [
     "tweet_id",
@@ -47,15 +46,130 @@ expected_columns = [
     "user_location"
 ]
 
-for col in expected_columns:
-    if col not in df.columns:
-        df[col] = None  # add missing columns as empty
+# VADER scores from the fused ingestion stage (sentiment_stage.py). They stay out
+# of the raw CSV (nlp_vader.py adds them downstream) but are kept in the segment store
+vader_columns = ["sentiment_vader", "sentiment_vader_category"]
 
-# Reorder columns
-df = df[expected_columns]
+# Raw records may carry numbers as strings; the segment store keeps them typed
+numeric_columns = ["tweet_id", "likes", "retweets", "sentiment", "momentum", "sentiment_vader"]
 
 # -------------------------
-# Save CSV
+# Incremental conversion
 # -------------------------
-df.to_csv(CSV_FILE, index=False, encoding="utf-8")
-print(f"✅ CSV created from JSON → {CSV_FILE} ({len(df)} rows)")
\ No newline at end of file
+def raw_schema(df):
+    """
+    The expected_columns of df (e.g. a segment store read), in order.
+    """
+    return df[[col for col in expected_columns if col in df.columns]]
+
+
+def resume_position(csv_file=CSV_FILE, offset_file=OFFSET_FILE):
+    """
+    Saved JSONL offset to resume from, or None when the CSV has to be rebuilt
+    (no offset yet, or the CSV header doesn't match the expected columns).
+    """
+    csv_header = None
+    if os.path.exists(csv_file):
+        with open(csv_file, "r", encoding="utf-8") as f:
+            csv_header = f.readline().strip()
+
+    if os.path.exists(offset_file) and csv_header == ",".join(expected_columns):
+        with open(offset_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def convert_new_records(json_file=JSON_FILE, csv_file=CSV_FILE, offset_file=OFFSET_FILE,
+                        store_dir=JSONL_DIR, chunk_size=CHUNK_SIZE):
+    """
+    Appends records added to the JSONL store since the last run to the CSV.
+    Returns the number of new rows.
+    """
+    # Locate raw records
+    migrate_json(json_file, store_dir)
+    if not list_segments(store_dir):
+        raise FileNotFoundError(f"❌ JSONL store not found: {store_dir}")
+
+    # Resume from the last converted offset; without one (or after a schema change),
+    # rebuild the CSV from scratch
+    position = resume_position(csv_file, offset_file)
+    if position is None and os.path.exists(csv_file):
+        os.remove(csv_file)
+
+    # Convert new records chunk by chunk
+    new_rows = 0
+
+    for records, position in iter_chunks(store_dir, position, chunk_size=chunk_size):
+        df = pd.DataFrame(records)
+
+        # Ensure all expected columns exist
+        for col in expected_columns:
+            if col not in df.columns:
+                df[col] = None  # add missing columns as empty
+
+        # Reorder columns
+        df = df[expected_columns]
+
+        # Append to CSV (header only for a new file)
+        df.to_csv(csv_file, mode="a", header=not os.path.exists(csv_file), index=False, encoding="utf-8")
+        new_rows += len(df)
+
+        # Commit the offset only after the chunk is written
+        tmp_path = offset_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(position, f)
+        os.replace(tmp_path, offset_file)
+
+    return new_rows
+
+
+def sync_segment_store(segment_dir=SEGMENT_DIR, store_dir=JSONL_DIR, chunk_size=CHUNK_SIZE):
+    """
+    Appends JSONL records the segment store hasn't absorbed yet, resuming from
+    the position committed in its manifest, then brings the Tableau extract up
+    to date with the store. On the first sync, records already in the store
+    (seeded from the CSV) are skipped. Does nothing without a store.
+    Returns the number of rows appended.
+    """
+    if not store_exists(segment_dir):
+        return 0
+    position = load_manifest(segment_dir).get("jsonl_position")
+    stored = store_tweet_ids(segment_dir).to_numpy() if position is None else None
+
+    new_rows = 0
+    for records, position in iter_chunks(store_dir, position, chunk_size=chunk_size):
+        df = pd.DataFrame(records)
+        for col in expected_columns + vader_columns:
+            if col not in df.columns:
+                df[col] = None
+        df = df[expected_columns + vader_columns]
+        df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric)
+        if stored is not None:
+            df = df[~df["tweet_id"].isin(stored)]
+
+        # Segments and position are committed in one manifest swap
+        append_segment(df, segment_dir, jsonl_position=position)
+        new_rows += len(df)
+
+    # The typed Tableau extract follows the store (see extract_writer.py)
+    sync_extract(segment_dir)
+    return new_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse JSONL to CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="records converted per chunk")
+    args = parser.parse_args()
+
+    with stage("convert") as m:
+        csv_size = path_size(CSV_FILE) if resume_position() is not None else 0  # a rebuild rewrites the whole CSV
+        new_rows = convert_new_records(chunk_size=args.chunk_size)
+        m.rows(rows_in=new_rows, rows_out=new_rows)
+        m.bytes_written = path_size(CSV_FILE) - csv_size
+    print(f"✅ CSV updated from JSONL → {CSV_FILE} (+{new_rows} rows)")
+
+    with stage("sync_store") as m:
+        synced = sync_segment_store(chunk_size=args.chunk_size)
+        m.rows(rows_in=synced, rows_out=synced)
+    if synced:
+        print(f"✅ Segment store updated from JSONL → {SEGMENT_DIR} (+{synced} rows)")
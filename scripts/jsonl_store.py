@@ -0,0 +1,151 @@
+"""
+TrendPredict – Append-Only JSONL Raw Store
+Author: Chaimaa Nairi
+Description:
+Newline-delimited JSON storage for raw Twitter/X records, replacing the
+monolithic twitter_trends.json that was rewritten on every run.
+
+- Records are appended to the active segment (twitter_trends.000001.jsonl, ...).
+- Once a segment grows past ROTATE_BYTES it is sealed (optionally gzip-compressed)
+  and a new segment is started.
+- Readers stream records in chunks from a (segment, offset) position, so
+  consumers such as json_to_csv.py only process lines added since their last run.
+"""
+
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+
+# -------------------------
+# Configuration
+# -------------------------
+JSONL_DIR = "../data/twitter_trends_jsonl"
+PREFIX = "twitter_trends"
+ROTATE_BYTES = 64 * 1024 * 1024  # seal the active segment after 64 MB
+COMPRESS_ROTATED = True          # gzip sealed segments
+
+_write_lock = threading.Lock()
+
+
+# -------------------------
+# Segment helpers
+# -------------------------
+def _segment_path(store_dir, seq, compressed=False):
+    name = f"{PREFIX}.{seq:06d}.jsonl" + (".gz" if compressed else "")
+    return os.path.join(store_dir, name)
+
+
+def list_segments(store_dir=JSONL_DIR):
+    """
+    Returns [(seq, path)] in order. A segment is either plain or gzip-compressed.
+    """
+    pattern = re.compile(rf"{re.escape(PREFIX)}\.(\d+)\.jsonl(\.gz)?$")
+    segments = {}
+    for path in glob.glob(os.path.join(store_dir, f"{PREFIX}.*.jsonl*")):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            seq = int(match.group(1))
+            # Prefer the plain file while a rotation is compressing it
+            if seq not in segments or not match.group(2):
+                segments[seq] = path
+    return sorted(segments.items())
+
+
+def _open_segment(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _rotate(store_dir, seq, compress):
+    path = _segment_path(store_dir, seq)
+    if compress:
+        with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + ".gz.tmp", _segment_path(store_dir, seq, compressed=True))
+        os.remove(path)
+    # Touching the next segment makes it the active one
+    open(_segment_path(store_dir, seq + 1), "ab").close()
+
+
+# -------------------------
+# Write path
+# -------------------------
+def append_records(records, store_dir=JSONL_DIR, rotate_bytes=ROTATE_BYTES, compress=COMPRESS_ROTATED):
+    """
+    Appends records as JSON lines to the active segment, rotating it when full.
+    Cost is proportional to the number of new records only.
+    """
+    if not records:
+        return
+
+    with _write_lock:
+        os.makedirs(store_dir, exist_ok=True)
+        segments = list_segments(store_dir)
+        seq = segments[-1][0] if segments else 1
+        if segments and segments[-1][1].endswith(".gz"):
+            seq += 1
+
+        path = _segment_path(store_dir, seq)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        if size >= rotate_bytes:
+            _rotate(store_dir, seq, compress)
+
+
+# -------------------------
+# Read path
+# -------------------------
+def iter_chunks(store_dir=JSONL_DIR, position=None, chunk_size=10_000):
+    """
+    Streams records in chunks starting at position = {"seq": int, "offset": int}
+    (offset in uncompressed bytes). Yields (records, position_after_chunk).
+    A trailing line that is still being written is left for the next run.
+    """
+    position = position or {"seq": 1, "offset": 0}
+
+    for seq, path in list_segments(store_dir):
+        if seq < position["seq"]:
+            continue
+        offset = position["offset"] if seq == position["seq"] else 0
+
+        with _open_segment(path) as f:
+            f.seek(offset)
+            records = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.strip():
+                    records.append(json.loads(line))
+                if len(records) >= chunk_size:
+                    yield records, {"seq": seq, "offset": offset}
+                    records = []
+            if records:
+                yield records, {"seq": seq, "offset": offset}
+
+
+def iter_records(store_dir=JSONL_DIR, chunk_size=10_000):
+    for records, _ in iter_chunks(store_dir, chunk_size=chunk_size):
+        yield from records
+
+
+def migrate_json(json_file, store_dir=JSONL_DIR):
+    """
+    One-time import of a legacy twitter_trends.json array into an empty JSONL store.
+    """
+    if list_segments(store_dir) or not os.path.exists(json_file):
+        return 0
+    with open(json_file, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    append_records(records, store_dir)
+    return len(records)
@@ -5,25 +5,43 @@ Author: Chaimaa Nairi
 Description:
 Simulates real-time Twitter/X streaming using a micro-batch architecture.
 The script periodically fetches new tweets for selected hashtags,
-appends them to an existing CSV dataset, and avoids duplicates.
+appends them to an append-only segment store, and avoids duplicates.
+Each batch only writes new Parquet segments (see segment_store.py),
+so a micro-batch costs O(batch size) instead of rewriting the full CSV.
+The store is seeded from the CSV once; after that json_to_csv.py appends the
+tweets it converts to the store as well, so downstream scripts see both feeds.
 
 This approach provides near-real-time data updates without requiring
 heavy streaming infrastructure (e.g., Kafka or Spark), making it
 lightweight, scalable, and production-realistic.
 
 Used for live-updating Tableau dashboards.
+After each batch, its per-hashtag deltas are posted to the Hyper API,
+which pushes them to /feed subscribers (see trend_feed.py), and the typed
+Tableau extract catches up with the store (see extract_writer.py).
 """
 
 import time
 import os
 import pandas as pd
+import requests
 from datetime import datetime
+from segment_store import STORE_DIR, append_segment, load_manifest, read_snapshot, store_exists
+from json_to_csv import resume_position
+from seen_index import SeenIndex, bootstrap_index
+from sentiment_stage import score_rows
+from trend_feed import batch_deltas, history_window, opportunity_flags
+from extract_writer import sync_extract
+from config import FEED_TOKEN
+from instrumentation import stage
+import rules
 
 # -------------------------
 # Configuration
 # -------------------------
-CSV_FILE = "../data/twitter_trends.csv"
+CSV_FILE = "../data/twitter_trends.csv"  # seeds the store on first run
 REFRESH_INTERVAL = 60  # seconds (1 minute)
+FEED_URL = "http://127.0.0.1:8000/feed/batches"  # Hyper API push feed (None to disable)
 
 # -------------------------
 # Simulated fetch function
@@ -33,6 +51,7 @@ def fetch_new_tweets():
     """
     Simulates fetching new tweets.
     In production, this would call the Twitter/X API.
+    Sentiment (TextBlob + VADER) is scored in one pass at ingestion.
     """
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -44,42 +63,84 @@ def fetch_new_tweets():
             "text": "Live update tweet about #AI and #Python",
             "likes": 15,
             "retweets": 7,
-            "sentiment": 0.42,
-            "sentiment_category": "Positive",
             "hashtag": "#AI",
-            "momentum": 85.4,
-            "momentum_status": "⏳ Stable",
             "user_location": "LiveStream"
         }
     ]
+    score_rows(new_data)
 
-    return pd.DataFrame(new_data)
+    df = pd.DataFrame(new_data)
+    df["momentum"] = rules.momentum_score(df["likes"], df["retweets"], df["sentiment"])
+    df["momentum_status"] = rules.momentum_status(df["momentum"])
+    return df
 
 # -------------------------
-# Micro-batch streaming loop
+# Push batch deltas to the Hyper API feed
 # -------------------------
-print("🚀 Micro-batch streaming started (press CTRL+C to stop)")
-
-while True:
+def flag_spikes(df):
+    """
+    Adds feature_engineering.py's opportunity_flag to an appended batch, from the
+    store's last few hours of the batch's hashtags (not the whole history).
+    """
+    if df.empty:
+        return df.assign(opportunity_flag="")
+    history = read_snapshot(
+        STORE_DIR,
+        columns=["created_at", "hashtag", "likes", "retweets"],
+        hashtags=set(df["hashtag"].astype(str)),
+        start_hour=history_window(load_manifest(STORE_DIR)["segments"], df)
+    )
+    return df.assign(opportunity_flag=opportunity_flags(df, history))
+
+
+def publish_batch(df, version):
+    if not FEED_URL or df.empty:
+        return
+    deltas = batch_deltas(flag_spikes(df))
+    batch = {"version": version, "published_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "hashtags": deltas}
     try:
-        # Load existing CSV
-        if os.path.exists(CSV_FILE):
-            existing_df = pd.read_csv(CSV_FILE)
-        else:
-            existing_df = pd.DataFrame()
+        headers = {"Authorization": f"Bearer {FEED_TOKEN}"} if FEED_TOKEN else None
+        response = requests.post(FEED_URL, json=batch, headers=headers, timeout=2)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        # The API may not be running; the store stays the source of truth
+        print(f"⚠️ Feed publish failed: {e}")
 
-        # Fetch new batch
-        new_df = fetch_new_tweets()
+# -------------------------
+# Micro-batch streaming loop
+# -------------------------
+print("🚀 Micro-batch streaming started (press CTRL+C to stop)")
 
-        # Avoid duplicates
-        if not existing_df.empty:
-            new_df = new_df[~new_df["tweet_id"].isin(existing_df["tweet_id"])]
+# Seed the segment store from the legacy CSV once; the CSV's JSONL offset tells
+# json_to_csv.py where to continue appending to the store from
+if not store_exists(STORE_DIR) and os.path.exists(CSV_FILE):
+    append_segment(pd.read_csv(CSV_FILE), STORE_DIR, jsonl_position=resume_position(CSV_FILE))
+    print(f"📦 Segment store seeded from {CSV_FILE}")
 
-        # Append & save
-        updated_df = pd.concat([existing_df, new_df], ignore_index=True)
-        updated_df.to_csv(CSV_FILE, index=False, encoding="utf-8")
+# Load the shared seen tweet_id index (built once from history if missing)
+seen = SeenIndex()
+if not seen.exists() and store_exists(STORE_DIR):
+    seen = bootstrap_index(read_snapshot(STORE_DIR, columns=["tweet_id"])["tweet_id"])
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] CSV updated → {len(updated_df)} total rows")
+while True:
+    try:
+        with stage("micro_batch") as m:
+            # Fetch new batch
+            new_df = fetch_new_tweets()
+            m.rows(rows_in=len(new_df))
+
+            # Avoid duplicates (cost scales with batch size, not history)
+            new_df = new_df[seen.filter_new(new_df["tweet_id"])]
+
+            # Append new segment only, then mark its IDs as seen; the extract
+            # catches up from the store (also after a failed sync)
+            version = append_segment(new_df, STORE_DIR)
+            seen.add(new_df["tweet_id"])
+            sync_extract(STORE_DIR)
+            publish_batch(new_df, version)
+            m.rows(rows_out=len(new_df))
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Store updated → +{len(new_df)} rows (version {version})")
 
         time.sleep(REFRESH_INTERVAL)
 
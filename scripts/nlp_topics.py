@@ -5,24 +5,39 @@ Description:
 Extracts dominant discussion keywords from Twitter/X tweets
 using TF-IDF to explain WHY trends are emerging.
 Outputs topic keywords per hashtag for Tableau storytelling.
+Keywords are maintained incrementally (see topic_engine.py): each run only
+tokenizes tweets added since the last one and rescores the hashtags they touch.
+Also outputs the top rising terms per hashtag over the last few hours, to show
+why a trend is emerging now.
+With --chunk-size, the history is tokenized and the output written in chunks of
+that many rows (bounded memory, see chunked.py); only the term counts are kept.
+Tweets are read like the other stages: from the segment store when it exists,
+otherwise from the CSV.
 """
 
+import argparse
+import tempfile
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
+from chunked import CHUNK_SIZE, read_trend_chunks, widen, write_chunks
+from segment_store import STORE_DIR, read_trends, trends_source
+from json_to_csv import raw_schema
+from topic_engine import TOPIC_STATE_DIR, TopicEngine
+from instrumentation import stage
 
 # -------------------------
 # Configuration
 # -------------------------
-CSV_INPUT = "../data/twitter_trends.csv"
+CSV_INPUT = "../data/twitter_trends.csv"  # fallback when the segment store is absent
 CSV_OUTPUT = "../data/twitter_trends_topics.csv"
+DIMENSION_OUTPUT = "../data/twitter_trends_topics_hashtags.csv"  # normalized mode: one row per hashtag
+RISING_OUTPUT = "../data/twitter_trends_rising_terms.csv"
+RISING_HOURS = 6   # window for rising terms
+RISING_LIMIT = 10  # rising terms per hashtag
 
 # -------------------------
-# Load data
-# -------------------------
-df = pd.read_csv(CSV_INPUT)
-
-# -------------------------
-# Keyword extraction function
+# Keyword extraction function (full refit, reference for the incremental engine)
 # -------------------------
 def extract_keywords(texts, top_n=3):
     if len(texts) == 0:
@@ -48,24 +63,151 @@ def extract_keywords(texts, top_n=3):
 # -------------------------
 # Extract topics per hashtag
 # -------------------------
-topics = []
+def refit_topics(df):
+    """
+    Keywords per hashtag, refitting TF-IDF on every group from scratch.
+    """
+    return {
+        hashtag: extract_keywords(group["text"].astype(str))
+        for hashtag, group in df.groupby("hashtag")
+    }
+
+
+def topic_dimension(df, state_dir=TOPIC_STATE_DIR):
+    """
+    One row per hashtag with its top TF-IDF keywords (hashtag, topic_keywords).
+    With a state_dir, only tweets not seen by the previous run are processed.
+    """
+    engine = TopicEngine(state_dir)
+    new_rows = engine.update(df)
+    if state_dir and new_rows:
+        engine.save()
+    return _dimension(engine)
+
 
-for hashtag, group in df.groupby("hashtag"):
-    keywords = extract_keywords(group["text"].astype(str))
-    topics.append({
-        "hashtag": hashtag,
-        "topic_keywords": keywords
+def _dimension(engine):
+    topics = engine.topics()
+    return pd.DataFrame({
+        "hashtag": list(topics),
+        "topic_keywords": list(topics.values())
     })
 
-topics_df = pd.DataFrame(topics)
 
-# -------------------------
-# Merge back into main df
-# -------------------------
-df = df.merge(topics_df, on="hashtag", how="left")
+def add_topics(df, state_dir=TOPIC_STATE_DIR):
+    """
+    Returns the raw columns of df with a topic_keywords column (top TF-IDF
+    keywords of its hashtag). VADER scores carried by store rows are left out.
+    """
+    # Merge back into main df
+    return raw_schema(df).merge(topic_dimension(df, state_dir), on="hashtag", how="left")
 
-# -------------------------
-# Save output
-# -------------------------
-df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
-print(f"✅ Topic-enhanced CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
+
+def rising_topics(df, hours=RISING_HOURS, state_dir=TOPIC_STATE_DIR, limit=RISING_LIMIT):
+    """
+    Top rising terms per hashtag over the last `hours`: one row per (hashtag, term),
+    comparing mentions in the window with what the decayed history predicts.
+    """
+    engine = TopicEngine(state_dir)
+    if engine.update(df) and state_dir:
+        engine.save()
+    return _rising(engine, hours, limit)
+
+
+def _rising(engine, hours, limit):
+    rows = [
+        {"hashtag": hashtag, "rank": rank, **term}
+        for hashtag, terms in engine.rising_terms(hours, limit=limit).items()
+        for rank, term in enumerate(terms, start=1)
+    ]
+    return pd.DataFrame(rows, columns=["hashtag", "rank", "term", "mentions", "expected", "growth"])
+
+
+def topics_chunked(csv_input=CSV_INPUT, chunk_size=CHUNK_SIZE, state_dir=TOPIC_STATE_DIR,
+                   hours=RISING_HOURS, csv_output=CSV_OUTPUT, dimension_output=None, store_dir=STORE_DIR):
+    """
+    Chunked run: folds the history into the topic engine chunk by chunk, then
+    writes the hashtag dimension (dimension_output) or the per-tweet topics
+    (csv_output, joined chunk by chunk). Returns the rising terms.
+    """
+    engine = TopicEngine(state_dir)
+    columns = ["tweet_id", "created_at", "text", "hashtag"]
+    if engine.update_chunks(lambda: read_trend_chunks(csv_input, store_dir, chunk_size, columns)) and state_dir:
+        engine.save()
+
+    dimension = _dimension(engine)
+    if dimension_output is not None:
+        dimension.to_csv(dimension_output, index=False, encoding="utf-8")
+    else:
+        chunks = read_trend_chunks(csv_input, store_dir, chunk_size)
+        write_chunks((raw_schema(widen(chunk)).merge(dimension, on="hashtag", how="left") for chunk in chunks),
+                     csv_output)
+    return _rising(engine, hours, RISING_LIMIT)
+
+
+def verify_incremental(df, batches=5):
+    """
+    Differential check: feeding the data in several batches through the
+    incremental engine (saved and reloaded between batches) must give exactly
+    the keywords of a full refit.
+    """
+    expected = refit_topics(df)
+    with tempfile.TemporaryDirectory() as state_dir:
+        for end in np.array_split(np.arange(len(df)), batches):
+            if len(end):
+                engine = TopicEngine(state_dir)
+                engine.update(df.iloc[:end[-1] + 1])
+                engine.save()
+        actual = TopicEngine(state_dir).topics()
+    assert actual == expected, {h: (actual.get(h), expected.get(h)) for h in expected if actual.get(h) != expected[h]}
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse topic keywords")
+    parser.add_argument("--verify", action="store_true", help="check incremental keywords against a full refit")
+    parser.add_argument("--hours", type=int, default=RISING_HOURS, help="window for rising terms")
+    parser.add_argument("--normalized", action="store_true",
+                        help="write one row per hashtag instead of keywords on every tweet")
+    parser.add_argument("--chunk-size", type=int, help="process the history in chunks of this many rows")
+    args = parser.parse_args()
+
+    if args.chunk_size and args.verify:
+        parser.error("--verify compares in memory; drop --chunk-size")
+
+    with stage("topics") as m:
+        m.read(trends_source(CSV_INPUT, STORE_DIR))
+        if args.chunk_size:
+            dimension_output = DIMENSION_OUTPUT if args.normalized else None
+            rising = topics_chunked(chunk_size=args.chunk_size, hours=args.hours, dimension_output=dimension_output)
+            m.wrote(dimension_output or CSV_OUTPUT)
+            print(f"✅ Topic keywords saved → {dimension_output or CSV_OUTPUT} (chunks of {args.chunk_size})")
+            rising.to_csv(RISING_OUTPUT, index=False, encoding="utf-8")
+            m.wrote(RISING_OUTPUT)
+            print(f"✅ Rising terms (last {args.hours}h) saved → {RISING_OUTPUT} ({len(rising)} rows)")
+        elif args.verify:
+            df = read_trends(CSV_INPUT, STORE_DIR)
+            m.rows(rows_in=len(df))
+            verify_incremental(df)
+            print(f"✅ Incremental topics match a full TF-IDF refit ({len(df)} rows)")
+        else:
+            df = read_trends(CSV_INPUT, STORE_DIR)
+            m.rows(rows_in=len(df))
+            rising = rising_topics(df, args.hours)
+            if args.normalized:
+                # Hashtag dimension only; Tableau relates it to the tweets on hashtag
+                topics_df = topic_dimension(df)
+                topics_df.to_csv(DIMENSION_OUTPUT, index=False, encoding="utf-8")
+                m.rows(rows_out=len(topics_df))
+                m.wrote(DIMENSION_OUTPUT)
+                print(f"✅ Topic keywords per hashtag saved → {DIMENSION_OUTPUT} ({len(topics_df)} rows)")
+            else:
+                df = add_topics(df)
+
+                # Save output
+                df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+                m.rows(rows_out=len(df))
+                m.wrote(CSV_OUTPUT)
+                print(f"✅ Topic-enhanced CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
+            rising.to_csv(RISING_OUTPUT, index=False, encoding="utf-8")
+            m.wrote(RISING_OUTPUT)
+            print(f"✅ Rising terms (last {args.hours}h) saved → {RISING_OUTPUT} ({len(rising)} rows)")
@@ -4,56 +4,93 @@ Author: Chaimaa Nairi
 Description:
 Reads existing Twitter/X data CSV and adds VADER sentiment analysis.
 Generates sentiment_vader and sentiment_vader_category columns for Tableau dashboards.
+Scoring is batched through vader_engine.py: scores are cached by text hash,
+so reruns after a micro-batch only score new tweets, and the VADER lexicon is
+downloaded there on first use only.
+Tweets ingested through the fused sentiment stage (sentiment_stage.py) already
+carry VADER scores and are passed through untouched.
+With --chunk-size, the history is processed in chunks of that many rows
+(bounded memory, see chunked.py).
 """
 
+import argparse
 import pandas as pd
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-
-
-nltk.download('vader_lexicon')
+from chunked import CHUNK_SIZE, read_trend_chunks, widen, write_chunks
+from vader_engine import ScoreCache, score_texts, CACHE_FILE
+from rules import vader_category
+from segment_store import STORE_DIR, read_trends, trends_source
+from instrumentation import stage
 
 # -------------------------
 # Configuration
 # -------------------------
-CSV_INPUT = "../data/twitter_trends.csv"
+CSV_INPUT = "../data/twitter_trends.csv"  # fallback when the segment store is absent
 CSV_OUTPUT = "../data/twitter_trends_vader.csv"
 
 # -------------------------
-# Load CSV
+# Apply VADER to tweets not scored at ingestion (cached, batched)
 # -------------------------
-df = pd.read_csv(CSV_INPUT)
+def add_vader(df, cache_file=CACHE_FILE, cache=None):
+    """
+    Returns a copy of df with sentiment_vader / sentiment_vader_category filled in.
+    An open ScoreCache can be passed in to reuse it across calls.
+    """
+    df = df.copy()
 
-# Ensure datetime format
-df["created_at"] = pd.to_datetime(df["created_at"])
+    # Ensure datetime format
+    df["created_at"] = pd.to_datetime(df["created_at"])
 
-# -------------------------
-# Initialize VADER
-# -------------------------
-vader = SentimentIntensityAnalyzer()
+    if "sentiment_vader" not in df.columns:
+        df["sentiment_vader"] = float("nan")
+        df["sentiment_vader_category"] = None
 
-# -------------------------
-# Function to compute VADER sentiment
-# -------------------------
-def vader_sentiment(text):
-    score = vader.polarity_scores(str(text))["compound"]
-    if score >= 0.05:
-        category = "Positive"
-    elif score <= -0.05:
-        category = "Negative"
-    else:
-        category = "Neutral"
-    return score, category
+    missing = df["sentiment_vader"].isna()
+    if missing.any():
+        own_cache = cache is None
+        if own_cache:
+            cache = ScoreCache(cache_file)
+        scores = score_texts(df.loc[missing, "text"], cache=cache)
+        if own_cache:
+            cache.close()
 
-# -------------------------
-# Apply VADER to all tweets
-# -------------------------
-vader_results = df["text"].apply(vader_sentiment)
-df["sentiment_vader"] = vader_results.apply(lambda x: x[0])
-df["sentiment_vader_category"] = vader_results.apply(lambda x: x[1])
+        df["sentiment_vader"] = df["sentiment_vader"].astype("float64")
+        df["sentiment_vader_category"] = df["sentiment_vader_category"].astype(object)
+        df.loc[missing, "sentiment_vader"] = scores
+        df.loc[missing, "sentiment_vader_category"] = vader_category(scores).astype(str)
+    return df
 
-# -------------------------
-# Save final CSV
-# -------------------------
-df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
-print(f"✅ VADER-enhanced CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
+
+def add_vader_chunked(csv_input=CSV_INPUT, csv_output=CSV_OUTPUT, store_dir=STORE_DIR,
+                      chunk_size=CHUNK_SIZE, cache_file=CACHE_FILE):
+    """
+    add_vader() over the history one chunk at a time (row-level stage, no
+    cross-chunk state besides the score cache). Returns the number of rows written.
+    """
+    cache = ScoreCache(cache_file)
+    try:
+        chunks = read_trend_chunks(csv_input, store_dir, chunk_size)
+        return write_chunks((add_vader(widen(chunk), cache=cache) for chunk in chunks), csv_output)
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse VADER sentiment")
+    parser.add_argument("--chunk-size", type=int, help="process the history in chunks of this many rows")
+    args = parser.parse_args()
+
+    with stage("vader") as m:
+        m.read(trends_source(CSV_INPUT, STORE_DIR))
+        if args.chunk_size:
+            rows = add_vader_chunked(chunk_size=args.chunk_size)
+            m.rows(rows_in=rows, rows_out=rows)
+            print(f"✅ VADER-enhanced CSV saved → {CSV_OUTPUT} ({rows} rows, chunks of {args.chunk_size})")
+        else:
+            # Load tweets (segment store or CSV)
+            df = add_vader(read_trends(CSV_INPUT, STORE_DIR))
+
+            # Save final CSV
+            df.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+            m.rows(rows_in=len(df), rows_out=len(df))
+            print(f"✅ VADER-enhanced CSV saved → {CSV_OUTPUT} ({len(df)} rows)")
+        m.wrote(CSV_OUTPUT)
@@ -0,0 +1,318 @@
+"""
+TrendPredict – Single-Process Pipeline Runner
+Author: Chaimaa Nairi
+Description:
+Runs the batch pipeline (ingest → features / VADER / topics → AI recommendations,
+rising terms)
+in one process. DataFrames are passed between stages in memory instead of
+each script re-reading the previous script's CSV.
+
+- Stages form a small DAG; every stage whose inputs are ready is started, so
+  independent stages (features, VADER, topics) run in parallel.
+- Outputs that Tableau reads are still written, but on separate writer threads
+  (atomic replace). No stage reads them back, and downstream stages don't wait on them.
+- Stages whose inputs, code and library versions are unchanged since their last
+  run are skipped (see stage_cache.py); a cached output is only read back when
+  a stage downstream of it has to run. Stage modules are imported lazily, so a
+  no-op run doesn't pay for pandas / scikit-learn / NLTK imports.
+- Each stage's status (ran / cached / loaded), compute and write times are reported at the end;
+  every compute, load and write is also logged as a stage record (see instrumentation.py).
+
+The individual scripts still run standalone (each keeps its own __main__).
+"""
+
+import argparse
+import importlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from jsonl_store import JSONL_DIR, list_segments
+from stage_cache import StageCache, code_fingerprint, data_fingerprint, file_digest, stage_key
+from instrumentation import path_size, stage as measure
+
+# -------------------------
+# Configuration
+# -------------------------
+JSON_FILE = "../data/twitter_trends.json"   # legacy raw history (see json_to_csv.py)
+OFFSET_FILE = "../data/json_to_csv_offset.json"
+RAW_CSV = "../data/twitter_trends.csv"
+STORE_DIR = "../data/twitter_trends_store"  # segment store (see segment_store.py)
+FE_OUTPUT = "../data/twitter_trends_fe.csv"
+VADER_OUTPUT = "../data/twitter_trends_vader.csv"
+TOPICS_OUTPUT = "../data/twitter_trends_topics.csv"
+RISING_OUTPUT = "../data/twitter_trends_rising_terms.csv"
+AI_OUTPUT = "../data/twitter_trends_ai.csv"
+# --normalized: fact / dimension tables instead of the per-tweet feature and topic CSVs
+FACT_OUTPUT = "../data/twitter_trends_fe_tweets.csv"
+HOURLY_OUTPUT = "../data/twitter_trends_fe_hourly.csv"
+TOPICS_DIMENSION_OUTPUT = "../data/twitter_trends_topics_hashtags.csv"
+
+MAX_WORKERS = 3  # features, VADER and topics can all run at once
+WRITE_WORKERS = 2
+
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), output=None, code=(), packages=("pandas",), data=None, after=()):
+        self.name = name
+        self.fn = fn              # "module:function" (imported when the stage runs) or a callable
+        self.inputs = list(inputs)
+        self.after = list(after)  # stages that must finish first without being inputs (shared state)
+        self.output = output      # CSV path to persist, or None for in-memory only
+        self.code = list(code)    # modules whose source is part of the stage key
+        self.packages = list(packages)
+        self.data = data          # callable fingerprinting root data read by the stage
+
+    def resolve(self):
+        if callable(self.fn):
+            return self.fn
+        module, function = self.fn.split(":")
+        return getattr(importlib.import_module(module), function)
+
+
+# -------------------------
+# Stage functions
+# -------------------------
+def raw_fingerprint():
+    """
+    State of the raw record store, the conversion checkpoint and the segment
+    store manifest (ingest also appends new records to the store).
+    JSONL segments are append-only, so name, size and mtime identify their content.
+    """
+    manifest = os.path.join(STORE_DIR, "manifest.json")
+    segments = []
+    for _, path in list_segments(JSONL_DIR):
+        stat = os.stat(path)
+        segments.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return {
+        "segments": segments,
+        "legacy_json": os.path.exists(JSON_FILE),
+        "offset": file_digest(OFFSET_FILE) if os.path.exists(OFFSET_FILE) else None,
+        "csv": os.path.getsize(RAW_CSV) if os.path.exists(RAW_CSV) else None,
+        "store": file_digest(manifest) if os.path.exists(manifest) else None,
+        "code": code_fingerprint(["json_to_csv", "jsonl_store", "segment_store"])
+    }
+
+
+def ingest(cache, force=False):
+    """
+    Converts new raw records (checkpointed, incremental) unless nothing changed
+    since the last conversion. Returns (status, seconds).
+    """
+    if not (os.path.exists(JSON_FILE) or list_segments(JSONL_DIR)):
+        return "skipped", 0.0
+    if not force and cache.fresh("ingest", json.dumps(raw_fingerprint(), sort_keys=True)):
+        return "cached", 0.0
+
+    with measure("ingest") as m:
+        import json_to_csv
+        csv_size = path_size(RAW_CSV) if json_to_csv.resume_position() is not None else 0
+        new_rows = json_to_csv.convert_new_records()
+        json_to_csv.sync_segment_store()
+        m.rows(rows_in=new_rows, rows_out=new_rows)
+        m.bytes_written = path_size(RAW_CSV) - csv_size
+    cache.record("ingest", json.dumps(raw_fingerprint(), sort_keys=True))
+    return "ran", m.wall_seconds
+
+
+def load_tweets():
+    from segment_store import read_trends
+    return read_trends(RAW_CSV, STORE_DIR)
+
+
+def read_output(path):
+    import pandas as pd
+    return pd.read_csv(path)
+
+
+def default_stages(normalized=False):
+    topic_packages = ["pandas", "scikit-learn", "scipy"]
+    if normalized:
+        features = [
+            Stage("fe_tweets", "feature_engineering:feature_facts", ["tweets"], FACT_OUTPUT,
+                  code=["feature_engineering", "rules"]),
+            Stage("fe_hourly", "feature_engineering:hourly_features", ["fe_tweets"], HOURLY_OUTPUT,
+                  code=["feature_engineering"]),
+        ]
+        topics = Stage("topics", "nlp_topics:topic_dimension", ["tweets"], TOPICS_DIMENSION_OUTPUT,
+                       code=["nlp_topics", "topic_engine"], packages=topic_packages)
+    else:
+        features = [
+            Stage("features", "feature_engineering:build_features", ["tweets"], FE_OUTPUT,
+                  code=["feature_engineering", "rules"]),
+        ]
+        topics = Stage("topics", "nlp_topics:add_topics", ["tweets"], TOPICS_OUTPUT,
+                       code=["nlp_topics", "topic_engine"], packages=topic_packages)
+
+    return [
+        Stage("tweets", load_tweets, code=["segment_store"],
+              data=lambda: data_fingerprint(RAW_CSV, STORE_DIR, OFFSET_FILE)),
+        *features,
+        Stage("vader", "nlp_vader:add_vader", ["tweets"], VADER_OUTPUT,
+              code=["nlp_vader", "vader_engine", "rules"], packages=["pandas", "nltk"]),
+        topics,
+        # Runs after topics: both update the saved topic state
+        Stage("rising", "nlp_topics:rising_topics", ["tweets"], RISING_OUTPUT,
+              code=["nlp_topics", "topic_engine"], packages=topic_packages, after=["topics"]),
+        Stage("ai", "ai_recommendations:add_recommendations", ["vader"], AI_OUTPUT,
+              code=["ai_recommendations", "rules"])
+    ]
+
+
+def write_csv(df, path):
+    # Write next to the target and swap, so readers never see a partial CSV
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _compute(name, fn, *inputs):
+    with measure(name) as m:
+        result = fn(*inputs)
+        m.rows(rows_in=sum(len(df) for df in inputs) if inputs else None, rows_out=len(result))
+    return result, m.wall_seconds
+
+
+def _load(name, path):
+    with measure(f"{name}.load") as m:
+        result = read_output(path)
+        m.rows(rows_out=len(result))
+        m.read(path)
+    return result, m.wall_seconds
+
+
+def _write(name, df, path):
+    with measure(f"{name}.write") as m:
+        write_csv(df, path)
+        m.rows(rows_in=len(df), rows_out=len(df))
+        m.wrote(path)
+    return m.wall_seconds
+
+
+# -------------------------
+# Planning
+# -------------------------
+def plan(stages, cache=None, force=False):
+    """
+    Returns ({stage: key}, {stage: "run" | "load" | "cached"}).
+    Stages with a valid cached output are skipped; they are only loaded from
+    their output when a stage that has to run needs them.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = set(stage.inputs + stage.after) - set(by_name)
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {sorted(unknown)}")
+
+    # Keys in dependency order
+    keys = {}
+    pending = list(stages)
+    while pending:
+        ready = [s for s in pending if all(name in keys for name in s.inputs)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {[s.name for s in pending]}")
+        for stage in ready:
+            data = stage.data() if stage.data else None
+            keys[stage.name] = stage_key(stage.name, stage.code, stage.packages,
+                                         [keys[name] for name in stage.inputs], data)
+            pending.remove(stage)
+
+    actions = {}
+    for stage in stages:
+        cached = cache is not None and not force and stage.output is not None \
+            and cache.fresh(stage.name, keys[stage.name], stage.output)
+        actions[stage.name] = "cached" if cached else ("run" if stage.output else None)
+
+    # Walk back from the stages that run: inputs without a valid output run too,
+    # cached inputs are read back from their output
+    order = list(keys)
+    for name in reversed(order):
+        if actions[name] != "run":
+            continue
+        for input_name in by_name[name].inputs:
+            if actions[input_name] == "cached":
+                actions[input_name] = "load"
+            elif actions[input_name] is None:
+                actions[input_name] = "run"
+    for name in order:
+        actions[name] = actions[name] or "cached"  # in-memory stage nobody needs
+    return keys, actions
+
+
+# -------------------------
+# Runner
+# -------------------------
+def run_pipeline(stages, max_workers=MAX_WORKERS, persist=True, cache=None, force=False):
+    """
+    Executes the stage DAG. Returns ({stage: DataFrame}, {stage: seconds},
+    {stage: write seconds}, {stage: action}). Skipped stages have no result.
+    """
+    keys, actions = plan(stages, cache, force)
+    active = [stage for stage in stages if actions[stage.name] != "cached"]
+
+    results, timings, write_timings = {}, {}, {}
+    pending = list(active)
+    running = {}
+    writes = {}
+
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="stage") as pool, \
+            ThreadPoolExecutor(WRITE_WORKERS, thread_name_prefix="writer") as writer:
+        while pending or running:
+            waiting = {s.name for s in pending} | {s.name for s in running.values()}
+            for stage in [s for s in pending if actions[s.name] == "load"
+                          or (all(name in results for name in s.inputs) and not waiting & set(s.after))]:
+                pending.remove(stage)
+                if actions[stage.name] == "load":
+                    running[pool.submit(_load, stage.name, stage.output)] = stage
+                else:
+                    args = [results[name] for name in stage.inputs]
+                    running[pool.submit(_compute, stage.name, stage.resolve(), *args)] = stage
+            if not running:
+                raise ValueError(f"Stages waiting on each other: {[s.name for s in pending]}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                results[stage.name], timings[stage.name] = future.result()
+                if persist and stage.output and actions[stage.name] == "run":
+                    writes[writer.submit(_write, stage.name, results[stage.name], stage.output)] = stage
+
+        for future, stage in writes.items():
+            write_timings[stage.name] = future.result()
+            if cache is not None:
+                cache.record(stage.name, keys[stage.name], stage.output)
+
+    return results, timings, write_timings, actions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TrendPulse pipeline runner")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="stages run in parallel")
+    parser.add_argument("--skip-ingest", action="store_true", help="don't convert new JSONL records first")
+    parser.add_argument("--no-persist", action="store_true", help="compute only, write no CSVs")
+    parser.add_argument("--force", action="store_true", help="ignore the stage cache and rerun everything")
+    parser.add_argument("--normalized", action="store_true",
+                        help="write fact / dimension tables instead of per-tweet feature and topic CSVs")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache = StageCache()
+    try:
+        ingest_status, ingest_time = ingest(cache, args.force) if not args.skip_ingest else ("skipped", 0.0)
+        stages = default_stages(normalized=args.normalized)
+        results, timings, write_timings, actions = run_pipeline(
+            stages, args.workers, persist=not args.no_persist, cache=cache, force=args.force
+        )
+    finally:
+        cache.save()
+    elapsed = time.perf_counter() - start
+
+    print(f"  {'ingest':<10}{ingest_status:<8}{ingest_time:>8.2f}s")
+    for stage in stages:
+        if stage.name not in timings:
+            print(f"  {stage.name:<10}{'cached':<8}")
+            continue
+        written = f"  write {write_timings[stage.name]:.2f}s → {stage.output}" if stage.name in write_timings else ""
+        print(f"  {stage.name:<10}{actions[stage.name]:<8}{timings[stage.name]:>8.2f}s"
+              f"  {len(results[stage.name]):>9} rows{written}")
+    print(f"✅ Pipeline finished in {elapsed:.2f}s")
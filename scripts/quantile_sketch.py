@@ -0,0 +1,228 @@
+"""
+TrendPredict – Streaming Momentum Percentiles (KLL Sketch)
+Author: Chaimaa Nairi
+Description:
+Approximate momentum percentiles that are updated with new tweets instead of
+re-ranking the full history (ai_recommendations.py --incremental).
+
+- KLLSketch is a KLL quantile sketch: a stack of compactors where level h holds
+  items of weight 2^h; a full level is sorted and every other item is promoted.
+  Memory is O(k) per sketch regardless of history size. While everything still
+  fits in level 0, answers are exact.
+- percentile() matches pandas rank(pct=True) semantics (ties get their average
+  rank). It is a binary search over a cached sorted view, so it costs O(log k) per value.
+- MomentumPercentiles keeps one sketch over all tweets and one per hashtag.
+  They are persisted between runs in one .npz file, together with how many
+  input rows were already scored.
+- SavedPercentiles is the read-only view the Hyper API scores against.
+"""
+
+import math
+import os
+import numpy as np
+
+# -------------------------
+# Configuration
+# -------------------------
+SKETCH_FILE = "../data/momentum_sketch.npz"
+K = 400         # accuracy parameter: rank error stays around 2 / K
+SHRINK = 2 / 3  # capacity ratio between a level and the one above it
+
+
+class KLLSketch:
+    def __init__(self, k=K, seed=0):
+        self.k = k
+        self.levels = [np.zeros(0)]
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+        self._view = None
+
+    def capacity(self, h):
+        # Top level holds k items; lower levels shrink geometrically
+        return max(2, int(math.ceil(self.k * SHRINK ** (len(self.levels) - 1 - h))))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._view = None
+        self._compress()
+
+    def _compress(self):
+        # Compact the lowest over-full level until every level fits; adding a
+        # level shifts all capacities, so rescan from the bottom each time
+        while True:
+            full = [h for h, level in enumerate(self.levels) if len(level) > self.capacity(h)]
+            if not full:
+                return
+            h = full[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.zeros(0))
+            level = np.sort(self.levels[h])
+            # An even number of items is compacted, so total weight stays exactly n
+            keep = level[-1:] if len(level) % 2 else level[:0]
+            paired = level[:len(level) - len(keep)]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], paired[self.rng.integers(2)::2]])
+
+    def _sorted_view(self):
+        if self._view is None:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+            order = np.argsort(items, kind="stable")
+            self._view = (items[order], np.concatenate([[0.0], np.cumsum(weights[order])]))
+        return self._view
+
+    def percentile(self, values):
+        """
+        Estimated rank(pct=True) of each value within everything added so far
+        (NaN for NaN values).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.n == 0:
+            return np.full(len(values), np.nan)
+        items, cumulative = self._sorted_view()
+        below = cumulative[np.searchsorted(items, values, side="left")]
+        at_or_below = cumulative[np.searchsorted(items, values, side="right")]
+        # Average rank of ties: (#below + (#equal + 1) / 2) / n
+        pct = (below + (at_or_below - below + 1) / 2) / self.n
+        return np.where(np.isnan(values), np.nan, np.clip(pct, 1 / self.n, 1.0))
+
+    def quantile(self, q):
+        """
+        Estimated value at quantile q (scalar or array in [0, 1]).
+        """
+        items, cumulative = self._sorted_view()
+        positions = np.searchsorted(cumulative[1:], np.asarray(q) * self.n, side="left")
+        return items[np.minimum(positions, len(items) - 1)]
+
+    def size(self):
+        return sum(len(level) for level in self.levels)
+
+
+class MomentumPercentiles:
+    def __init__(self, path=SKETCH_FILE, k=K):
+        self.path = path
+        self.k = k
+        self.reset()
+        if path and os.path.exists(path):
+            self._load()
+
+    def reset(self):
+        self.overall = KLLSketch(self.k)
+        self.hashtags = {}
+        self.rows = 0            # input rows already folded in
+        self.last_tweet_id = None
+        self.output_size = None  # size of the output file after the last append
+        self.input_offset = None  # input bytes already folded in (at a line end)
+        self.input_tail = b""     # the input line ending at input_offset
+
+    def update(self, df):
+        """
+        Adds a batch of tweets to the overall and per-hashtag sketches.
+        """
+        momentum = df["momentum"].to_numpy()
+        self.overall.update(momentum)
+        for hashtag, positions in df.groupby("hashtag").indices.items():
+            if hashtag not in self.hashtags:
+                self.hashtags[hashtag] = KLLSketch(self.k)
+            self.hashtags[hashtag].update(momentum[positions])
+        self.rows += len(df)
+        if len(df):
+            self.last_tweet_id = int(df["tweet_id"].iloc[-1])
+
+    def percentile(self, momentum, hashtag=None):
+        """
+        momentum_pct of the given values, overall or within one hashtag.
+        """
+        sketch = self.overall if hashtag is None else self.hashtags.get(hashtag)
+        if sketch is None:
+            return np.full(len(momentum), np.nan)
+        return sketch.percentile(momentum)
+
+    def hashtag_percentile(self, df):
+        """
+        Per-hashtag momentum percentile for each row of df.
+        """
+        momentum = df["momentum"].to_numpy()
+        pct = np.full(len(df), np.nan)
+        for hashtag, positions in df.groupby("hashtag").indices.items():
+            pct[positions] = self.percentile(momentum[positions], hashtag)
+        return pct
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self):
+        names = [None] + sorted(self.hashtags)
+        sketches = [self.overall] + [self.hashtags[h] for h in names[1:]]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                k=self.k,
+                rows=self.rows,
+                last_tweet_id=-1 if self.last_tweet_id is None else self.last_tweet_id,
+                output_size=-1 if self.output_size is None else self.output_size,
+                input_offset=-1 if self.input_offset is None else self.input_offset,
+                input_tail=np.frombuffer(self.input_tail, dtype=np.uint8),
+                hashtags=np.array(names[1:], dtype=str),
+                n=np.array([s.n for s in sketches], dtype=np.int64),
+                n_levels=np.array([len(s.levels) for s in sketches], dtype=np.int64),
+                level_sizes=np.array([len(level) for s in sketches for level in s.levels], dtype=np.int64),
+                items=np.concatenate([level for s in sketches for level in s.levels])
+            )
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        with np.load(self.path) as state:
+            self.k = int(state["k"])
+            self.rows = int(state["rows"])
+            self.last_tweet_id = None if int(state["last_tweet_id"]) < 0 else int(state["last_tweet_id"])
+            self.output_size = None if int(state["output_size"]) < 0 else int(state["output_size"])
+            if "input_offset" in state.files and int(state["input_offset"]) >= 0:
+                self.input_offset = int(state["input_offset"])
+                self.input_tail = state["input_tail"].tobytes()
+            level_ends = np.cumsum(state["level_sizes"])
+            items = state["items"]
+            sketches, level, start = [], 0, 0
+            for n, n_levels in zip(state["n"], state["n_levels"]):
+                sketch = KLLSketch(self.k)
+                sketch.n = int(n)
+                sketch.levels = []
+                for end in level_ends[level:level + n_levels]:
+                    sketch.levels.append(items[start:end])
+                    start = end
+                level += n_levels
+                sketches.append(sketch)
+            names = state["hashtags"].tolist()
+        self.overall = sketches[0]
+        self.hashtags = dict(zip(names, sketches[1:]))
+
+
+class SavedPercentiles:
+    """
+    Read-only view of the saved sketch (used by the Hyper API).
+    The sketch is reloaded when its file changes.
+    """
+
+    def __init__(self, path=SKETCH_FILE):
+        self.path = path
+        self.mtime = None
+        self.sketch = None
+
+    def current(self):
+        """
+        Returns the latest saved MomentumPercentiles, or None if there is none.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self.mtime:
+            self.sketch = MomentumPercentiles(self.path)
+            self.mtime = mtime
+        return self.sketch
@@ -0,0 +1,118 @@
+"""
+TrendPredict – Shared Rate-Limit Scheduler
+Author: Chaimaa Nairi
+Description:
+Token-bucket scheduler shared by all concurrent hashtag fetchers.
+Every API page request takes one token; the bucket is re-synced from the
+x-rate-limit-* response headers, so we only wait when the quota is actually
+spent instead of sleeping a fixed cooldown between hashtags.
+"""
+
+import functools
+import threading
+import time
+import tweepy
+
+# -------------------------
+# Configuration
+# -------------------------
+DEFAULT_LIMIT = 450        # requests per window before the first headers arrive
+DEFAULT_WINDOW = 15 * 60   # seconds (Twitter/X rate-limit window)
+
+
+class TokenBucket:
+    def __init__(self, capacity=DEFAULT_LIMIT, window=DEFAULT_WINDOW, clock=time.time, sleep=time.sleep):
+        self.capacity = capacity
+        self.window = window
+        self.tokens = float(capacity)
+        self.reset_at = None  # epoch seconds from x-rate-limit-reset, when known
+        self.clock = clock
+        self.sleep = sleep
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.reset_at is not None:
+            # Server-driven: the quota comes back in full at the reset time
+            if now >= self.reset_at:
+                self.tokens = float(self.capacity)
+                self.reset_at = None
+        else:
+            # No headers yet: refill smoothly over the window
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.capacity / self.window)
+        self.last = now
+
+    def _wait_time(self, now):
+        if self.reset_at is not None:
+            return max(self.reset_at - now, 0.01)
+        return (1 - self.tokens) * self.window / self.capacity
+
+    def acquire(self):
+        """
+        Blocks until a request token is available, then takes it.
+        """
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = self._wait_time(now)
+            self.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """
+        Re-syncs the bucket with the API's x-rate-limit-limit/-remaining/-reset headers.
+        """
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = int(headers["x-rate-limit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self.lock:
+            self.capacity = limit
+            # Requests still in flight already took tokens locally; never add them back
+            self.tokens = min(self.tokens, float(remaining))
+            self.reset_at = reset
+            self.last = self.clock()
+
+
+class RateLimitedClient(tweepy.Client):
+    """
+    tweepy.Client that reports every response's rate-limit headers to a TokenBucket.
+    """
+
+    def __init__(self, *args, scheduler=None, **kwargs):
+        kwargs.setdefault("wait_on_rate_limit", False)
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or TokenBucket()
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        try:
+            response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+        except tweepy.TooManyRequests as e:
+            self.scheduler.update_from_headers(e.response.headers)
+            raise
+        self.scheduler.update_from_headers(response.headers)
+        return response
+
+
+def rate_limited(method, scheduler, max_retries=3):
+    """
+    Wraps a client method (e.g. search_recent_tweets) so each call takes a token.
+    A 429 drains the bucket via the headers and the call is retried after the reset.
+    functools.wraps keeps __name__, which tweepy.Paginator uses to pick its cursor field.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        for attempt in range(max_retries + 1):
+            scheduler.acquire()
+            try:
+                return method(*args, **kwargs)
+            except tweepy.TooManyRequests:
+                if attempt == max_retries:
+                    raise
+    return wrapper
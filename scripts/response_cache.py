@@ -0,0 +1,114 @@
+"""
+TrendPredict – Hyper API Response Cache
+Author: Chaimaa Nairi
+Description:
+Caches encoded JSON responses per snapshot so polling clients
+(Tableau web data connectors, dashboards) cost almost nothing between pipeline refreshes.
+
+- Entries are keyed by snapshot generation, endpoint path and normalized query
+  parameters; a new snapshot generation drops every older entry.
+- Bodies are stored pre-encoded (orjson when installed, json otherwise)
+  together with a content ETag.
+- Requests whose If-None-Match matches the ETag get an empty 304.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# -------------------------
+# Configuration
+# -------------------------
+MAX_ENTRIES = 1024  # per snapshot generation, least recently used evicted
+
+
+def dumps(obj):
+    """
+    Encodes obj to JSON bytes (missing values must already be None).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def etag_matches(etag, if_none_match):
+    """
+    If-None-Match check (weak comparison): "*" or any listed tag equal to etag.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.generation = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, generation, key):
+        with self._lock:
+            if generation != self.generation:
+                # New snapshot: everything cached so far is stale
+                self.generation = generation
+                self.entries.clear()
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def _store(self, generation, key, entry):
+        with self._lock:
+            if generation != self.generation:
+                return  # snapshot swapped while building; don't cache a stale body
+            self.entries[key] = entry
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def respond(self, request, generation, build):
+        """
+        Returns the cached response for this request and snapshot generation,
+        calling build() -> JSON-serializable object on a miss.
+        """
+        # scope path, not request.url: a decoded "#" in a hashtag would read as a fragment
+        key = (request.scope["path"], tuple(sorted(request.query_params.multi_items())))
+        entry = self._lookup(generation, key)
+        if entry is None:
+            self.misses += 1
+            body = dumps(build())
+            entry = (_etag(body), body)
+            self._store(generation, key, entry)
+        else:
+            self.hits += 1
+
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(etag, request.headers.get("if-none-match", "")):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def metrics(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
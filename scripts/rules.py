@@ -0,0 +1,102 @@
+"""
+TrendPredict – Vectorized Trend Rules
+Author: Chaimaa Nairi
+Description:
+Shared rule definitions for sentiment categories, momentum and AI recommendations.
+Every rule works on whole columns (NumPy select) and returns categorical dtypes,
+replacing the per-row Python .apply calls in the pipeline scripts.
+The *_codes variants return the label positions only, for small batches
+(online scoring) where building a Categorical costs more than the rule itself.
+Boundaries match the original row-wise functions exactly (including NaN handling).
+"""
+
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# Labels
+# -------------------------
+SENTIMENT_LABELS = ["Negative", "Neutral", "Positive"]
+MOMENTUM_LABELS = ["⏳ Stable", "🚀 Emerging", "🔥 Exploding"]
+RECOMMENDATION_LABELS = [
+    "Launch marketing campaign now",
+    "Monitor closely – trend emerging",
+    "Reputation risk – investigate",
+    "No action needed"
+]
+
+
+def _categorical(codes, labels, index=None):
+    # Build from integer codes: avoids factorizing millions of strings
+    result = pd.Categorical.from_codes(codes.astype(np.int8), categories=labels)
+    return pd.Series(result, index=index) if index is not None else result
+
+
+def _index(values):
+    return values.index if isinstance(values, pd.Series) else None
+
+
+def _array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+# -------------------------
+# Sentiment
+# -------------------------
+def sentiment_codes(scores):
+    """
+    TextBlob polarity: < -0.1 Negative, <= 0.1 Neutral, otherwise Positive.
+    """
+    s = _array(scores)
+    return np.select([s < -0.1, s <= 0.1], [0, 1], 2)
+
+
+def sentiment_category(scores):
+    return _categorical(sentiment_codes(scores), SENTIMENT_LABELS, _index(scores))
+
+
+def vader_codes(scores):
+    """
+    VADER compound: >= 0.05 Positive, <= -0.05 Negative, otherwise Neutral.
+    """
+    s = _array(scores)
+    return np.select([s >= 0.05, s <= -0.05], [2, 0], 1)
+
+
+def vader_category(scores):
+    return _categorical(vader_codes(scores), SENTIMENT_LABELS, _index(scores))
+
+
+# -------------------------
+# Momentum
+# -------------------------
+def momentum_score(likes, retweets, sentiment):
+    return np.round((_array(likes) + _array(retweets)) * 0.7 + _array(sentiment) * 0.3 * 100, 2)
+
+
+def momentum_codes(scores):
+    """
+    >= 400 Exploding, >= 200 Emerging, otherwise Stable.
+    """
+    s = _array(scores)
+    return np.select([s >= 400, s >= 200], [2, 1], 0)
+
+
+def momentum_status(scores):
+    return _categorical(momentum_codes(scores), MOMENTUM_LABELS, _index(scores))
+
+
+# -------------------------
+# AI recommendation
+# -------------------------
+def recommendation_codes(momentum_pct, sentiment):
+    """
+    Rules are evaluated in order; the first match wins.
+    """
+    pct = _array(momentum_pct)
+    s = _array(sentiment)
+    return np.select([(pct > 0.75) & (s > 0.3), pct > 0.5, s < -0.1], [0, 1, 2], 3)
+
+
+def recommendation(momentum_pct, sentiment):
+    return _categorical(recommendation_codes(momentum_pct, sentiment), RECOMMENDATION_LABELS, _index(momentum_pct))
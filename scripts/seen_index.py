@@ -0,0 +1,163 @@
+"""
+TrendPredict – Persistent Seen Tweet-ID Index
+Author: Chaimaa Nairi
+Description:
+Memory-compact index of every tweet_id already ingested, shared by
+fetch_twitter_data.py and micro_batch_streaming.py for deduplication.
+
+- Committed IDs live in a sorted int64 .npy file that is memory-mapped on load,
+  so opening the index is O(1) regardless of history size.
+- Recently added IDs are kept in an exact in-memory set and appended to a small
+  log file, so they survive a crash; the log is merged into the sorted array
+  once it grows past MERGE_THRESHOLD.
+- Lookups use binary search, so dedup cost scales with batch size, not history.
+- Both entry points run as separate processes, so loading, appending and
+  flushing hold an inter-process lock, and a flush merges the array and log
+  as they are on disk (not just this process's view) before replacing them.
+- Lookups first read the log tail other processes appended since the last
+  lookup (and reload the array if one of them flushed), so a long-lived
+  instance never re-admits IDs they have already stored.
+"""
+
+import os
+import numpy as np
+from file_lock import file_lock
+
+# -------------------------
+# Configuration
+# -------------------------
+INDEX_FILE = "../data/seen_tweet_ids.npy"
+MERGE_THRESHOLD = 100_000  # pending IDs before the log is merged into the sorted array
+
+
+class SeenIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.log_path = path + ".log"
+        self.lock_path = path + ".lock"
+        self.ids = np.empty(0, dtype=np.int64)
+        self.ids_stat = None  # (inode, mtime) of the array file self.ids was loaded from
+        self.pending = set()
+        self.log_offset = 0   # bytes of the log already in self.pending
+        with file_lock(self.lock_path, shared=True):
+            self._refresh()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _refresh(self):
+        # Caller holds the lock. Picks up what other processes committed since
+        # the last call: a flushed array (which also started a new log) or the
+        # IDs appended to the log since self.log_offset.
+        stat = self._stat()
+        if stat != self.ids_stat:
+            self.ids = np.load(self.path, mmap_mode="r") if stat else np.empty(0, dtype=np.int64)
+            self.ids_stat = stat
+            self.pending = set()
+            self.log_offset = 0
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < self.log_offset:
+                # Shorter than what was read: the log was restarted after a flush
+                self.pending, self.log_offset = set(), 0
+            f.seek(self.log_offset)
+            tail = np.frombuffer(f.read(), dtype=np.int64)
+            self.log_offset += tail.nbytes
+        self.pending.update(tail.tolist())
+
+    def __len__(self):
+        return len(self.ids) + len(self.pending)
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.log_path)
+
+    def contains(self, tweet_ids):
+        """
+        Returns a boolean array: True where the tweet_id was already seen,
+        including IDs other processes logged since this index was loaded.
+        """
+        tweet_ids = np.asarray(tweet_ids, dtype=np.int64)
+        with file_lock(self.lock_path, shared=True):
+            self._refresh()
+        found = np.zeros(len(tweet_ids), dtype=bool)
+
+        if len(self.ids):
+            pos = np.searchsorted(self.ids, tweet_ids)
+            in_range = pos < len(self.ids)
+            found[in_range] = self.ids[pos[in_range]] == tweet_ids[in_range]
+
+        if self.pending:
+            found |= np.fromiter((i in self.pending for i in tweet_ids.tolist()), dtype=bool, count=len(tweet_ids))
+
+        return found
+
+    def filter_new(self, tweet_ids):
+        """
+        Returns a boolean mask of IDs not seen before (also unique within the batch).
+        """
+        tweet_ids = np.asarray(tweet_ids, dtype=np.int64)
+        mask = ~self.contains(tweet_ids)
+        _, first = np.unique(tweet_ids, return_index=True)
+        unique_mask = np.zeros(len(tweet_ids), dtype=bool)
+        unique_mask[first] = True
+        return mask & unique_mask
+
+    def add(self, tweet_ids):
+        """
+        Records IDs as seen. They are appended to the log immediately (O(batch)).
+        """
+        tweet_ids = np.asarray(tweet_ids, dtype=np.int64)
+        if len(tweet_ids) == 0:
+            return
+        with file_lock(self.lock_path):
+            self._refresh()
+            with open(self.log_path, "ab") as f:
+                tweet_ids.tofile(f)
+                self.log_offset = f.tell()
+        self.pending.update(tweet_ids.tolist())
+
+        if len(self.pending) >= MERGE_THRESHOLD:
+            self.flush()
+
+    def flush(self):
+        """
+        Merges pending IDs into the sorted on-disk array, swaps the file atomically
+        and truncates the log. IDs other processes committed or logged since this
+        index was loaded are merged in too, so none are lost.
+        """
+        if not self.pending:
+            return
+
+        pending = np.fromiter(self.pending, dtype=np.int64, count=len(self.pending))
+        with file_lock(self.lock_path):
+            # Materialize before replacing the file so the memory map is released
+            on_disk = np.load(self.path) if os.path.exists(self.path) else np.empty(0, dtype=np.int64)
+            if os.path.exists(self.log_path):
+                pending = np.union1d(pending, np.fromfile(self.log_path, dtype=np.int64))
+            self.ids = np.union1d(on_disk, pending)
+
+            tmp_path = self.path + ".tmp.npy"
+            np.save(tmp_path, self.ids)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+            self.ids = np.load(self.path, mmap_mode="r")
+            self.ids_stat = self._stat()
+            self.log_offset = 0
+        self.pending.clear()
+
+
+def bootstrap_index(tweet_ids, path=INDEX_FILE):
+    """
+    Builds the index once from existing history (used when no index file exists yet).
+    """
+    index = SeenIndex(path)
+    index.pending.update(np.asarray(tweet_ids, dtype=np.int64).tolist())
+    index.flush()
+    return index
@@ -0,0 +1,238 @@
+"""
+TrendPredict – Append-Only Segment Store
+Author: Chaimaa Nairi
+Description:
+Columnar, append-only storage for Twitter/X tweets.
+Each micro-batch is written as small Parquet segments partitioned by
+hour and hashtag, and a JSON manifest lists the committed segments.
+
+- Writers only ever add new segment files, then atomically swap the manifest.
+- Readers load the manifest once and read exactly the segments it lists,
+  so they always see a consistent snapshot even while a batch is being written.
+- Once the store exists it is the single sink for new tweets: the micro-batch
+  loop appends its batches, and json_to_csv.py appends the records it converts
+  from the JSONL raw store (tracking its own JSONL position in the manifest).
+  Writers take an inter-process lock around the manifest read-modify-write.
+"""
+
+import io
+import json
+import os
+import re
+import time
+import pandas as pd
+from file_lock import file_lock
+
+# -------------------------
+# Configuration
+# -------------------------
+STORE_DIR = "../data/twitter_trends_store"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+SETTLE_SECONDS = 2  # CSV idle time after which an unterminated last line counts as complete
+
+
+# -------------------------
+# Manifest helpers
+# -------------------------
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, MANIFEST_FILE)
+
+
+def load_manifest(store_dir=STORE_DIR):
+    """
+    Returns the committed manifest, or an empty one if the store does not exist yet.
+    """
+    path = _manifest_path(store_dir)
+    if not os.path.exists(path):
+        return {"version": 0, "segments": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(store_dir, manifest):
+    # Write to a temp file and swap it in, so readers never see a partial manifest
+    path = _manifest_path(store_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.exists(_manifest_path(store_dir))
+
+
+# -------------------------
+# Partitioning
+# -------------------------
+def _hashtag_key(hashtag):
+    # "#DataScience" -> "DataScience"; keep partition names filesystem-safe
+    return re.sub(r"[^0-9A-Za-z_-]", "_", str(hashtag).lstrip("#")) or "_"
+
+
+def _partitions(df):
+    hours = pd.to_datetime(df["created_at"]).dt.floor("h")
+    keys = pd.DataFrame({
+        "hour": hours.dt.strftime("%Y%m%d%H"),
+        "hashtag": df["hashtag"].astype(str)
+    }, index=df.index)
+    return keys.groupby(["hour", "hashtag"]).groups
+
+
+# -------------------------
+# Write path
+# -------------------------
+def append_segment(df, store_dir=STORE_DIR, jsonl_position=None, partitioned=True, commit=None):
+    """
+    Appends a batch of tweets as new segments and commits them in one manifest swap.
+    Only the new rows are written; existing segments are never rewritten.
+    jsonl_position, if given, is committed in the same swap as the JSONL raw
+    store position the batch was converted up to (see json_to_csv.py).
+    partitioned=False writes the whole batch as one segment (hour and hashtag
+    None in the manifest) for stores that are only ever read whole.
+    commit, a dict, is merged into the manifest in the same swap as well.
+    Returns the new manifest version.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    with file_lock(os.path.join(store_dir, LOCK_FILE)):
+        return _append_segment(df, store_dir, jsonl_position, partitioned, commit)
+
+
+def _append_segment(df, store_dir, jsonl_position, partitioned, commit):
+    manifest = load_manifest(store_dir)
+    if df.empty and jsonl_position is None and not commit:
+        return manifest["version"]
+
+    version = manifest["version"] + 1
+    new_segments = []
+    if df.empty:
+        partitions = {}
+    elif partitioned:
+        partitions = _partitions(df)
+    else:
+        partitions = {(None, None): df.index}
+
+    for (hour, hashtag), index in partitions.items():
+        part = df.loc[index]
+        rel_dir = os.path.join(f"hour={hour}", f"hashtag={_hashtag_key(hashtag)}") if partitioned else ""
+        if rel_dir:
+            os.makedirs(os.path.join(store_dir, rel_dir), exist_ok=True)
+        rel_path = os.path.join(rel_dir, f"part-{version:08d}.parquet")
+        part.to_parquet(os.path.join(store_dir, rel_path), index=False)
+
+        new_segments.append({
+            "path": rel_path,
+            "hour": hour,
+            "hashtag": hashtag,
+            "rows": int(len(part)),
+            "min_tweet_id": int(part["tweet_id"].min()),
+            "max_tweet_id": int(part["tweet_id"].max())
+        })
+
+    # Segments are on disk; publishing the manifest makes them visible atomically
+    manifest = {**manifest, "version": version, "segments": manifest["segments"] + new_segments}
+    if jsonl_position is not None:
+        manifest["jsonl_position"] = jsonl_position
+    manifest.update(commit or {})
+    _write_manifest(store_dir, manifest)
+    return version
+
+
+# -------------------------
+# Read path
+# -------------------------
+def read_snapshot(store_dir=STORE_DIR, columns=None, hashtags=None, start_hour=None, end_hour=None):
+    """
+    Reads a consistent snapshot of the store as a DataFrame.
+    Optional hashtag and hour filters (hours as "YYYYMMDDHH") prune segments
+    using the manifest, without opening the skipped files. They apply to
+    partitioned stores only (see append_segment()).
+    """
+    manifest = load_manifest(store_dir)
+    segments = manifest["segments"]
+
+    if hashtags is not None:
+        hashtags = set(hashtags)
+        segments = [s for s in segments if s["hashtag"] in hashtags]
+    if start_hour is not None:
+        segments = [s for s in segments if s["hour"] >= start_hour]
+    if end_hour is not None:
+        segments = [s for s in segments if s["hour"] <= end_hour]
+
+    if not segments:
+        return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+
+    frames = [
+        pd.read_parquet(os.path.join(store_dir, s["path"]), columns=columns)
+        for s in segments
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def store_tweet_ids(store_dir=STORE_DIR):
+    return read_snapshot(store_dir, columns=["tweet_id"])["tweet_id"]
+
+
+def read_segments_since(store_dir=STORE_DIR, start=0):
+    """
+    Rows of the segments committed after the first `start` ones (the manifest
+    only grows). Returns (df, number of committed segments).
+    """
+    segments = load_manifest(store_dir)["segments"]
+    frames = [pd.read_parquet(os.path.join(store_dir, s["path"])) for s in segments[start:]]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return df, len(segments)
+
+
+def trends_source(csv_file, store_dir=STORE_DIR):
+    """
+    Path read_trends() reads from: the segment store when it exists, otherwise the CSV.
+    """
+    return store_dir if store_exists(store_dir) else csv_file
+
+
+def read_trends(csv_file, store_dir=STORE_DIR):
+    """
+    Loads tweets from the segment store when it exists, otherwise from the CSV.
+    Lets downstream scripts read the store directly with a CSV fallback; both
+    ingestion paths append to the store, so it holds every tweet in the CSV.
+    """
+    if store_exists(store_dir):
+        return read_snapshot(store_dir)
+    return pd.read_csv(csv_file)
+
+
+def read_trends_since(csv_file, store_dir=STORE_DIR, position=None):
+    """
+    Tweets appended to the read_trends() source since `position` (as returned by
+    the previous call; None reads everything). Returns (df, position).
+
+    - store: segments past the number already read (the manifest only grows)
+    - CSV:   bytes past the last complete line already read; a rebuilt CSV
+             (new inode) or one that shrank is read from the start. A last
+             line without a newline counts once the file is SETTLE_SECONDS old
+    A position from the other source also restarts from the beginning, so
+    callers must skip tweets they have already seen.
+    """
+    if store_exists(store_dir):
+        start = position["segments"] if position and position.get("source") == "store" else 0
+        df, segments = read_segments_since(store_dir, start)
+        return df, {"source": "store", "segments": segments}
+
+    stat = os.stat(csv_file)
+    with open(csv_file, "rb") as f:
+        header = f.readline()
+        offset = f.tell()
+        if position and position.get("source") == "csv" and position["inode"] == stat.st_ino \
+                and offset <= position["offset"] <= stat.st_size:
+            offset = position["offset"]
+        f.seek(offset)
+        data = f.read(stat.st_size - offset)
+    complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+    if complete < len(data) and time.time() - stat.st_mtime >= SETTLE_SECONDS:
+        complete = len(data)  # untouched for a while: a last line without a newline
+    df = pd.read_csv(io.BytesIO(header + data[:complete]))
+    return df, {"source": "csv", "inode": stat.st_ino, "offset": offset + complete}
@@ -0,0 +1,87 @@
+"""
+TrendPredict – Fused Sentiment Stage
+Author: Chaimaa Nairi
+Description:
+Computes TextBlob and VADER sentiment in a single pass over a batch of tweets
+at ingestion time, so VADER no longer needs its own read-score-write pass.
+
+- Scorers are pluggable: each takes a list of texts and returns output columns.
+- The default scorers fill sentiment / sentiment_category (TextBlob) and
+  sentiment_vader / sentiment_vader_category (VADER).
+- SentimentStage runs scoring on its own worker thread, off the network-fetch threads.
+"""
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from textblob.en import sentiment as pattern_sentiment
+from vader_engine import score_texts
+from rules import sentiment_category, vader_category
+
+
+# -------------------------
+# Scorers
+# -------------------------
+def textblob_scorer(texts):
+    # Same analyzer as TextBlob(text).sentiment, without building a blob and a
+    # namedtuple class per text (several times faster on short tweets)
+    scores = np.array([round(pattern_sentiment(text)[0], 3) for text in texts], dtype=np.float64)
+    return {"sentiment": scores, "sentiment_category": sentiment_category(scores)}
+
+
+def vader_scorer(texts):
+    scores = score_texts(texts)
+    return {"sentiment_vader": scores, "sentiment_vader_category": vader_category(scores)}
+
+
+DEFAULT_SCORERS = [textblob_scorer, vader_scorer]
+
+
+# -------------------------
+# Batch scoring
+# -------------------------
+def score_batch(texts, scorers=DEFAULT_SCORERS):
+    """
+    Runs every scorer over the same batch of texts and returns {column: values}.
+    """
+    texts = [str(t) for t in texts]
+    columns = {}
+    for scorer in scorers:
+        columns.update(scorer(texts))
+    return columns
+
+
+def score_rows(rows, scorers=DEFAULT_SCORERS):
+    """
+    Adds the sentiment columns to a list of row dicts in place.
+    """
+    if not rows:
+        return rows
+    columns = score_batch([row["text"] for row in rows], scorers)
+    for name, values in columns.items():
+        for row, value in zip(rows, np.asarray(values).tolist()):
+            row[name] = value
+    return rows
+
+
+class SentimentStage:
+    """
+    Single worker thread that scores batches (and runs their follow-up work)
+    in submission order, so fetcher threads can move on to the next page.
+    """
+
+    def __init__(self, scorers=DEFAULT_SCORERS):
+        self.scorers = scorers
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+    def submit(self, rows, then=None):
+        """
+        Scores rows on the stage thread, then calls then(rows) there.
+        Returns a Future resolving to then's result (or the scored rows).
+        """
+        def run():
+            score_rows(rows, self.scorers)
+            return then(rows) if then else rows
+        return self.executor.submit(run)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,140 @@
+"""
+TrendPredict – Hot-Reloading Data Snapshots
+Author: Chaimaa Nairi
+Description:
+Keeps the Hyper API serving fresh pipeline output without a restart.
+
+- A Snapshot bundles the loaded frame with its TrendIndex and TimeIndex and
+  never changes after it is built.
+- SnapshotWatcher polls a cheap source signature (segment-store manifest version,
+  or CSV mtime/size) on a background thread, builds a new snapshot off the
+  request path and swaps it in with a single reference assignment.
+- Requests grab `watcher.current` once, so in-flight requests keep the old snapshot.
+- Reload duration, failures and snapshot age are tracked for freshness monitoring.
+"""
+
+import os
+import threading
+import time
+import pandas as pd
+from segment_store import load_manifest, store_exists, read_trends, MANIFEST_FILE
+from trend_index import TrendIndex
+from time_index import TimeIndex
+
+# -------------------------
+# Configuration
+# -------------------------
+POLL_INTERVAL = 5  # seconds between source checks (well under the micro-batch cadence)
+
+
+class Snapshot:
+    def __init__(self, df, source=None, source_mtime=None, generation=0):
+        self.df = df
+        self.index = TrendIndex.from_frame(df)
+        self.tweets = TimeIndex(df)
+        self.source = source              # signature of the data it was built from
+        self.source_mtime = source_mtime  # when that data was written
+        self.generation = generation      # increases by one per swap
+        self.loaded_at = time.time()
+
+
+def source_signature(csv_file, store_dir):
+    """
+    Returns (signature, mtime) of the data read_trends would load, or (None, None).
+    """
+    if store_dir and store_exists(store_dir):
+        path = os.path.join(store_dir, MANIFEST_FILE)
+        return f"store:{load_manifest(store_dir)['version']}", os.path.getmtime(path)
+    if os.path.exists(csv_file):
+        stat = os.stat(csv_file)
+        return f"csv:{stat.st_mtime_ns}:{stat.st_size}", stat.st_mtime
+    return None, None
+
+
+class SnapshotWatcher:
+    def __init__(self, csv_file, store_dir=None, interval=POLL_INTERVAL):
+        self.csv_file = csv_file
+        self.store_dir = store_dir
+        self.interval = interval
+        self.current = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload_seconds = None
+        self.last_error = None
+        self._lock = threading.Lock()  # one reload at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------
+    # Reload
+    # -------------------------
+    def reload(self, force=False):
+        """
+        Builds and swaps in a new snapshot if the source changed.
+        Returns True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            source, mtime = source_signature(self.csv_file, self.store_dir)
+            if source is None:
+                return False
+            if not force and self.current is not None and self.current.source == source:
+                return False
+
+            start = time.perf_counter()
+            try:
+                df = read_trends(self.csv_file, self.store_dir) if self.store_dir else pd.read_csv(self.csv_file)
+            except Exception as e:
+                # Typically a CSV caught mid-write; keep serving the old snapshot
+                self.failures += 1
+                self.last_error = str(e)
+                return False
+
+            if source_signature(self.csv_file, self.store_dir)[0] != source:
+                # Source changed while reading: retry on the next poll
+                return False
+
+            generation = self.current.generation + 1 if self.current else 1
+            snapshot = Snapshot(df, source, mtime, generation)
+            self.current = snapshot  # atomic reference swap
+            self.reloads += 1
+            self.last_reload_seconds = time.perf_counter() - start
+            self.last_error = None
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------
+    # Metrics
+    # -------------------------
+    def metrics(self):
+        snapshot = self.current
+        now = time.time()
+        return {
+            "generation": snapshot.generation if snapshot else 0,
+            "source": snapshot.source if snapshot else None,
+            "rows": len(snapshot.df) if snapshot else 0,
+            "snapshot_age_seconds": now - snapshot.source_mtime if snapshot and snapshot.source_mtime else None,
+            "loaded_seconds_ago": now - snapshot.loaded_at if snapshot else None,
+            "reloads": self.reloads,
+            "reload_failures": self.failures,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_error": self.last_error
+        }
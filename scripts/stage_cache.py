@@ -0,0 +1,148 @@
+"""
+TrendPredict – Pipeline Stage Cache
+Author: Chaimaa Nairi
+Description:
+Build-system-style cache for pipeline.py: a stage is skipped when the
+fingerprint of everything it depends on matches its last successful run
+and its output file is still the one that run wrote.
+
+- A stage key hashes the stage name, its code (source of the modules it uses),
+  the installed versions of the libraries it relies on and the keys of its inputs.
+- Root data is fingerprinted by content: the segment store manifest (segments are
+  immutable) or the raw CSV bytes. The CSV digest is kept with the CSV's size,
+  mtime_ns and the json_to_csv offset file, and only recomputed when those change,
+  so a no-op run does not read the whole CSV.
+- Only the standard library is used, so a no-op run never imports pandas or the
+  NLP libraries.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+from importlib import metadata
+
+# -------------------------
+# Configuration
+# -------------------------
+CACHE_FILE = "../data/pipeline_cache.json"
+DIGEST_FILE = "../data/pipeline_csv_digest.json"  # last raw CSV digest and the stat it was taken at
+MANIFEST_FILE = "manifest.json"  # segment store manifest (see segment_store.py)
+READ_BYTES = 1024 * 1024
+
+
+# -------------------------
+# Fingerprints
+# -------------------------
+def _hash(value):
+    return hashlib.blake2b(json.dumps(value, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def csv_digest(csv_file, offset_file=None, digest_file=DIGEST_FILE):
+    """
+    file_digest() of csv_file, reused while its size, mtime_ns and the offset
+    file are unchanged (the CSV is rewritten or appended by json_to_csv.py).
+    """
+    stat = os.stat(csv_file)
+    state = [os.path.abspath(csv_file), stat.st_size, stat.st_mtime_ns,
+             file_digest(offset_file) if offset_file and os.path.exists(offset_file) else None]
+    if os.path.exists(digest_file):
+        with open(digest_file, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["state"] == state:
+            return saved["digest"]
+
+    digest = file_digest(csv_file)
+    tmp_path = digest_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"state": state, "digest": digest}, f)
+    os.replace(tmp_path, digest_file)
+    return digest
+
+
+def data_fingerprint(csv_file, store_dir, offset_file=None, digest_file=DIGEST_FILE):
+    """
+    Content digest of the tweets read_trends() would load (None if there are none).
+    """
+    manifest = os.path.join(store_dir, MANIFEST_FILE)
+    if os.path.exists(manifest):
+        return "store:" + file_digest(manifest)
+    if os.path.exists(csv_file):
+        return "csv:" + csv_digest(csv_file, offset_file, digest_file)
+    return None
+
+
+def code_fingerprint(modules):
+    """
+    Digest of the source of the given modules, found without importing them.
+    """
+    sources = {}
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        sources[name] = file_digest(spec.origin) if spec and spec.origin else None
+    return _hash(sources)
+
+
+def package_versions(packages):
+    versions = {}
+    for name in packages:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def stage_key(name, code, packages=(), inputs=(), data=None):
+    return _hash({
+        "stage": name,
+        "code": code_fingerprint(code),
+        "packages": package_versions(packages),
+        "inputs": list(inputs),
+        "data": data
+    })
+
+
+def _output_stat(path):
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# -------------------------
+# Cache manifest
+# -------------------------
+class StageCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def fresh(self, name, key, output=None):
+        """
+        True if the stage last ran with this key and its output is untouched since.
+        """
+        entry = self.entries.get(name)
+        if entry is None or entry["key"] != key:
+            return False
+        return output is None or entry["output"] == _output_stat(output)
+
+    def record(self, name, key, output=None):
+        self.entries[name] = {"key": key, "output": _output_stat(output)}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
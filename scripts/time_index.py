@@ -0,0 +1,153 @@
+"""
+TrendPredict – Time-Sorted Tweet Index
+Author: Chaimaa Nairi
+Description:
+Row-level index behind the windowed /tweets endpoints of the Hyper API.
+
+- Tweets are ordered by (created_at, tweet_id) once per snapshot; per-hashtag
+  position lists keep the same order, so time ranges and cursors resolve
+  with binary search (np.searchsorted) instead of full scans.
+- Location is filtered on the selected range only (categorical codes).
+- Top-k by momentum uses np.argpartition on the selected range.
+- Rows are rendered to JSON in chunks, so responses can stream as they are built.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# Configuration
+# -------------------------
+CHUNK_ROWS = 500  # rows rendered per streamed chunk
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def parse_time(value):
+    """
+    ISO timestamp -> int64 nanoseconds (None passes through).
+    """
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)  # stored timestamps are naive UTC
+    return ts.value
+
+
+def _json_values(values):
+    # Column values as Python objects, with missing values as None (JSON null)
+    if values.dtype.kind in "iub":
+        return values.tolist()
+    missing = pd.isna(values)
+    if missing.any():
+        values = values.astype(object)
+        values[missing] = None
+    return values.tolist()
+
+
+def encode_cursor(time_ns, tweet_id):
+    return f"{time_ns}_{tweet_id}"
+
+
+def decode_cursor(cursor):
+    time_ns, tweet_id = cursor.split("_")
+    return int(time_ns), int(tweet_id)
+
+
+class TimeIndex:
+    def __init__(self, df):
+        self.columns = list(df.columns)
+        self.arrays = [df[column].to_numpy() for column in self.columns]
+        times = pd.to_datetime(df["created_at"]).to_numpy("datetime64[ns]").view(np.int64)
+        ids = df["tweet_id"].to_numpy(np.int64)
+        self.order = np.lexsort((ids, times))  # row positions in (time, id) order
+        self.times = times[self.order]
+        self.ids = ids[self.order]
+        self.momentum = df["momentum"].to_numpy(np.float64)[self.order]
+
+        locations = pd.Categorical(df["user_location"].to_numpy()[self.order])
+        self.location_codes = locations.codes
+        self.location_lookup = {loc: code for code, loc in enumerate(locations.categories)}
+
+        hashtags = pd.Series(df["hashtag"].to_numpy()[self.order])
+        self.by_hashtag = {
+            tag: positions.astype(np.int64)
+            for tag, positions in hashtags.groupby(hashtags).indices.items()
+        }
+
+    # -------------------------
+    # Selection (positions in sorted order)
+    # -------------------------
+    def _candidates(self, hashtag):
+        if hashtag is None:
+            return None, self.times, self.ids
+        positions = self.by_hashtag.get(hashtag, _EMPTY)
+        return positions, self.times[positions], self.ids[positions]
+
+    def select(self, start=None, end=None, hashtag=None, location=None, after=None):
+        """
+        Positions with start <= created_at < end (nanoseconds), optionally for one
+        hashtag / location, strictly after the (time, id) cursor key.
+        """
+        positions, times, ids = self._candidates(hashtag)
+        lo = np.searchsorted(times, start, "left") if start is not None else 0
+        hi = np.searchsorted(times, end, "left") if end is not None else len(times)
+
+        if after is not None:
+            after_time, after_id = after
+            first = np.searchsorted(times, after_time, "left")
+            last = np.searchsorted(times, after_time, "right")
+            # Same-second tweets are ordered by id, so the cursor id is a binary search too
+            lo = max(lo, first + np.searchsorted(ids[first:last], after_id, "right"))
+
+        if lo >= hi:
+            return _EMPTY
+        selected = positions[lo:hi] if positions is not None else np.arange(lo, hi, dtype=np.int64)
+
+        if location is not None:
+            code = self.location_lookup.get(location)
+            if code is None:
+                return _EMPTY
+            selected = selected[self.location_codes[selected] == code]
+        return selected
+
+    def page(self, limit, **filters):
+        """
+        Returns (positions, next_cursor) for one page of at most `limit` rows.
+        """
+        selected = self.select(**filters)
+        if len(selected) <= limit:
+            return selected, None
+        selected = selected[:limit]
+        last = selected[-1]
+        return selected, encode_cursor(self.times[last], self.ids[last])
+
+    def top_k(self, k, **filters):
+        """
+        Positions of the k highest-momentum tweets in the selection, best first.
+        """
+        selected = self.select(**filters)
+        if len(selected) > k:
+            selected = selected[np.argpartition(-self.momentum[selected], k - 1)[:k]]
+        return selected[np.argsort(-self.momentum[selected], kind="stable")]
+
+    # -------------------------
+    # Rendering
+    # -------------------------
+    def records(self, positions):
+        """
+        Row dicts (JSON-ready Python values) for the given positions.
+        """
+        rows = self.order[positions]
+        columns = [_json_values(values[rows]) for values in self.arrays]
+        return [dict(zip(self.columns, values)) for values in zip(*columns)]
+
+    def iter_json(self, positions, chunk_rows=CHUNK_ROWS):
+        """
+        Yields comma-separated JSON objects for the given positions, one chunk at a time.
+        """
+        for i in range(0, len(positions), chunk_rows):
+            records = self.records(positions[i:i + chunk_rows])
+            yield ("," if i else "") + json.dumps(records, ensure_ascii=False)[1:-1]
@@ -0,0 +1,518 @@
+"""
+TrendPredict – Incremental Topic Engine
+Author: Chaimaa Nairi
+Description:
+Per-hashtag TF-IDF keywords that are updated with new tweets instead of
+refitting a TfidfVectorizer for every hashtag on every run (see nlp_topics.py).
+
+- New tweets are tokenized once, with the same analyzer TfidfVectorizer uses
+  (lowercase, English stop words), and appended to a per-hashtag sparse count
+  matrix. Term totals and document frequencies are running counts.
+- Only hashtags touched by a batch are rescored. idf comes from the running
+  document frequencies, then rows are L2-normalised and averaged per term. This is
+  vectorised over the stored counts; no text is re-tokenized.
+- Rescoring a hashtag is O(its stored rows), not O(new tweets): every new tweet
+  changes n and so every idf, and with it each row's norm, so per-row normalised
+  contributions cannot be kept incrementally and still match a full refit.
+  That exactness is the point of this engine, so the cost is accepted; the
+  alphabetical term order is merged, not re-sorted.
+- Top keywords are picked with argpartition. Ties break alphabetically, as the
+  original sorted() did, so topic_keywords matches a full refit exactly.
+- Term counts are also bucketed by (hour, term) for "rising terms" queries.
+  Buckets older than RETENTION_HOURS are folded into an exponentially decayed
+  total per term, so the structure stays bounded. rising_terms() compares the
+  last N hours with that decayed baseline, without touching old text.
+- State (rows folded in, vocabularies, counts, hourly buckets) is saved in one
+  .npz file, rewritten whole on each save (O(stored counts), like the load).
+  The input must extend the rows the state was built from, checked by the row
+  count and the last tweet_id folded in (as quantile_sketch.py does); otherwise
+  the state is rebuilt from scratch.
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# -------------------------
+# Configuration
+# -------------------------
+TOPIC_STATE_DIR = "../data/topic_state"
+STATE_FILE = "topics.npz"
+POLL_INTERVAL = 5  # seconds between state file checks in SavedTopics
+STATE_VERSION = 3  # saved state of another version is ignored and rebuilt
+TOP_N = 3
+MAX_FEATURES = 1000  # vocabulary cap per hashtag, as in the original TfidfVectorizer
+HALF_LIFE_HOURS = 24  # decay of the baseline term rate
+RETENTION_HOURS = 72  # hourly buckets kept exactly; older ones are folded into the decayed baseline
+MIN_MENTIONS = 2      # a rising term needs at least this many mentions in the window
+
+
+def hour_numbers(created_at):
+    """
+    Hours since the epoch (int64) for a created_at column; -1 where it is missing.
+    """
+    times = pd.to_datetime(created_at, errors="coerce")
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+    hours = times.to_numpy(dtype="datetime64[ns]").astype("datetime64[h]").astype(np.int64)
+    return np.where(times.isna().to_numpy(), -1, hours)
+
+
+def _decay(hours):
+    return np.exp2(-np.asarray(hours, dtype=np.float64) / HALF_LIFE_HOURS)
+
+
+# -------------------------
+# Per-hashtag counts
+# -------------------------
+def _aggregate(hours, columns, counts):
+    # Sum counts per (hour, column), sorted by hour
+    if len(hours) == 0:
+        return hours.astype(np.int64), columns.astype(np.int32), counts.astype(np.float64)
+    keys, inverse = np.unique(np.stack([hours, columns.astype(np.int64)]), axis=1, return_inverse=True)
+    return keys[0], keys[1].astype(np.int32), np.bincount(inverse.ravel(), weights=counts)
+
+
+class HashtagTopics:
+    def __init__(self):
+        self.terms = []        # column -> term, in first-seen order
+        self.vocabulary = {}   # term -> column
+        self.chunks = []       # (indices, counts, row lengths) per batch
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.term_freq = np.zeros(0, dtype=np.float64)
+        self.rows = 0
+        self.order = np.zeros(0, dtype=np.int64)       # columns in alphabetical order of their terms
+        self.sorted_terms = np.empty(0, dtype=object)  # terms in that order
+
+        # Hourly (hour, column, count) entries within the retention window,
+        # and the decayed counts of everything older, as of hour `anchor`
+        self.buckets = []
+        self.decayed = np.zeros(0, dtype=np.float64)
+        self.anchor = None
+
+    def add(self, texts, analyze, hours=None):
+        """
+        Tokenizes new tweets and appends their term counts (O(new tweets)).
+        hours (from hour_numbers) also files the counts into hourly buckets.
+        """
+        indices, counts, lengths = [], [], []
+        for text in texts:
+            counter = {}
+            for term in analyze(text):
+                column = self.vocabulary.get(term)
+                if column is None:
+                    column = self.vocabulary[term] = len(self.terms)
+                    self.terms.append(term)
+                counter[column] = counter.get(column, 0) + 1
+            columns = sorted(counter)
+            indices.extend(columns)
+            counts.extend(counter[c] for c in columns)
+            lengths.append(len(columns))
+        indices = np.array(indices, dtype=np.int32)
+        counts = np.array(counts, dtype=np.float64)
+        lengths = np.array(lengths, dtype=np.int64)
+        self._append(indices, counts, lengths)
+        if hours is not None:
+            self._add_buckets(np.repeat(hours, lengths), indices, counts)
+
+    def _append(self, indices, counts, lengths):
+        self.chunks.append((indices, counts, lengths))
+        self.rows += len(lengths)
+        size = len(self.terms)
+        # Columns are unique within a row, so a bincount is the document frequency
+        self.doc_freq = np.pad(self.doc_freq, (0, size - len(self.doc_freq))) + np.bincount(indices, minlength=size)
+        self.term_freq = np.pad(self.term_freq, (0, size - len(self.term_freq))) + \
+            np.bincount(indices, weights=counts, minlength=size)
+
+    def _add_buckets(self, hours, columns, counts):
+        valid = hours >= 0
+        hours, columns, counts = hours[valid], columns[valid], counts[valid]
+        if self.anchor is not None:
+            # Late tweets for hours already folded go straight into the baseline
+            late = hours <= self.anchor
+            if late.any():
+                self._fold(hours[late], columns[late], counts[late])
+                hours, columns, counts = hours[~late], columns[~late], counts[~late]
+        if len(hours):
+            self.buckets.append(_aggregate(hours, columns, counts))
+
+    def _fold(self, hours, columns, counts):
+        size = len(self.terms)
+        self.decayed = np.pad(self.decayed, (0, size - len(self.decayed)))
+        self.decayed += np.bincount(columns, weights=counts * _decay(self.anchor - hours), minlength=size)
+
+    def bucket_entries(self):
+        """
+        Returns the retained (hours, columns, counts), compacted into one chunk.
+        """
+        if len(self.buckets) != 1:
+            parts = list(zip(*self.buckets))
+            self.buckets = [_aggregate(*(np.concatenate(p) for p in parts))] if parts else \
+                [(np.zeros(0, np.int64), np.zeros(0, np.int32), np.zeros(0))]
+        return self.buckets[0]
+
+    def expire(self, cutoff):
+        """
+        Folds hourly buckets up to and including hour `cutoff` into the decayed baseline.
+        """
+        if self.anchor is not None and cutoff <= self.anchor:
+            return
+        hours, columns, counts = self.bucket_entries()
+        old = hours <= cutoff
+        if self.anchor is not None:
+            self.decayed *= _decay(cutoff - self.anchor)
+        self.anchor = cutoff
+        self._fold(hours[old], columns[old], counts[old])
+        self.buckets = [(hours[~old], columns[~old], counts[~old])]
+
+    def rising_terms(self, now, hours, limit):
+        """
+        Terms mentioned more in the `hours` up to `now` than the decayed
+        baseline before that window predicts, as dicts sorted by excess mentions.
+        """
+        start = now - hours + 1
+        bucket_hours, columns, counts = self.bucket_entries()
+        size = len(self.terms)
+        recent_mask = (bucket_hours >= start) & (bucket_hours <= now)
+        recent = np.bincount(columns[recent_mask], weights=counts[recent_mask], minlength=size)
+
+        # Decayed term counts as of the hour before the window (bincount of an
+        # empty selection is int64 even with weights, hence the cast)
+        before = bucket_hours < start
+        baseline = np.bincount(columns[before], weights=counts[before] * _decay(start - 1 - bucket_hours[before]),
+                               minlength=size).astype(np.float64, copy=False)
+        if self.anchor is not None:
+            baseline[:len(self.decayed)] += self.decayed * _decay(start - 1 - self.anchor)
+        # Decayed count → hourly rate (steady state of the decayed sum) → expected mentions
+        expected = baseline * (1 - _decay(1)) * hours
+        excess = recent - expected
+
+        candidates = np.flatnonzero((recent >= MIN_MENTIONS) & (excess > 0))
+        if len(candidates) > limit:
+            threshold = excess[candidates[np.argpartition(-excess[candidates], limit - 1)[:limit]]].min()
+            candidates = candidates[excess[candidates] >= threshold]
+        terms = np.array(self.terms, dtype=str)[candidates]
+        top = np.lexsort((terms, -excess[candidates]))[:limit]
+        return [
+            {
+                "term": self.terms[i],
+                "mentions": int(recent[i]),
+                "expected": round(float(expected[i]), 2),
+                "growth": round(float((recent[i] + 1) / (expected[i] + 1)), 2)
+            }
+            for i in candidates[top]
+        ]
+
+    def counts(self):
+        """
+        Returns (indices, counts, row lengths) of every row, compacted into one chunk.
+        """
+        if len(self.chunks) != 1:
+            parts = list(zip(*self.chunks)) or [[np.zeros(0, np.int32)], [np.zeros(0)], [np.zeros(0, np.int64)]]
+            self.chunks = [tuple(np.concatenate(p) for p in parts)]
+        return self.chunks[0]
+
+    def alphabetical(self):
+        """
+        Columns in alphabetical order of their terms, as TfidfVectorizer sorts its
+        features. Terms added since the last call are merged into the cached order.
+        """
+        known = len(self.order)
+        if known < len(self.terms):
+            new_terms = np.array(self.terms[known:], dtype=object)
+            by_term = np.argsort(new_terms, kind="stable")
+            positions = np.searchsorted(self.sorted_terms, new_terms[by_term])
+            self.order = np.insert(self.order, positions, known + by_term)
+            self.sorted_terms = np.insert(self.sorted_terms, positions, new_terms[by_term])
+        return self.order
+
+    def keywords(self, top_n=TOP_N, max_features=MAX_FEATURES):
+        if not self.terms:
+            return ""
+        indices, counts, lengths = self.counts()
+
+        order = self.alphabetical()
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        X = sp.csr_matrix((counts.copy(), rank[indices], indptr), shape=(self.rows, len(order)))
+        doc_freq = self.doc_freq[order]
+        kept = np.arange(len(order))
+
+        if len(order) > max_features:
+            # Keep the most frequent terms (same selection as TfidfVectorizer)
+            mask = np.zeros(len(order), dtype=bool)
+            mask[(-self.term_freq[order]).argsort()[:max_features]] = True
+            kept = np.where(mask)[0]
+            X = X[:, kept]
+            doc_freq = doc_freq[kept]
+
+        # Smoothed idf: ln((1 + n) / (1 + df)) + 1
+        df = doc_freq.astype(np.float64)
+        df += 1.0
+        idf = np.full_like(df, fill_value=self.rows + 1, dtype=np.float64)
+        idf /= df
+        np.log(idf, out=idf)
+        idf += 1.0
+
+        X.data *= idf[X.indices]
+        X = normalize(X, norm="l2", copy=False)
+        scores = X.mean(axis=0).A1
+
+        # Top-k by score, ties broken by alphabetical position
+        candidates = np.arange(len(scores))
+        if len(scores) > top_n:
+            threshold = scores[np.argpartition(-scores, top_n - 1)[:top_n]].min()
+            candidates = np.flatnonzero(scores >= threshold)
+        top = candidates[np.lexsort((candidates, -scores[candidates]))][:top_n]
+        return ", ".join(self.terms[i] for i in order[kept[top]])
+
+
+# -------------------------
+# Engine
+# -------------------------
+class TopicEngine:
+    def __init__(self, state_dir=None, top_n=TOP_N, max_features=MAX_FEATURES):
+        self.state_path = os.path.join(state_dir, STATE_FILE) if state_dir else None
+        self.top_n = top_n
+        self.max_features = max_features
+        self.analyze = TfidfVectorizer(stop_words="english").build_analyzer()
+        self.reset()
+        if self.state_path and os.path.exists(self.state_path):
+            self._load()
+
+    def reset(self):
+        self.hashtags = {}
+        self.cache = {}  # hashtag -> keywords, dropped when the hashtag gets new tweets
+        self.rows = 0                # input rows folded in
+        self.last_tweet_id = None    # tweet_id of the last of them
+        self.latest_hour = -1
+
+    def _extends(self, position, tweet_ids):
+        # Whether rows [position, position + len(tweet_ids)) of the input can
+        # follow the rows seen: the one at self.rows - 1 must be the last tweet folded in
+        last = self.rows - 1 - position
+        return not 0 <= last < len(tweet_ids) or tweet_ids[last] == self.last_tweet_id
+
+    def update(self, df):
+        """
+        Folds in the rows of df not seen yet. df must extend the rows seen so far
+        (append-only history); otherwise the state is rebuilt from df.
+        Returns the number of new rows.
+        """
+        tweet_ids = df["tweet_id"].to_numpy(dtype=np.int64)
+        if self.rows > len(tweet_ids) or not self._extends(0, tweet_ids):
+            self.reset()
+
+        new = df.iloc[self.rows:]
+        self._fold(new)
+        self._seen(tweet_ids)
+        self._expire()
+        return len(new)
+
+    def update_chunks(self, read_chunks):
+        """
+        update() for a history read in chunks: read_chunks() returns an iterator
+        over consecutive chunks of rows. Only one chunk is held at a time; if
+        the history doesn't extend the rows seen so far, the state is rebuilt
+        with a second read. Returns the number of new rows.
+        """
+        seen = self.rows
+        position = 0
+        for chunk in read_chunks():
+            tweet_ids = chunk["tweet_id"].to_numpy(dtype=np.int64)
+            if not self._extends(position, tweet_ids):
+                break
+            overlap = min(max(seen - position, 0), len(tweet_ids))
+            self._fold(chunk.iloc[overlap:])
+            position += len(tweet_ids)
+            if position > seen:
+                self._seen(tweet_ids, position)
+        else:
+            if position >= seen:
+                self._expire()
+                return position - seen
+        self.reset()
+        return self.update_chunks(read_chunks)
+
+    def _seen(self, tweet_ids, rows=None):
+        self.rows = len(tweet_ids) if rows is None else rows
+        if len(tweet_ids):
+            self.last_tweet_id = int(tweet_ids[-1])
+
+    def _fold(self, new):
+        if "created_at" in new:
+            new = new.assign(_hour=hour_numbers(new["created_at"]))
+        for hashtag, group in new.groupby("hashtag", sort=False, observed=True):
+            hours = group["_hour"].to_numpy() if "_hour" in group else None
+            self.hashtags.setdefault(hashtag, HashtagTopics()).add(group["text"].astype(str), self.analyze, hours)
+            self.cache.pop(hashtag, None)
+        if "_hour" in new and len(new):
+            self.latest_hour = max(self.latest_hour, int(new["_hour"].max()))
+
+    def _expire(self):
+        # Keep hourly buckets for the retention window only
+        if self.latest_hour >= 0:
+            for model in self.hashtags.values():
+                model.expire(self.latest_hour - RETENTION_HOURS)
+
+    def keywords(self, hashtag):
+        if hashtag not in self.cache:
+            self.cache[hashtag] = self.hashtags[hashtag].keywords(self.top_n, self.max_features)
+        return self.cache[hashtag]
+
+    def topics(self):
+        """
+        Returns {hashtag: "kw1, kw2, kw3"}; only hashtags with new tweets are rescored.
+        """
+        return {hashtag: self.keywords(hashtag) for hashtag in sorted(self.hashtags)}
+
+    def latest_hour_iso(self):
+        if self.latest_hour < 0:
+            return None
+        return str(np.datetime64(self.latest_hour, "h").astype("datetime64[s]"))
+
+    def rising_terms(self, hours=6, hashtag=None, limit=10):
+        """
+        Top rising terms in the last `hours` (up to the latest hour seen), per hashtag:
+        {hashtag: [{"term", "mentions", "expected", "growth"}, ...]}.
+        hours is capped at RETENTION_HOURS.
+        """
+        hours = max(1, min(int(hours), RETENTION_HOURS))
+        hashtags = [hashtag] if hashtag is not None else sorted(self.hashtags)
+        rising = {}
+        for name in hashtags:
+            model = self.hashtags.get(name)
+            if model is not None and self.latest_hour >= 0:
+                rising[name] = model.rising_terms(self.latest_hour, hours, limit)
+        return rising
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self):
+        hashtags = sorted(self.hashtags)
+        models = [self.hashtags[h] for h in hashtags]
+        chunks = [m.counts() for m in models]
+        buckets = [m.bucket_entries() for m in models]
+        tmp_path = self.state_path + ".tmp"
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=STATE_VERSION,
+                latest_hour=self.latest_hour,
+                rows=self.rows,
+                last_tweet_id=-1 if self.last_tweet_id is None else self.last_tweet_id,
+                hashtags=np.array(hashtags, dtype=str),
+                keywords=np.array([self.keywords(h) for h in hashtags], dtype=str),
+                n_terms=np.array([len(m.terms) for m in models], dtype=np.int64),
+                n_rows=np.array([m.rows for m in models], dtype=np.int64),
+                terms=np.array([t for m in models for t in m.terms], dtype=str),
+                indices=np.concatenate([c[0] for c in chunks] or [np.zeros(0, np.int32)]),
+                counts=np.concatenate([c[1] for c in chunks] or [np.zeros(0)]),
+                lengths=np.concatenate([c[2] for c in chunks] or [np.zeros(0, np.int64)]),
+                anchors=np.array([-1 if m.anchor is None else m.anchor for m in models], dtype=np.int64),
+                decayed=np.concatenate([np.pad(m.decayed, (0, len(m.terms) - len(m.decayed))) for m in models]
+                                       or [np.zeros(0)]),
+                n_buckets=np.array([len(b[0]) for b in buckets], dtype=np.int64),
+                bucket_hours=np.concatenate([b[0] for b in buckets] or [np.zeros(0, np.int64)]),
+                bucket_columns=np.concatenate([b[1] for b in buckets] or [np.zeros(0, np.int32)]),
+                bucket_counts=np.concatenate([b[2] for b in buckets] or [np.zeros(0)])
+            )
+        os.replace(tmp_path, self.state_path)
+
+    def _load(self):
+        with np.load(self.state_path) as state:
+            if "version" not in state or int(state["version"]) != STATE_VERSION:
+                return
+            self.rows = int(state["rows"])
+            self.last_tweet_id = None if self.rows == 0 else int(state["last_tweet_id"])
+            self.latest_hour = int(state["latest_hour"])
+            bucket_end = np.cumsum(state["n_buckets"])
+            terms = state["terms"].tolist()
+            term_end = np.cumsum(state["n_terms"])
+            row_end = np.cumsum(state["n_rows"])
+            nnz_end = np.cumsum(state["lengths"])[row_end - 1] if len(row_end) else row_end
+            term_start, row_start, nnz_start, bucket_start = 0, 0, 0, 0
+            for i, hashtag in enumerate(state["hashtags"].tolist()):
+                model = HashtagTopics()
+                model.terms = terms[term_start:term_end[i]]
+                model.vocabulary = {term: column for column, term in enumerate(model.terms)}
+                model._append(state["indices"][nnz_start:nnz_end[i]], state["counts"][nnz_start:nnz_end[i]],
+                              state["lengths"][row_start:row_end[i]])
+                model.anchor = None if state["anchors"][i] < 0 else int(state["anchors"][i])
+                model.decayed = state["decayed"][term_start:term_end[i]]
+                model.buckets = [tuple(state[key][bucket_start:bucket_end[i]]
+                                       for key in ("bucket_hours", "bucket_columns", "bucket_counts"))]
+                self.hashtags[hashtag] = model
+                self.cache[hashtag] = state["keywords"][i].item()
+                term_start, row_start, nnz_start, bucket_start = term_end[i], row_end[i], nnz_end[i], bucket_end[i]
+
+
+class SavedTopics:
+    """
+    Read-only view of the saved state (used by the Hyper API).
+    The state is reloaded when its file changes; nothing is re-tokenized.
+    Like snapshot.SnapshotWatcher, a background thread does the loading, so
+    requests only ever read `current()` and never wait on the npz file.
+    """
+
+    def __init__(self, state_dir=TOPIC_STATE_DIR, interval=POLL_INTERVAL):
+        self.state_dir = state_dir
+        self.path = os.path.join(state_dir, STATE_FILE)
+        self.interval = interval
+        self.mtime = None
+        self.engine = None
+        self.failures = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        """
+        Returns the TopicEngine of the latest loaded state, or None if there is none.
+        """
+        return self.engine
+
+    def reload(self):
+        """
+        Loads the saved state if its file changed. Returns True if it was swapped in.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            engine = TopicEngine(self.state_dir)
+        except Exception as e:
+            # Keep serving the previous state; retried on the next poll
+            self.failures += 1
+            self.last_error = str(e)
+            return False
+        self.engine = engine  # atomic reference swap
+        self.mtime = mtime
+        self.last_error = None
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.reload()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="topic-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
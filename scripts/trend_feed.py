@@ -0,0 +1,206 @@
+"""
+TrendPredict – Push Feed of Micro-Batch Trend Deltas
+Author: Chaimaa Nairi
+Description:
+Fans out one event per micro-batch to every connected client instead of
+having clients poll the Hyper API for changes.
+
+- batch_deltas() turns a new micro-batch into per-hashtag deltas
+  (new tweets, momentum, sentiment and new spike flags).
+- Spikes are feature_engineering.py's opportunity_flag (hourly engagement above
+  2× its rolling mean), which opportunity_flags() computes for a batch from the
+  store's recent hours of the batch's hashtags.
+- TrendFeed encodes each event once and pushes it to every subscriber queue.
+- Slow clients never block the broadcast: their bounded queue drops its
+  oldest events and the client is told how many it missed.
+- Recent events are kept so reconnecting clients can resume from Last-Event-ID.
+  Event ids are "<epoch>-<n>": the epoch is fixed per process, so after an API
+  restart an old Last-Event-ID is recognized as such. That client gets a
+  `reset` event (its view may have missed batches) and then every recent event.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from feature_engineering import ROLLING_WINDOW, hourly_engagement, rolling_engagement
+
+# -------------------------
+# Configuration
+# -------------------------
+QUEUE_SIZE = 100        # pending events per client before the oldest are dropped
+HISTORY_SIZE = 100      # recent events kept for Last-Event-ID resume
+HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments on an idle stream
+SPIKE_FLAG = "⚡ Spike"  # opportunity_flag value, see feature_engineering.finalize()
+
+
+# -------------------------
+# Spike flags
+# -------------------------
+def history_window(segments, df):
+    """
+    Oldest hour ("YYYYMMDDHH") the rolling means of df's hours depend on:
+    the ROLLING_WINDOW - 1 stored hours before each hashtag's earliest batch
+    hour. `segments` are the segment-store manifest entries.
+    """
+    first_hours = (
+        pd.to_datetime(df["created_at"]).dt.floor("h").dt.strftime("%Y%m%d%H")
+          .groupby(df["hashtag"].astype(str)).min()
+    )
+    start = first_hours.min()
+    for hashtag, first in first_hours.items():
+        earlier = sorted({s["hour"] for s in segments if s["hashtag"] == hashtag and s["hour"] < first})
+        window = earlier[-(ROLLING_WINDOW - 1):]
+        if window:
+            start = min(start, window[0])
+    return start
+
+
+def opportunity_flags(df, history):
+    """
+    opportunity_flag per row of df, as feature_engineering.py computes it.
+    `history` holds every stored tweet (batch included) of df's hashtags from
+    history_window() on, with created_at, hashtag, likes and retweets.
+    """
+    history = history.assign(hour=pd.to_datetime(history["created_at"]).dt.floor("h"))
+    hourly = hourly_engagement(history)
+    hourly = hourly.merge(rolling_engagement(hourly), on=["hashtag", "hour"])
+    hourly["opportunity_flag"] = np.where(
+        hourly["engagement"] > 2 * hourly["rolling_mean_engagement"], SPIKE_FLAG, ""
+    )
+    keys = pd.DataFrame({
+        "hashtag": df["hashtag"].to_numpy(),
+        "hour": pd.to_datetime(df["created_at"]).dt.floor("h").to_numpy()
+    })
+    flags = keys.merge(hourly[["hashtag", "hour", "opportunity_flag"]], on=["hashtag", "hour"], how="left")
+    return pd.Series(flags["opportunity_flag"].fillna("").to_numpy(), index=df.index)
+
+
+# -------------------------
+# Batch deltas
+# -------------------------
+def batch_deltas(df):
+    """
+    Per-hashtag summary of one micro-batch (JSON-ready list of dicts).
+    df carries an opportunity_flag column (see opportunity_flags()).
+    """
+    if df.empty:
+        return []
+    spikes = df["opportunity_flag"].astype(str) == SPIKE_FLAG
+    grouped = df.assign(spike=spikes).groupby("hashtag")
+    deltas = pd.DataFrame({
+        "new_tweets": grouped.size(),
+        "momentum_sum": grouped["momentum"].sum(),
+        "momentum_max": grouped["momentum"].max(),
+        "sentiment_mean": grouped["sentiment"].mean(),
+        "sentiment_vader_mean": grouped["sentiment_vader"].mean(),
+        "new_spikes": grouped["spike"].sum()
+    }).reset_index()
+    deltas = deltas.astype(object).where(deltas.notna(), None)
+    return deltas.to_dict(orient="records")
+
+
+# -------------------------
+# Broadcaster
+# -------------------------
+class Subscriber:
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def push(self, event):
+        if self.queue.full():
+            # Slow client: drop its oldest pending event rather than block everyone
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class TrendFeed:
+    """
+    Lives on the API's event loop; publish() and subscribe() are called from it.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, history_size=HISTORY_SIZE, epoch=None):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.history = deque(maxlen=history_size)
+        self.epoch = epoch or format(time.time_ns() // 1_000_000, "x")  # start time, in ms
+        self.last_id = 0
+        self.dropped = 0
+
+    def publish(self, data, event="batch"):
+        """
+        Encodes the event once and queues it for every subscriber. Returns its id.
+        """
+        self.last_id += 1
+        event_id = f"{self.epoch}-{self.last_id}"
+        payload = f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        message = (self.last_id, payload.encode("utf-8"))
+        self.history.append(message)
+        for subscriber in self.subscribers:
+            subscriber.push(message)
+        return event_id
+
+    def _resume_after(self, last_event_id):
+        # Counter of a Last-Event-ID from this process, or None for another epoch
+        epoch, _, number = last_event_id.rpartition("-")
+        return int(number) if epoch == self.epoch and number.isdigit() else None
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a client; with a Last-Event-ID, the recent events after it are
+        queued first (all of them, after a `reset` event, if it is from another epoch).
+        """
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id:
+            after = self._resume_after(last_event_id)
+            if after is None:
+                reset = f"event: reset\ndata: {json.dumps({'epoch': self.epoch})}\n\n"
+                subscriber.push((0, reset.encode("utf-8")))
+                after = 0
+            for message in self.history:
+                if message[0] > after:
+                    subscriber.push(message)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        self.dropped += subscriber.dropped
+
+    async def stream(self, last_event_id=None, heartbeat=HEARTBEAT_INTERVAL):
+        """
+        Server-sent events for one client, until it disconnects.
+        """
+        subscriber = self.subscribe(last_event_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                if subscriber.queue.empty():
+                    try:
+                        _, payload = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield b": keep-alive\n\n"
+                        continue
+                else:
+                    # Catching up: skip the timeout machinery
+                    _, payload = subscriber.queue.get_nowait()
+                if subscriber.dropped:
+                    # Reset before yielding: more drops can happen while we're suspended
+                    dropped, subscriber.dropped = subscriber.dropped, 0
+                    self.dropped += dropped
+                    yield f"event: lag\ndata: {json.dumps({'dropped': dropped})}\n\n".encode("utf-8")
+                yield payload
+        finally:
+            self.unsubscribe(subscriber)
+
+    def metrics(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "epoch": self.epoch,
+            "last_event_id": self.last_id,
+            "dropped_events": self.dropped + sum(s.dropped for s in self.subscribers)
+        }
@@ -0,0 +1,86 @@
+"""
+TrendPredict – Per-Hashtag Aggregate Index
+Author: Chaimaa Nairi
+Description:
+In-memory index behind the Hyper API endpoints.
+Keeps running sums and counts of momentum and sentiment_vader plus
+recommendation frequency counters per hashtag, so /trends and
+/recommendation/{hashtag} are lookups instead of a groupby or a full scan per request.
+"""
+
+from collections import Counter
+
+
+class TrendIndex:
+    def __init__(self):
+        self.stats = {}
+        self._trends = None  # cached /trends payload, rebuilt after updates
+
+    @classmethod
+    def from_frame(cls, df):
+        index = cls()
+        index.update(df)
+        return index
+
+    def update(self, df):
+        """
+        Folds rows into the running aggregates (one vectorized groupby per batch).
+        """
+        if df.empty:
+            return
+
+        sums = df.groupby("hashtag").agg(
+            momentum_sum=("momentum", "sum"),
+            momentum_count=("momentum", "count"),
+            vader_sum=("sentiment_vader", "sum"),
+            vader_count=("sentiment_vader", "count")
+        )
+        recs = df.groupby(["hashtag", "ai_recommendation"], observed=True).size()
+
+        for hashtag, row in sums.iterrows():
+            entry = self.stats.setdefault(hashtag, {
+                "momentum_sum": 0.0,
+                "momentum_count": 0,
+                "vader_sum": 0.0,
+                "vader_count": 0,
+                "recommendations": Counter()
+            })
+            entry["momentum_sum"] += float(row["momentum_sum"])
+            entry["momentum_count"] += int(row["momentum_count"])
+            entry["vader_sum"] += float(row["vader_sum"])
+            entry["vader_count"] += int(row["vader_count"])
+
+        for (hashtag, rec), count in recs.items():
+            self.stats[hashtag]["recommendations"][rec] += int(count)
+
+        self._trends = None
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def recommendation(self, hashtag):
+        """
+        Most common recommendation for a hashtag (ties → first in sort order,
+        like pandas mode()), or None if the hashtag is unknown.
+        """
+        entry = self.stats.get(hashtag)
+        if entry is None or not entry["recommendations"]:
+            return None
+        return min(entry["recommendations"].items(), key=lambda item: (-item[1], item[0]))[0]
+
+    def trends(self):
+        if self._trends is None:
+            self._trends = [
+                {
+                    "hashtag": hashtag,
+                    "momentum": _mean(entry["momentum_sum"], entry["momentum_count"]),
+                    "sentiment_vader": _mean(entry["vader_sum"], entry["vader_count"]),
+                    "ai_recommendation": self.recommendation(hashtag)
+                }
+                for hashtag, entry in sorted(self.stats.items())
+            ]
+        return self._trends
+
+
+def _mean(total, count):
+    return total / count if count else None
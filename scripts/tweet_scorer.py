@@ -0,0 +1,218 @@
+"""
+TrendPredict – Online Tweet Scorer
+Author: Chaimaa Nairi
+Description:
+Scores tweets as they arrive (POST /score in hyper_api.py) with the same rules
+as the offline pipeline:
+TextBlob + VADER sentiment → momentum score → momentum percentile → AI recommendation.
+
+- TextBlob and VADER lexicons are loaded once at startup (warm()), not per request.
+- Sentiment is the expensive part (pure-Python lexicon scoring, roughly
+  0.4 ms per new tweet per core). Scores are kept in an in-memory LRU keyed by
+  text, so repeated texts (retweets, reposted copy) are not rescored; the
+  sub-10 ms p99 target for 100-tweet batches is met for cached texts.
+- Uncached texts are sharded across a pool of worker processes that warm()
+  starts and warms up once (same forkserver start method as vader_engine.py),
+  so their latency drops with the number of cores. On a single core the pool
+  is not started and texts are scored in-process.
+- Momentum percentiles come from the momentum sketch maintained by
+  ai_recommendations.py --incremental (see quantile_sketch.py), reloaded when
+  the file changes. Without a saved sketch, one is built from the serving
+  snapshot once per snapshot generation.
+- Everything after sentiment is vectorized over the batch (see rules.py).
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rules
+from quantile_sketch import SKETCH_FILE, MomentumPercentiles, SavedPercentiles
+from sentiment_stage import score_batch
+from vader_engine import START_METHOD
+
+# -------------------------
+# Configuration
+# -------------------------
+MAX_BATCH = 1000          # tweets per request
+CACHE_SIZE = 100_000      # texts whose sentiment is kept in memory
+WORKERS = os.cpu_count()  # sentiment worker processes (none when 1)
+POOL_THRESHOLD = 16       # uncached texts in a request before they are sharded across workers
+
+SENTIMENT_LABELS = np.array(rules.SENTIMENT_LABELS, dtype=object)
+MOMENTUM_LABELS = np.array(rules.MOMENTUM_LABELS, dtype=object)
+RECOMMENDATION_LABELS = np.array(rules.RECOMMENDATION_LABELS, dtype=object)
+
+
+def _labels(labels, codes):
+    return labels[codes].tolist()
+
+
+def _score_shard(texts):
+    # Runs in a pool worker; returns plain lists so the result pickles cheaply
+    columns = score_batch(texts)
+    return columns["sentiment"].tolist(), columns["sentiment_vader"].tolist()
+
+
+def _warm_worker():
+    score_batch(["warm up"])
+
+
+class TweetScorer:
+    def __init__(self, sketch_file=SKETCH_FILE, cache_size=CACHE_SIZE, workers=WORKERS):
+        self.saved = SavedPercentiles(sketch_file)
+        self.fallback = (None, None)  # (snapshot generation, sketch built from it)
+        self.cache = OrderedDict()    # text -> (sentiment, sentiment_vader)
+        self.cache_size = cache_size
+        self.workers = workers
+        self.pool = None
+        self.lock = threading.Lock()  # requests are scored on threadpool workers
+        self.scored = 0
+        self.cache_hits = 0
+        self.sentiment_seconds = 0.0  # spent scoring uncached texts
+
+    def warm(self):
+        """
+        Loads the sentiment lexicons and the saved sketch before the first
+        request, and starts the sentiment workers with their lexicons loaded.
+        """
+        _warm_worker()  # also downloads the VADER lexicon before workers load it
+        self.saved.current()
+        if self.workers > 1 and self.pool is None:
+            context = multiprocessing.get_context(START_METHOD)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                            initializer=_warm_worker)
+            # Start every worker now rather than on the first large request
+            list(self.pool.map(_score_shard, [["warm up"]] * self.workers))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # -------------------------
+    # Sentiment (cached per text)
+    # -------------------------
+    def sentiment(self, texts):
+        """
+        Returns (TextBlob polarity, VADER compound) arrays for texts.
+        """
+        # Hits are read (and marked recent) before anything is evicted; the lock
+        # keeps the LRU consistent across the API's threadpool workers
+        known = {}
+        with self.lock:
+            for text in dict.fromkeys(texts):
+                if text in self.cache:
+                    self.cache.move_to_end(text)
+                    known[text] = self.cache[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+
+        if missing:
+            start = time.perf_counter()
+            sentiment, sentiment_vader = self._score_uncached(missing)
+            elapsed = time.perf_counter() - start
+            scored = dict(zip(missing, zip(sentiment, sentiment_vader)))
+            known.update(scored)
+            with self.lock:
+                self.sentiment_seconds += elapsed
+                self.cache.update(scored)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        with self.lock:
+            self.cache_hits += len(texts) - len(missing)
+
+        scores = np.array([known[text] for text in texts], dtype=np.float64).reshape(len(texts), 2)
+        return scores[:, 0], scores[:, 1]
+
+    def _score_uncached(self, texts):
+        pool = self.pool
+        if pool is None or len(texts) < POOL_THRESHOLD:
+            return _score_shard(texts)
+        # One contiguous shard per worker, results in input order
+        size = -(-len(texts) // self.workers)
+        shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+        sentiment, sentiment_vader = [], []
+        for shard_sentiment, shard_vader in pool.map(_score_shard, shards):
+            sentiment.extend(shard_sentiment)
+            sentiment_vader.extend(shard_vader)
+        return sentiment, sentiment_vader
+
+    # -------------------------
+    # Momentum distribution
+    # -------------------------
+    def percentiles(self, snapshot):
+        """
+        Returns (MomentumPercentiles, source) to rank momentum against, or (None, None).
+        """
+        sketch = self.saved.current()
+        if sketch is not None and sketch.overall.n:
+            return sketch, "sketch"
+        if snapshot is None or snapshot.df.empty:
+            return None, None
+        generation, sketch = self.fallback
+        if generation != snapshot.generation:
+            sketch = MomentumPercentiles(path=None)
+            sketch.update(snapshot.df)
+            self.fallback = (snapshot.generation, sketch)
+        return sketch, "snapshot"
+
+    # -------------------------
+    # Scoring
+    # -------------------------
+    def score(self, tweets, snapshot=None):
+        """
+        Scores a list of tweet dicts (text, likes, retweets, all required;
+        tweet_id and hashtag are echoed back). Raises ValueError on malformed input.
+        """
+        if not isinstance(tweets, list) or not tweets:
+            raise ValueError("tweets must be a non-empty list")
+        if len(tweets) > MAX_BATCH:
+            raise ValueError(f"At most {MAX_BATCH} tweets per request")
+        try:
+            texts = [str(tweet["text"]) for tweet in tweets]
+            likes = np.array([tweet["likes"] for tweet in tweets], dtype=np.float64)
+            retweets = np.array([tweet["retweets"] for tweet in tweets], dtype=np.float64)
+        except (TypeError, KeyError, ValueError):
+            raise ValueError("Each tweet needs a text and non-negative likes / retweets")
+        counts = np.concatenate([likes, retweets])
+        if not (np.isfinite(counts).all() and (counts >= 0).all()):
+            raise ValueError("Each tweet needs a text and non-negative likes / retweets")
+
+        distribution, source = self.percentiles(snapshot)
+        if distribution is None:
+            raise ValueError("Momentum distribution not found")
+
+        sentiment, sentiment_vader = self.sentiment(texts)
+        momentum = rules.momentum_score(likes, retweets, sentiment)
+        momentum_pct = distribution.percentile(momentum)
+        columns = {
+            "sentiment": sentiment.tolist(),
+            "sentiment_category": _labels(SENTIMENT_LABELS, rules.sentiment_codes(sentiment)),
+            "sentiment_vader": sentiment_vader.tolist(),
+            "sentiment_vader_category": _labels(SENTIMENT_LABELS, rules.vader_codes(sentiment_vader)),
+            "momentum": momentum.tolist(),
+            "momentum_status": _labels(MOMENTUM_LABELS, rules.momentum_codes(momentum)),
+            "momentum_pct": momentum_pct.round(4).tolist(),
+            "ai_recommendation": _labels(RECOMMENDATION_LABELS, rules.recommendation_codes(momentum_pct, sentiment_vader))
+        }
+
+        items = []
+        for tweet, values in zip(tweets, zip(*columns.values())):
+            item = {key: tweet[key] for key in ("tweet_id", "hashtag") if key in tweet}
+            item.update(zip(columns, values))
+            items.append(item)
+        with self.lock:
+            self.scored += len(items)
+        return {"items": items, "distribution": {"source": source, "tweets": distribution.overall.n}}
+
+    def metrics(self):
+        return {
+            "scored": self.scored,
+            "cache_hits": self.cache_hits,
+            "cached_texts": len(self.cache),
+            "workers": self.workers if self.pool is not None else 0,
+            "sentiment_seconds": round(self.sentiment_seconds, 3)
+        }
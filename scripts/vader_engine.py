@@ -0,0 +1,152 @@
+"""
+TrendPredict – Batched VADER Sentiment Engine
+Author: Chaimaa Nairi
+Description:
+Scores tweet text with VADER in batches instead of one .apply call per row.
+
+- Compound scores are cached on disk (SQLite) keyed by a hash of the text,
+  with LRU eviction, so reruns after a micro-batch only score new tweets.
+- Large batches of uncached texts are sharded across a process pool. Its
+  workers are started from a fresh forkserver (spawn where that is not
+  available), never forked: pipeline.py scores on a worker thread while other
+  stage threads run, and forking a multi-threaded process can deadlock the child.
+- Categories are assigned separately in one vectorized pass (rules.vader_category).
+- The VADER lexicon is downloaded on first use if NLTK can't find it, so the
+  API, fetcher and micro-batch loop start on a fresh machine too.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------
+# Configuration
+# -------------------------
+CACHE_FILE = "../data/vader_cache.sqlite"
+MAX_CACHE_ENTRIES = 2_000_000  # least recently used scores are evicted beyond this
+POOL_THRESHOLD = 5_000         # uncached texts before scoring moves to a process pool
+SHARD_SIZE = 2_000             # texts per worker task
+MAX_WORKERS = os.cpu_count()
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_analyzer = None
+
+
+# -------------------------
+# Scoring
+# -------------------------
+def _get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        import nltk
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        try:
+            _analyzer = SentimentIntensityAnalyzer()
+        except LookupError:
+            # Fresh machine: fetch the lexicon once instead of failing every caller
+            nltk.download("vader_lexicon", quiet=True)
+            _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def _score_shard(texts):
+    analyzer = _get_analyzer()
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def _score_uncached(texts, max_workers=MAX_WORKERS):
+    if len(texts) < POOL_THRESHOLD or max_workers == 1:
+        return _score_shard(texts)
+
+    _get_analyzer()  # downloads the lexicon if needed before workers load it
+    shards = [texts[i:i + SHARD_SIZE] for i in range(0, len(texts), SHARD_SIZE)]
+    scores = []
+    context = multiprocessing.get_context(START_METHOD)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_get_analyzer) as pool:
+        for shard_scores in pool.map(_score_shard, shards):
+            scores.extend(shard_scores)
+    return scores
+
+
+def text_hash(text):
+    # 64-bit key, stored as a signed SQLite INTEGER
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# -------------------------
+# On-disk score cache
+# -------------------------
+class ScoreCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "hash INTEGER PRIMARY KEY, compound REAL NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores(last_used)")
+
+    def get_many(self, hashes, batch=900):
+        """
+        Returns {hash: compound} for cached hashes and marks them as recently used.
+        """
+        found = {}
+        now = int(time.time())
+        for i in range(0, len(hashes), batch):
+            part = hashes[i:i + batch]
+            marks = ",".join("?" * len(part))
+            rows = self.conn.execute(f"SELECT hash, compound FROM scores WHERE hash IN ({marks})", part)
+            found.update(rows)
+            self.conn.execute(f"UPDATE scores SET last_used = ? WHERE hash IN ({marks})", [now, *part])
+        return found
+
+    def put_many(self, items):
+        now = int(time.time())
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores (hash, compound, last_used) VALUES (?, ?, ?)",
+            [(h, score, now) for h, score in items]
+        )
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM scores WHERE hash IN "
+                "(SELECT hash FROM scores ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def score_texts(texts, cache=None, max_workers=MAX_WORKERS):
+    """
+    Returns VADER compound scores (float64 array) for an iterable of texts.
+    Each distinct text is scored at most once; cached texts are not rescored.
+    """
+    texts = [str(t) for t in texts]
+    unique_texts = list(dict.fromkeys(texts))
+    hashes = [text_hash(t) for t in unique_texts]
+
+    cached = cache.get_many(hashes) if cache is not None else {}
+    missing = [i for i, h in enumerate(hashes) if h not in cached]
+
+    if missing:
+        new_scores = _score_uncached([unique_texts[i] for i in missing], max_workers)
+        new_items = [(hashes[i], score) for i, score in zip(missing, new_scores)]
+        cached.update(new_items)
+        if cache is not None:
+            cache.put_many(new_items)
+
+    by_text = {t: cached[h] for t, h in zip(unique_texts, hashes)}
+    return np.fromiter((by_text[t] for t in texts), dtype=np.float64, count=len(texts))
+